@@ -9,19 +9,21 @@ except(IOError, ImportError):
 
 packages = [
     "sneakysnek",
-    "sneakysnek.recorders"
+    "sneakysnek.recorders",
+    "sneakysnek.benchmarks"
 ]
 
 requires = []
 extras_require = {
     ":sys_platform == 'darwin'": ["pyobjc-framework-Quartz"],
-    ":'linux' in sys_platform": ["python-xlib"]
+    ":'linux' in sys_platform": ["python-xlib"],
+    "numpy": ["numpy"]
 }
 
 setup(
     name='sneakysnek',
     version="0.1.1",
-    description="Dead simple cross-platform keyboard & mouse global input capture solution for Python 3.6+",
+    description="Dead simple cross-platform keyboard & mouse global input capture solution for Python 3.7+",
     long_description=long_description,
     author="Nicholas Brochu",
     author_email='nicholas@serpent.ai',
@@ -30,7 +32,10 @@ setup(
     install_requires=requires,
     extras_require=extras_require,
     entry_points={
-        'console_scripts': ['sneakysnek = sneakysnek.recorder:demo']
+        'console_scripts': [
+            'sneakysnek = sneakysnek.recorder:demo',
+            'sneakysnek-bench = sneakysnek.benchmarks.suite:main'
+        ]
     },
     license='MIT',
     url='https://github.com/SerpentAI/sneakysnek',
@@ -42,6 +47,6 @@ setup(
         'License :: OSI Approved :: MIT License',
         'Operating System :: OS Independent',
         'Programming Language :: Python',
-        'Programming Language :: Python :: 3.6'
+        'Programming Language :: Python :: 3.7'
     ]
 )
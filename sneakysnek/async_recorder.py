@@ -0,0 +1,128 @@
+from sneakysnek.recorder import Recorder
+
+import asyncio
+import collections
+import threading
+
+
+class AsyncRecorder:
+    """asyncio front end to Recorder.record: events are handed over per batch and iterated with async for"""
+
+    def __init__(self, max_events=65536, **kwargs):
+        self.max_events = max_events
+        self.kwargs = kwargs
+
+        self.recorder = None
+        self.loop = None
+
+        self.is_closed = False
+        self.is_stopped = False
+
+        self._watcher = None
+
+        self._batches = collections.deque()
+        self._buffered = 0
+        self._batch = iter(())
+
+        self._waiter = None
+        self._condition = threading.Condition()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.stop()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while True:
+            for event in self._batch:
+                return event
+
+            self._batch = iter(await self._next_batch())
+
+    async def batches(self):
+        while True:
+            try:
+                yield await self._next_batch()
+            except StopAsyncIteration:
+                return
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.recorder = Recorder.record(batch_callback=self._handoff, **self.kwargs)
+
+        # The backend can stop by itself (synthetic seconds=, the end of an evdev capture, a lost connection)
+        self._watcher = self.loop.run_in_executor(None, self._wait_recorder)
+
+    async def stop(self):
+        if self.is_stopped:
+            return
+
+        self.is_stopped = True
+
+        self._close()
+
+        if self.recorder is not None:
+            await self.loop.run_in_executor(None, self.recorder.stop)
+            await self._watcher
+
+    def _wait_recorder(self):
+        self.recorder.wait()
+
+        # Hands over what a dispatcher or coalescer still holds, then ends iteration once the consumer caught up
+        self.recorder._stop_pipeline()
+        self._close()
+
+    def _close(self):
+        with self._condition:
+            if self.is_closed:
+                return
+
+            self.is_closed = True
+            self._condition.notify_all()
+
+        self.loop.call_soon_threadsafe(self._wake)
+
+    def _handoff(self, events):
+        with self._condition:
+            # Backpressure: the capture side waits while the consumer is max_events behind
+            while self._buffered >= self.max_events and not self.is_closed:
+                self._condition.wait()
+
+            if self.is_closed:
+                return
+
+            was_empty = not self._batches
+
+            self._batches.append(events)
+            self._buffered += len(events)
+
+        # One loop wakeup per transition from empty, however many batches queue up behind it
+        if was_empty:
+            self.loop.call_soon_threadsafe(self._wake)
+
+    def _wake(self):
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    async def _next_batch(self):
+        while True:
+            with self._condition:
+                if self._batches:
+                    batch = self._batches.popleft()
+
+                    self._buffered -= len(batch)
+                    self._condition.notify_all()
+
+                    return batch
+
+                if self.is_closed:
+                    raise StopAsyncIteration
+
+                self._waiter = self.loop.create_future()
+
+            await self._waiter
@@ -0,0 +1,64 @@
+from sneakysnek.keyboard_keys import KeyboardKey
+
+from sneakysnek.keyboard_event import KeyboardEvent, KeyboardEvents
+from sneakysnek.mouse_event import MouseEvent, MouseEvents
+
+from sneakysnek.coalescer import MoveCoalescer
+
+import math
+import time
+
+
+def synthetic_mouse(callback, rate_hz=1000, seconds=2.0):
+    """Feeds a circling cursor at rate_hz in real time, with a key tap every 250 ms"""
+    interval_ns = int(1000000000 / rate_hz)
+    count = int(rate_hz * seconds)
+
+    started_ns = time.monotonic_ns()
+
+    for i in range(count):
+        due_ns = started_ns + i * interval_ns
+
+        while time.monotonic_ns() < due_ns:
+            pass
+
+        if i % (rate_hz // 4) == 0:
+            callback(KeyboardEvent(KeyboardEvents.DOWN, KeyboardKey.KEY_SPACE))
+            callback(KeyboardEvent(KeyboardEvents.UP, KeyboardKey.KEY_SPACE))
+
+        angle = i / rate_hz * math.pi
+        callback(MouseEvent(MouseEvents.MOVE, x=int(960 + 400 * math.cos(angle)), y=int(540 + 400 * math.sin(angle))))
+
+    return count
+
+
+def run(rate_hz=1000, seconds=2.0):
+    configurations = [
+        ("None", None),
+        ("move_rate_hz=60", MoveCoalescer(move_rate_hz=60)),
+        ("move_rate_hz=144", MoveCoalescer(move_rate_hz=144)),
+        ("min_pixel_delta=3", MoveCoalescer(min_pixel_delta=3)),
+        ("move_rate_hz=60, min_pixel_delta=3", MoveCoalescer(move_rate_hz=60, min_pixel_delta=3))
+    ]
+
+    print(f"Callback calls for a synthetic {rate_hz} Hz mouse over {seconds} s")
+    print("")
+
+    for name, coalescer in configurations:
+        calls = [0]
+
+        def callback(event):
+            calls[0] += 1
+
+        if coalescer is None:
+            synthetic_mouse(callback, rate_hz=rate_hz, seconds=seconds)
+        else:
+            coalescer.start(callback)
+            synthetic_mouse(coalescer.put, rate_hz=rate_hz, seconds=seconds)
+            coalescer.stop()
+
+        print(f"{name:<36} {calls[0]:8} calls")
+
+
+if __name__ == "__main__":
+    run()
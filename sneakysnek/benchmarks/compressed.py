@@ -0,0 +1,101 @@
+from sneakysnek import storage
+
+from sneakysnek.compressed import CompressedWriter, CompressedReader
+
+import os
+import tempfile
+import time
+import zlib
+
+
+def synthetic_session(seconds=3600, seed=0):
+    """Storage records of a session: 1000 Hz mouse motion along smooth strokes, typing, clicks and scrolling"""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    count = seconds * 1000
+
+    records = np.zeros(count, dtype=storage.numpy_dtype())
+
+    monotonic_ns = 10 ** 12 + np.cumsum(1000000 + rng.integers(-50000, 50000, count))
+    records["monotonic_ns"] = monotonic_ns
+    records["timestamp"] = 1700000000.0 + monotonic_ns / 1e9
+
+    # Cursor velocity drifts smoothly, so positions change by a few pixels per event
+    records["x"] = np.clip(960 + np.cumsum(np.round(np.cumsum(rng.normal(0, 0.3, count)) % 13 - 6)), 0, 1919)
+    records["y"] = np.clip(540 + np.cumsum(np.round(np.cumsum(rng.normal(0, 0.3, count)) % 9 - 4)), 0, 1079)
+
+    records["kind"] = storage.KIND_MOUSE_MOVE
+    records["code"] = storage.NO_CODE
+
+    # Key taps every 50 events, a click every 500, a scroll every 200
+    keys = np.arange(0, count, 50)
+    records["kind"][keys] = storage.KIND_KEY_DOWN
+    records["kind"][keys[1::2]] = storage.KIND_KEY_UP
+    records["code"][keys] = rng.integers(0, len(storage.keyboard_keys), len(keys))[np.arange(len(keys)) // 2 * 2]
+    records["x"][keys] = 0
+    records["y"][keys] = 0
+
+    clicks = np.arange(25, count, 500)
+    records["kind"][clicks] = storage.KIND_MOUSE_CLICK
+    records["code"][clicks] = 0
+    records["direction"][clicks] = storage.DIRECTION_DOWN
+    records["direction"][clicks[1::2]] = storage.DIRECTION_UP
+
+    scrolls = np.arange(125, count, 200)
+    records["kind"][scrolls] = storage.KIND_MOUSE_SCROLL
+    records["direction"][scrolls] = storage.DIRECTION_DOWN
+    records["velocity"][scrolls] = 1
+
+    return records
+
+
+def run(seconds=3600, block_events=65536):
+    records = synthetic_session(seconds)
+    raw_bytes = len(records) * storage.RECORD.size
+
+    print(f"Encoding a {seconds / 3600:.1f} hour session: {len(records)} events, {raw_bytes / (1024 * 1024):.0f} MiB as 32 byte records")
+    print("")
+    print(f"{'encoding':<26} {'MiB':>7} {'ratio':>7} {'encode MB/s':>12} {'decode MB/s':>12}")
+
+    # Baseline: the fixed-width records straight through zlib, block by block
+    started_at = time.perf_counter()
+    blocks = [zlib.compress(records[start:start + block_events].tobytes(), 6) for start in range(0, len(records), block_events)]
+    encode_seconds = time.perf_counter() - started_at
+
+    started_at = time.perf_counter()
+
+    for block in blocks:
+        zlib.decompress(block)
+
+    decode_seconds = time.perf_counter() - started_at
+
+    _report("zlib of 32 byte records", raw_bytes, sum(len(block) for block in blocks), encode_seconds, decode_seconds)
+
+    with tempfile.TemporaryDirectory() as directory:
+        for codec, level in [("zlib", 1), ("zlib", 6), ("lzma", 1), ("lzma", 6)]:
+            path = os.path.join(directory, f"session-{codec}-{level}.snkz")
+
+            with CompressedWriter(path, codec=codec, level=level, block_events=block_events) as writer:
+                started_at = time.perf_counter()
+                writer.write_records(records)
+                writer.flush()
+                encode_seconds = time.perf_counter() - started_at
+
+            with CompressedReader(path) as reader:
+                started_at = time.perf_counter()
+                decoded = reader.to_numpy()
+                decode_seconds = time.perf_counter() - started_at
+
+            if not (decoded == records).all():
+                raise AssertionError(f"{codec} round trip does not match")
+
+            _report(f"delta / varint + {codec} {level}", raw_bytes, os.path.getsize(path), encode_seconds, decode_seconds)
+
+
+def _report(name, raw_bytes, size, encode_seconds, decode_seconds):
+    print(f"{name:<26} {size / (1024 * 1024):>7.2f} {raw_bytes / size:>7.1f} {raw_bytes / encode_seconds / 1000000:>12.0f} {raw_bytes / decode_seconds / 1000000:>12.0f}")
+
+
+if __name__ == "__main__":
+    run()
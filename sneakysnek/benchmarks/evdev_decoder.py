@@ -0,0 +1,57 @@
+from sneakysnek.recorders.evdev_recorder import EvdevRecorder, INPUT_EVENT, EV_SYN, EV_KEY, EV_REL, SYN_REPORT, REL_X, REL_Y
+
+import os
+import tempfile
+import time
+
+
+def synthetic_capture(count=10000, started=1700000000.0):
+    """input_event bytes of a 1000 Hz mouse (REL_X, REL_Y, SYN_REPORT) with a key tap (KEY_A) every 100 frames"""
+    data = bytearray()
+
+    for i in range(count):
+        seconds, microseconds = divmod(int(started * 1000000) + (i * 1000), 1000000)
+
+        if i % 100 == 0:
+            data += INPUT_EVENT.pack(seconds, microseconds, EV_KEY, 30, 1)
+            data += INPUT_EVENT.pack(seconds, microseconds, EV_SYN, SYN_REPORT, 0)
+            data += INPUT_EVENT.pack(seconds, microseconds, EV_KEY, 30, 0)
+            data += INPUT_EVENT.pack(seconds, microseconds, EV_SYN, SYN_REPORT, 0)
+
+        data += INPUT_EVENT.pack(seconds, microseconds, EV_REL, REL_X, 1 if (i // 50) % 2 == 0 else -1)
+        data += INPUT_EVENT.pack(seconds, microseconds, EV_REL, REL_Y, 2)
+        data += INPUT_EVENT.pack(seconds, microseconds, EV_SYN, SYN_REPORT, 0)
+
+    return bytes(data)
+
+
+def run(count=10000):
+    data = synthetic_capture(count)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "capture.evdev")
+
+        with open(path, "wb") as f:
+            f.write(data)
+
+        batches = list()
+
+        started = time.perf_counter()
+
+        # A fixture file reads to EOF and the recorder stops on its own once every device is exhausted
+        recorder = EvdevRecorder.record(None, batch_callback=batches.append, devices=[path])
+        recorder.wait()
+
+        elapsed = time.perf_counter() - started
+
+        recorder.stop()
+
+    events = [event for batch in batches for event in batch]
+
+    print(f"{len(data) // INPUT_EVENT.size} input_event records -> {len(events)} events in {elapsed * 1000:.1f} ms ({len(events) / elapsed:,.0f} events/s, {len(batches)} batches)")
+    print(f"First event: {events[0]}")
+    print(f"Last event:  {events[-1]}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,83 @@
+from sneakysnek.keyboard_keys import KeyboardKey
+
+from sneakysnek.keyboard_event import KeyboardEvent, DetailedKeyboardEvent, KeyboardEvents
+from sneakysnek.mouse_event import MouseEvent, DetailedMouseEvent, MouseEvents
+
+import gc
+import time
+import tracemalloc
+
+
+class LegacyKeyboardEvent:
+
+    def __init__(self, event, keyboard_key):
+        self.event = event
+        self.keyboard_key = keyboard_key
+        self.timestamp = time.time()
+
+
+class LegacyMouseEvent:
+
+    def __init__(self, event, button=None, direction=None, velocity=None, x=None, y=None):
+        self.event = event
+        self.button = button
+        self.direction = direction
+        self.velocity = velocity
+        self.x = x
+        self.y = y
+        self.timestamp = time.time()
+
+
+def construction_seconds(factory, count):
+    gc.disable()
+
+    try:
+        started_at = time.perf_counter()
+
+        for i in range(count):
+            factory(i)
+
+        return time.perf_counter() - started_at
+    finally:
+        gc.enable()
+
+
+def retained_bytes(factory, count):
+    gc.collect()
+    tracemalloc.start()
+
+    try:
+        snapshot = tracemalloc.take_snapshot()
+        events = [factory(i) for i in range(count)]
+        allocated = sum(stat.size_diff for stat in tracemalloc.take_snapshot().compare_to(snapshot, "filename"))
+    finally:
+        tracemalloc.stop()
+
+    # The list holding the events is part of the measurement for both classes alike
+    del events
+
+    return allocated
+
+
+def run(count=1000000):
+    factories = [
+        ("LegacyKeyboardEvent", lambda i: LegacyKeyboardEvent(KeyboardEvents.DOWN, KeyboardKey.KEY_A)),
+        ("KeyboardEvent", lambda i: KeyboardEvent(KeyboardEvents.DOWN, KeyboardKey.KEY_A)),
+        ("DetailedKeyboardEvent", lambda i: DetailedKeyboardEvent(KeyboardEvents.DOWN, KeyboardKey.KEY_A, received_ns=i, source_ns=i)),
+        ("LegacyMouseEvent", lambda i: LegacyMouseEvent(MouseEvents.MOVE, x=i, y=i)),
+        ("MouseEvent", lambda i: MouseEvent(MouseEvents.MOVE, x=i, y=i)),
+        ("DetailedMouseEvent", lambda i: DetailedMouseEvent(MouseEvents.MOVE, x=i, y=i, dx=1, dy=1, received_ns=i, source_ns=i))
+    ]
+
+    print(f"Event construction for {count} events")
+    print("")
+
+    for name, factory in factories:
+        seconds = construction_seconds(factory, count)
+        memory = retained_bytes(factory, count)
+
+        print(f"{name:<24} {seconds:8.3f} s  {memory / (1024 * 1024):8.1f} MiB")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,81 @@
+from sneakysnek.frames import iter_frames
+
+from sneakysnek.state import InputState
+
+from sneakysnek.storage import EventWriter, EventReader
+
+from sneakysnek.benchmarks.storage import synthetic_events
+
+import os
+import tempfile
+import time
+import tracemalloc
+
+
+def python_buckets(frame_ns, reader):
+    """Per-event loop through InputState, snapshotting at each frame"""
+    state = InputState()
+    snapshots = list()
+
+    frame = 0
+
+    for event in reader:
+        while frame < len(frame_ns) and frame_ns[frame] < event.monotonic_ns:
+            snapshots.append(state.snapshot(frame_ns[frame]))
+            frame += 1
+
+        state.update(event)
+
+    return snapshots
+
+
+def run(count=2000000, fps=60, chunk_events=262144):
+    import numpy as np
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "events.snek")
+
+        # Written in pieces to keep the benchmark's own footprint down, one continuous 1000 Hz timeline
+        with EventWriter(path) as writer:
+            for piece in range(count // 100000):
+                events = synthetic_events(100000)
+                offset_ns = (piece * 100000000000) - events[0].monotonic_ns
+
+                for event in events:
+                    event.monotonic_ns += offset_ns
+
+                writer.write_many(events)
+
+        with EventReader(path) as reader:
+            monotonic_ns = reader.column("monotonic_ns")
+            frame_ns = np.arange(monotonic_ns[0], monotonic_ns[-1], 1000000000 // fps, dtype=np.int64)
+
+            size = os.path.getsize(path)
+
+            tracemalloc.start()
+            started_at = time.perf_counter()
+
+            frames = 0
+
+            for chunk in iter_frames(frame_ns, reader, chunk_events=chunk_events):
+                frames += len(chunk["frame_ns"])
+
+            seconds = time.perf_counter() - started_at
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            subset = count // 20
+            subset_frames = frame_ns[frame_ns <= monotonic_ns[subset - 1]]
+
+            started_at = time.perf_counter()
+            python_buckets(subset_frames, reader.events(0, subset))
+            python_seconds = (time.perf_counter() - started_at) * (count / subset)
+
+    print(f"Bucketing {count} events ({size / (1024 * 1024):.0f} MiB log) into {frames} frames at {fps} fps")
+    print("")
+    print(f"iter_frames()          {count / seconds:14,.0f} events/s  {seconds:8.2f} s  peak {peak / (1024 * 1024):.0f} MiB allocated, chunks of {chunk_events} events")
+    print(f"InputState per event   {count / python_seconds:14,.0f} events/s  {python_seconds:8.2f} s  (extrapolated from {subset} events)")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,149 @@
+from sneakysnek.keyboard_keys import KeyboardKey, keyboard_key_ordinals
+
+from sneakysnek.keyboard_event import KeyboardEvent, KeyboardEvents
+
+from sneakysnek.hotkeys import Hotkeys, modifier_bits, LEFT_MODIFIERS
+
+import contextlib
+import io
+import random
+import threading
+import time
+
+
+MODIFIERS = ["CTRL", "SHIFT", "ALT", "META"]
+
+TRIGGERS = [key for key in KeyboardKey if key.value not in modifier_bits]
+
+PRESSED_MODIFIERS = [KeyboardKey.KEY_LEFT_CTRL, KeyboardKey.KEY_RIGHT_SHIFT, KeyboardKey.KEY_LEFT_ALT]
+
+
+def random_spec(rng):
+    steps = list()
+
+    for _ in range(rng.choice([1, 1, 2, 3])):
+        modifiers = rng.sample(MODIFIERS, rng.randrange(3))
+        steps.append("+".join(modifiers + [rng.choice(TRIGGERS).name]))
+
+    return " ".join(steps)
+
+
+def typing_events(count, rng):
+    """Random key taps, a third of them with a modifier held, 30 ms apart"""
+    events = list()
+    monotonic_ns = 0
+
+    while len(events) < count:
+        modifier = rng.choice(PRESSED_MODIFIERS) if rng.random() < 0.33 else None
+        key = rng.choice(TRIGGERS)
+
+        for event, keyboard_key in [(KeyboardEvents.DOWN, modifier), (KeyboardEvents.DOWN, key), (KeyboardEvents.UP, key), (KeyboardEvents.UP, modifier)]:
+            if keyboard_key is not None:
+                monotonic_ns += 30000000
+                events.append(KeyboardEvent(event, keyboard_key, monotonic_ns=monotonic_ns))
+
+    return events
+
+
+class ScanMatcher:
+    """Scans every registered chord on each key press: single chords only, as user callbacks typically do"""
+
+    def __init__(self, hotkeys):
+        self.chords = list()
+
+        for binding in hotkeys.bindings:
+            if len(binding.steps) == 1:
+                self.chords.append(binding.steps[0][0])
+
+        self.held = 0
+        self.matched = 0
+
+    def __call__(self, event):
+        bit = modifier_bits.get(event.keyboard_key.value)
+
+        if event.event is KeyboardEvents.UP:
+            if bit is not None:
+                self.held &= ~bit
+
+            return
+
+        code = ((self.held | (self.held >> 1)) & LEFT_MODIFIERS) << 8 | keyboard_key_ordinals[event.keyboard_key.value]
+
+        if bit is not None:
+            self.held |= bit
+
+        for codes in self.chords:
+            if code in codes:
+                self.matched += 1
+
+
+def check_failing_handler():
+    """A handler that raises must not stop the worker thread: the binding fired after it still runs"""
+    hotkeys = Hotkeys()
+    fired = threading.Event()
+
+    hotkeys.bind("F1", _fail)
+    hotkeys.bind("F2", lambda event: fired.set())
+
+    with contextlib.redirect_stderr(io.StringIO()) as stderr:
+        for keyboard_key in [KeyboardKey.KEY_F1, KeyboardKey.KEY_F2]:
+            hotkeys.put(KeyboardEvent(KeyboardEvents.DOWN, keyboard_key))
+            hotkeys.put(KeyboardEvent(KeyboardEvents.UP, keyboard_key))
+
+        is_fired = fired.wait(5)
+        hotkeys.stop()
+
+    if not is_fired or hotkeys.errors != 1 or "RuntimeError" not in stderr.getvalue():
+        raise RuntimeError(f"A raising handler stopped the hotkeys worker: {hotkeys.stats()}")
+
+
+def run(count=200000, binding_counts=(10, 1000, 5000)):
+    check_failing_handler()
+
+    rng = random.Random(0)
+    events = typing_events(count, rng)
+
+    print(f"Matching {len(events)} key events against registered hotkeys (1 to 3 step sequences)")
+    print("")
+    print(f"{'bindings':>8} {'compile ms':>11} {'automaton ns/event':>19} {'matched':>8} {'list scan ns/event':>19}")
+
+    for binding_count in binding_counts:
+        hotkeys = Hotkeys(threaded=False)
+
+        for _ in range(binding_count):
+            hotkeys.bind(random_spec(rng), _nothing)
+
+        started_at = time.perf_counter()
+        hotkeys.put_batch([])
+        compile_seconds = time.perf_counter() - started_at
+
+        started_at = time.perf_counter()
+
+        for event in events:
+            hotkeys.put(event)
+
+        seconds = time.perf_counter() - started_at
+
+        scan = ScanMatcher(hotkeys)
+        scanned = events[:max(1000, len(events) * 10 // binding_count)]
+
+        started_at = time.perf_counter()
+
+        for event in scanned:
+            scan(event)
+
+        scan_seconds = time.perf_counter() - started_at
+
+        print(f"{binding_count:>8} {compile_seconds * 1000:>11.1f} {seconds / len(events) * 1000000000:>19.0f} {hotkeys.matched:>8} {scan_seconds / len(scanned) * 1000000000:>19.0f}")
+
+
+def _nothing(event):
+    pass
+
+
+def _fail(event):
+    raise RuntimeError("Failing handler")
+
+
+if __name__ == "__main__":
+    run()
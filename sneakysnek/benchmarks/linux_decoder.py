@@ -0,0 +1,132 @@
+from sneakysnek.recorders.linux_recorder import mouse_button_mapping
+
+from sneakysnek.filter import EventFilter
+
+from sneakysnek.keyboard_keys import KeyboardKey
+from sneakysnek.keyboard_event import KeyboardEvent, KeyboardEvents
+from sneakysnek.mouse_event import MouseEvent, MouseEvents
+
+from sneakysnek.benchmarks.linux_keyboard import EVENT, FixtureDisplay, Reply, fixture_recorder
+
+import time
+
+import Xlib.X
+import Xlib.protocol.rq
+
+
+def synthetic_reply(count=10000):
+    """Mostly MotionNotify with a button press / release and a key press / release every 100 events"""
+    data = bytearray()
+
+    for i in range(count):
+        phase = i % 100
+
+        if phase == 0:
+            event_type, detail = Xlib.X.ButtonPress, 1
+        elif phase == 1:
+            event_type, detail = Xlib.X.ButtonRelease, 1
+        elif phase == 50:
+            event_type, detail = Xlib.X.KeyPress, 38
+        elif phase == 51:
+            event_type, detail = Xlib.X.KeyRelease, 38
+        else:
+            event_type, detail = Xlib.X.MotionNotify, 0
+
+        x = i % 1920
+        y = i % 1080
+
+        data += EVENT.pack(event_type, detail, 0, 1000 + i, 0x100, 0x100, 0, x, y, x, y, 0, 1)
+
+    return Reply(bytes(data))
+
+
+def xlib_event_handler(recorder, display, reply):
+    """LinuxRecorder.event_handler before the struct decoder: a python-xlib event object per record"""
+    data = reply.data
+    events = list()
+
+    while len(data):
+        event, data = Xlib.protocol.rq.EventField(None).parse_binary_value(data, display.display, None, None)
+
+        if event.type in [Xlib.X.KeyPress, Xlib.X.KeyRelease]:
+            state = event.state
+            keyboard_key = recorder.keyboard_table[(event.detail << 2) | (state & 1) | (2 if state & recorder.alt_gr_mask else 0)]
+
+            if keyboard_key is not None:
+                events.append(KeyboardEvent(KeyboardEvents.DOWN if event.type == Xlib.X.KeyPress else KeyboardEvents.UP, keyboard_key))
+        elif event.type == Xlib.X.ButtonPress:
+            if event.detail in mouse_button_mapping:
+                events.append(MouseEvent(MouseEvents.CLICK, button=mouse_button_mapping[event.detail], direction="DOWN", x=event.root_x, y=event.root_y))
+        elif event.type == Xlib.X.ButtonRelease:
+            if event.detail in mouse_button_mapping:
+                events.append(MouseEvent(MouseEvents.CLICK, button=mouse_button_mapping[event.detail], direction="UP", x=event.root_x, y=event.root_y))
+        elif event.type == Xlib.X.MotionNotify:
+            events.append(MouseEvent(MouseEvents.MOVE, x=event.root_x, y=event.root_y))
+
+    recorder.batch_callback(events)
+
+
+def run(count=10000, repeat=20):
+    display = FixtureDisplay()
+    reply = synthetic_reply(count)
+
+    delivered = {"xlib": 0, "struct": 0, "clicks": 0, "escape key": 0}
+
+    def count_into(name):
+        def batch_callback(events):
+            delivered[name] += len(events)
+
+        return batch_callback
+
+    xlib_recorder = fixture_recorder(None)
+    xlib_recorder.batch_callback = count_into("xlib")
+
+    recorder = fixture_recorder(None)
+    recorder.batch_callback = count_into("struct")
+
+    started_at = time.perf_counter()
+
+    for _ in range(repeat):
+        xlib_event_handler(xlib_recorder, display, reply)
+
+    xlib_seconds = time.perf_counter() - started_at
+
+    started_at = time.perf_counter()
+
+    for _ in range(repeat):
+        recorder.event_handler(display, reply)
+
+    struct_seconds = time.perf_counter() - started_at
+
+    # Filters decided before any event is built, on top of what the RECORD context ranges already leave out
+    filters = [
+        ("clicks", EventFilter(kinds=[MouseEvents.CLICK])),
+        ("escape key", EventFilter(keys=[KeyboardKey.KEY_ESCAPE]))
+    ]
+
+    filter_seconds = dict()
+
+    for name, event_filter in filters:
+        filter_recorder = fixture_recorder(None, event_filter=event_filter)
+        filter_recorder.batch_callback = count_into(name)
+
+        started_at = time.perf_counter()
+
+        for _ in range(repeat):
+            filter_recorder.event_handler(display, reply)
+
+        filter_seconds[name] = time.perf_counter() - started_at
+
+    total = count * repeat
+
+    print(f"Decoding a synthetic RECORD reply of {count} core events, {repeat} times")
+    print("")
+    print(f"python-xlib rq     {total / xlib_seconds:12,.0f} events/s  ({delivered['xlib']} events delivered)")
+    print(f"struct decoder     {total / struct_seconds:12,.0f} events/s  ({delivered['struct']} events delivered)")
+
+    for name, event_filter in filters:
+        print(f"{'filter: ' + name:<18} {total / filter_seconds[name]:12,.0f} events/s  ({delivered[name]} events delivered, {event_filter.filtered_decode} filtered at decode)")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,209 @@
+from sneakysnek.recorders.linux_recorder import LinuxRecorder, keyboard_scan_code_mapping
+
+import struct
+import time
+
+import Xlib.X
+import Xlib.XK
+import Xlib.protocol.display
+import Xlib.protocol.rq
+
+
+# Keymap recorded from an X server with an evdev US layout: keycode -> (unshifted keysym, shifted keysym)
+US_KEYMAP = {
+    9: (65307, 0), 10: (49, 33), 11: (50, 64), 12: (51, 35), 13: (52, 36), 14: (53, 37), 15: (54, 94),
+    16: (55, 38), 17: (56, 42), 18: (57, 40), 19: (48, 41), 20: (45, 95), 21: (61, 43), 22: (65288, 65288),
+    23: (65289, 65056), 24: (113, 81), 25: (119, 87), 26: (101, 69), 27: (114, 82), 28: (116, 84),
+    29: (121, 89), 30: (117, 85), 31: (105, 73), 32: (111, 79), 33: (112, 80), 34: (91, 123), 35: (93, 125),
+    36: (65293, 0), 37: (65507, 0), 38: (97, 65), 39: (115, 83), 40: (100, 68), 41: (102, 70), 42: (103, 71),
+    43: (104, 72), 44: (106, 74), 45: (107, 75), 46: (108, 76), 47: (59, 58), 48: (39, 34), 49: (96, 126),
+    50: (65505, 0), 51: (92, 124), 52: (122, 90), 53: (120, 88), 54: (99, 67), 55: (118, 86), 56: (98, 66),
+    57: (110, 78), 58: (109, 77), 59: (44, 60), 60: (46, 62), 61: (47, 63), 62: (65506, 0), 64: (65513, 65511),
+    65: (32, 0), 66: (65509, 0), 67: (65470, 0), 68: (65471, 0), 69: (65472, 0), 70: (65473, 0),
+    71: (65474, 0), 72: (65475, 0), 73: (65476, 0), 74: (65477, 0), 75: (65478, 0), 76: (65479, 0),
+    95: (65480, 0), 96: (65481, 0), 105: (65508, 0), 108: (65514, 65512), 110: (65360, 0), 111: (65362, 0),
+    112: (65365, 0), 113: (65361, 0), 114: (65363, 0), 115: (65367, 0), 116: (65364, 0), 117: (65366, 0),
+    118: (65379, 0), 119: (65535, 0), 133: (65515, 0), 134: (65516, 0), 203: (65406, 0)
+}
+
+US_MODIFIER_MAPPING = [[50, 62], [66], [37, 105], [64, 108], [77], [], [133, 134], [203]]
+
+EVENT = struct.Struct("=BBHIIIIhhhhHBx")
+
+
+class FixtureDisplay:
+    """Stands in for Xlib.display.Display (and its protocol display) using the recorded keymap"""
+
+    event_classes = Xlib.protocol.display.Display.event_classes
+
+    def __init__(self):
+        self.display = self
+
+    def get_resource_class(self, name, default=None):
+        return default
+
+    def keycode_to_keysym(self, keycode, index):
+        return US_KEYMAP.get(keycode, (0, 0))[index] if index < 2 else 0
+
+    def keysym_to_keycode(self, keysym):
+        for keycode, keysyms in US_KEYMAP.items():
+            if keysym in keysyms:
+                return keycode
+
+        return 0
+
+    def get_modifier_mapping(self):
+        return US_MODIFIER_MAPPING
+
+
+class Reply:
+
+    def __init__(self, data):
+        self.data = data
+
+
+def typing_reply(text="the quick brown fox jumps over the lazy dog 1234567890 "):
+    """A RECORD reply holding KeyPress / KeyRelease pairs for text, holding Shift for capitals"""
+    keycodes = {chr(keysyms[0]): keycode for keycode, keysyms in US_KEYMAP.items() if keysyms[0] < 128}
+
+    data = bytearray()
+    server_time = 1000
+
+    for character in text:
+        keycode = keycodes[character.lower()]
+        state = Xlib.X.ShiftMask if character.isupper() else 0
+
+        for event_type in (Xlib.X.KeyPress, Xlib.X.KeyRelease):
+            data += EVENT.pack(event_type, keycode, 0, server_time, 0x100, 0x100, 0, 100, 100, 100, 100, state, 1)
+            server_time += 8
+
+    return Reply(bytes(data))
+
+
+def legacy_event_handler(recorder, display, reply):
+    """Key path of LinuxRecorder.event_handler before the translation table"""
+    data = reply.data
+
+    while len(data):
+        event, data = Xlib.protocol.rq.EventField(None).parse_binary_value(data, display.display, None, None)
+
+        if event.type in [Xlib.X.KeyPress, Xlib.X.KeyRelease]:
+            alt_gr_mask = find_mask(recorder.display_local, "Mode_switch")
+            index = ((1 if event.state & 1 else 0) + (2 if event.state & alt_gr_mask else 0))
+            scan_code = keycode_to_scan_code(recorder.display_local, event.detail, index)
+
+            if scan_code in keyboard_scan_code_mapping:
+                keyboard_key = keyboard_scan_code_mapping[scan_code]
+            else:
+                return None
+
+            recorder.callback(keyboard_key)
+
+
+def find_mask(display, symbol):
+    modifier_keycode = display.keysym_to_keycode(Xlib.XK.string_to_keysym(symbol))
+
+    for index, keycodes in enumerate(display.get_modifier_mapping()):
+        for keycode in keycodes:
+            if keycode == modifier_keycode:
+                return 1 << index
+
+    return 0
+
+
+def keycode_to_scan_code(display, keycode, index):
+    scan_code = display.keycode_to_keysym(keycode, index)
+
+    if scan_code:
+        return scan_code
+    elif index & 0x2:
+        return keycode_to_scan_code(display, keycode, index & ~0x2)
+    elif index & 0x1:
+        return keycode_to_scan_code(display, keycode, index & ~0x1)
+    else:
+        return 0
+
+
+def fixture_recorder(callback, event_filter=None):
+    # Skips LinuxRecorder.__init__, which would connect to an X server
+    recorder = LinuxRecorder.__new__(LinuxRecorder)
+
+    recorder.callback = callback
+    recorder.batch_callback = None
+    recorder.display_local = FixtureDisplay()
+
+    recorder.keyboard_table = None
+    recorder.alt_gr_mask = 0
+    recorder._mapping_changes = dict()
+
+    recorder.event_filter = event_filter
+
+    recorder._initialize_clock()
+    recorder._build_keyboard_table()
+
+    return recorder
+
+
+def run(repeat=2000):
+    display = FixtureDisplay()
+    reply = typing_reply()
+
+    keystrokes = len(reply.data) // EVENT.size
+
+    counts = {"legacy": 0, "table": 0}
+
+    def count(name):
+        def callback(event):
+            counts[name] += 1
+
+        return callback
+
+    legacy_recorder = fixture_recorder(count("legacy"))
+    recorder = fixture_recorder(count("table"))
+
+    started_at = time.perf_counter()
+
+    for _ in range(repeat):
+        legacy_event_handler(legacy_recorder, display, reply)
+
+    legacy_seconds = time.perf_counter() - started_at
+
+    started_at = time.perf_counter()
+
+    for _ in range(repeat):
+        recorder.event_handler(display, reply)
+
+    table_seconds = time.perf_counter() - started_at
+
+    total = keystrokes * repeat
+
+    events = [EVENT.unpack_from(reply.data, offset) for offset in range(0, len(reply.data), EVENT.size)]
+
+    started_at = time.perf_counter()
+
+    for _ in range(repeat):
+        for event in events:
+            index = (event[11] & 1) + (2 if event[11] & find_mask(display, "Mode_switch") else 0)
+            keyboard_scan_code_mapping.get(keycode_to_scan_code(display, event[1], index))
+
+    legacy_translation_seconds = time.perf_counter() - started_at
+
+    started_at = time.perf_counter()
+
+    for _ in range(repeat):
+        for event in events:
+            recorder.keyboard_table[(event[1] << 2) | (event[11] & 1) | (2 if event[11] & recorder.alt_gr_mask else 0)]
+
+    table_translation_seconds = time.perf_counter() - started_at
+
+    print(f"LinuxRecorder key handling for {total} key events from a recorded reply")
+    print("")
+    print(f"                    {'handler':>10}  {'translation':>12}")
+    print(f"Legacy lookups      {legacy_seconds / total * 1000000000:7.0f} ns  {legacy_translation_seconds / total * 1000000000:9.0f} ns  ({counts['legacy']} events delivered)")
+    print(f"Translation table   {table_seconds / total * 1000000000:7.0f} ns  {table_translation_seconds / total * 1000000000:9.0f} ns  ({counts['table']} events delivered)")
+    print("")
+    print("The legacy path also issued a GetModifierMapping round trip per key event on a live X server.")
+
+
+if __name__ == "__main__":
+    run()
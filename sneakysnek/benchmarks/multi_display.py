@@ -0,0 +1,160 @@
+from sneakysnek.recorder import Recorder
+
+import multiprocessing
+import os
+import resource
+import subprocess
+import threading
+import time
+
+import Xlib.X
+import Xlib.display
+import Xlib.ext.xtest
+
+
+FIRST_DISPLAY = 90
+
+
+def start_servers(count):
+    """count Xvfb servers on :90 onwards; returns (processes, display names)"""
+    processes = list()
+    names = list()
+
+    for number in range(FIRST_DISPLAY, FIRST_DISPLAY + count):
+        processes.append(subprocess.Popen(["Xvfb", f":{number}", "-screen", "0", "640x480x24", "-nolisten", "tcp"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+        names.append(f":{number}")
+
+    for number in range(FIRST_DISPLAY, FIRST_DISPLAY + count):
+        deadline = time.monotonic() + 10
+
+        while not os.path.exists(f"/tmp/.X11-unix/X{number}"):
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Xvfb :{number} did not start")
+
+            time.sleep(0.01)
+
+    return processes, names
+
+
+def _inject(names, rate_hz, seconds):
+    """XTest motion on every display at rate_hz each, from its own process so it does not count towards the recorder's CPU"""
+    displays = [Xlib.display.Display(name) for name in names]
+
+    interval = 1 / rate_hz
+    next_at = time.monotonic()
+    deadline = next_at + seconds
+
+    step = 0
+
+    while next_at < deadline:
+        for display in displays:
+            Xlib.ext.xtest.fake_input(display, Xlib.X.MotionNotify, x=100 + (step % 200), y=100)
+            display.flush()
+
+        step += 1
+        next_at += interval
+
+        time.sleep(max(0, next_at - time.monotonic()))
+
+    for display in displays:
+        display.close()
+
+
+def _threads():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("Threads:"):
+                return int(line.split()[1])
+
+
+def _sockets():
+    """Open sockets in this process; the recorders' delta is their X connections"""
+    count = 0
+
+    for fd in os.listdir("/proc/self/fd"):
+        try:
+            target = os.readlink(f"/proc/self/fd/{fd}")
+        except OSError:
+            continue
+
+        if target.startswith("socket:["):
+            count += 1
+
+    return count
+
+
+def measure(names, multi, rate_hz, seconds):
+    received = [0]
+    lock = threading.Lock()
+
+    def count(events):
+        with lock:
+            received[0] += len(events)
+
+    threads_before = _threads()
+    connections_before = _sockets()
+
+    if multi:
+        recorders = [Recorder.record(batch_callback=count, backend="multi_display", displays=names)]
+    else:
+        recorders = list()
+
+        for name in names:
+            os.environ["DISPLAY"] = name
+            recorders.append(Recorder.record(batch_callback=count))
+
+    for recorder in recorders:
+        recorder.wait_recording(10)
+
+    threads = _threads() - threads_before
+    connections = _sockets() - connections_before
+
+    injector = multiprocessing.Process(target=_inject, args=(names, rate_hz, seconds))
+
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    started_at = time.perf_counter()
+
+    injector.start()
+    injector.join()
+
+    # Let the last replies arrive
+    time.sleep(0.2)
+
+    elapsed = time.perf_counter() - started_at
+    cpu = resource.getrusage(resource.RUSAGE_SELF)
+    cpu_seconds = (cpu.ru_utime - usage.ru_utime) + (cpu.ru_stime - usage.ru_stime)
+
+    for recorder in recorders:
+        recorder.stop()
+
+    return threads, connections, cpu_seconds / elapsed * 100, received[0]
+
+
+def run(counts=(1, 2, 4, 8, 16, 32), rate_hz=250, seconds=3):
+    display = os.environ.get("DISPLAY")
+
+    print(f"Recording N Xvfb displays, each with {rate_hz} Hz of XTest motion for {seconds} s (requires Xvfb and python-xlib)")
+    print("")
+    print(f"{'displays':>8} {'recorder':<26} {'threads':>8} {'X conns':>8} {'CPU %':>7} {'events':>8}")
+
+    try:
+        for count in counts:
+            processes, names = start_servers(count)
+
+            try:
+                for multi, label in [(False, "LinuxRecorder per display"), (True, "MultiDisplayRecorder")]:
+                    threads, connections, cpu, received = measure(names, multi, rate_hz, seconds)
+                    print(f"{count:>8} {label:<26} {threads:>8} {connections:>8} {cpu:>7.1f} {received:>8}")
+            finally:
+                for process in processes:
+                    process.terminate()
+                    process.wait()
+    finally:
+        if display is None:
+            os.environ.pop("DISPLAY", None)
+        else:
+            os.environ["DISPLAY"] = display
+
+
+if __name__ == "__main__":
+    run()
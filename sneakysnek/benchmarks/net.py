@@ -0,0 +1,160 @@
+from sneakysnek.net import Publisher, Subscriber
+
+from sneakysnek.benchmarks.storage import synthetic_events
+
+import json
+import multiprocessing
+import os
+import socket
+import tempfile
+import time
+
+
+def _subscriber(address, results):
+    latencies = list()
+    received = 0
+
+    with Subscriber(address) as subscriber:
+        # Rebuilds KeyboardEvent / MouseEvent objects, as a consumer would
+        for batch in subscriber.batches():
+            received_ns = time.monotonic_ns()
+
+            for event in batch:
+                latencies.append(received_ns - event.monotonic_ns)
+
+            received += len(batch)
+
+        results.put((received, subscriber.frames, _percentiles(latencies)))
+
+
+def _json_subscriber(address, results):
+    received = 0
+
+    with socket.create_connection(address) as client:
+        for line in client.makefile("rb"):
+            json.loads(line)
+            received += 1
+
+    results.put((received, received, None))
+
+
+def run_publisher(address, events, paced_us=None, batch_size=64, **options):
+    """Sends events through a Publisher to a subscriber process: as fast as possible in batches, or one every paced_us"""
+    results = multiprocessing.Queue()
+
+    with Publisher(address, **options) as publisher:
+        subscriber = multiprocessing.Process(target=_subscriber, args=(publisher.address, results))
+        subscriber.start()
+
+        publisher.wait_for_subscribers()
+
+        started_at = time.perf_counter()
+
+        if paced_us is None:
+            for i in range(0, len(events), batch_size):
+                batch = events[i:i + batch_size]
+                monotonic_ns = time.monotonic_ns()
+
+                for event in batch:
+                    event.monotonic_ns = monotonic_ns
+
+                publisher.write_many(batch)
+        else:
+            next_ns = time.monotonic_ns()
+
+            for event in events:
+                next_ns += paced_us * 1000
+
+                # Sleeping, like a backend blocked on its socket, lets the sender thread take the GIL
+                remaining_ns = next_ns - time.monotonic_ns()
+
+                if remaining_ns > 0:
+                    time.sleep(remaining_ns / 1000000000)
+
+                event.monotonic_ns = time.monotonic_ns()
+                publisher.write(event)
+
+    received, frames, percentiles = results.get()
+    seconds = time.perf_counter() - started_at
+
+    subscriber.join()
+
+    return received, frames, publisher.dropped, percentiles, seconds
+
+
+def run_json(events):
+    """Baseline: one JSON object per event, newline delimited over TCP"""
+    results = multiprocessing.Queue()
+
+    with socket.create_server(("127.0.0.1", 0)) as server:
+        subscriber = multiprocessing.Process(target=_json_subscriber, args=(server.getsockname(), results))
+        subscriber.start()
+
+        connection, _ = server.accept()
+
+        started_at = time.perf_counter()
+
+        with connection:
+            for event in events:
+                connection.sendall(json.dumps({
+                    "class": event.__class__.__name__,
+                    "event": event.event.name,
+                    "keyboard_key": getattr(event, "keyboard_key", None) and event.keyboard_key.name,
+                    "x": getattr(event, "x", None),
+                    "y": getattr(event, "y", None),
+                    "timestamp": event.timestamp
+                }).encode() + b"\n")
+
+    received, frames, _ = results.get()
+    seconds = time.perf_counter() - started_at
+
+    subscriber.join()
+
+    return received, frames, 0, None, seconds
+
+
+def run(count=500000, paced_count=10000, paced_us=250):
+    events = synthetic_events(count)
+
+    with tempfile.TemporaryDirectory() as directory:
+        unix_path = os.path.join(directory, "events.sock")
+
+        print(f"{count} events published by this process and decoded into events by another, in batches of 64")
+        print("")
+        print(f"{'transport':<42} {'events/s':>12} {'frames':>8} {'dropped':>8}")
+
+        transports = [
+            ("JSON per event over TCP", lambda: run_json(events)),
+            # Room for everything: the subscriber decodes slower than this process publishes
+            ("Publisher over TCP", lambda: run_publisher(("127.0.0.1", 0), events, max_buffered=count)),
+            ("Publisher over a Unix socket", lambda: run_publisher(unix_path, events, max_buffered=count))
+        ]
+
+        for label, transport in transports:
+            received, frames, dropped, _, seconds = transport()
+            print(f"{label:<42} {received / seconds:>12,.0f} {frames:>8} {dropped:>8}")
+
+        print("")
+        print(f"{paced_count} events, one every {paced_us} us: end-to-end latency from write() to a rebuilt event")
+        print("")
+        print(f"{'transport':<42} {'p50 us':>8} {'p99 us':>8} {'max us':>8} {'frames':>8}")
+
+        for label, address in [("TCP", ("127.0.0.1", 0)), ("Unix socket", unix_path)]:
+            for max_batch, max_delay_ms in [(1, 0), (64, 0.5), (512, 2.0)]:
+                _, frames, _, percentiles, _ = run_publisher(address, events[:paced_count], paced_us=paced_us, max_batch=max_batch, max_delay_ms=max_delay_ms)
+                p50, p99, maximum = percentiles
+
+                print(f"{f'{label}, max_batch={max_batch}, max_delay_ms={max_delay_ms}':<42} {p50 / 1000:>8.0f} {p99 / 1000:>8.0f} {maximum / 1000:>8.0f} {frames:>8}")
+
+
+def _percentiles(latencies):
+    latencies = sorted(latencies)
+
+    if not latencies:
+        return 0, 0, 0
+
+    return latencies[len(latencies) // 2], latencies[min(len(latencies) - 1, len(latencies) * 99 // 100)], latencies[-1]
+
+
+if __name__ == "__main__":
+    run()
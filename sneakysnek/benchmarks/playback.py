@@ -0,0 +1,80 @@
+from sneakysnek.recorder import Recorder
+from sneakysnek.player import Player
+
+from sneakysnek.keyboard_keys import KeyboardKey
+
+from sneakysnek.keyboard_event import KeyboardEvent, KeyboardEvents
+from sneakysnek.mouse_event import MouseEvent, MouseEvents
+
+import os
+import time
+
+
+class NullInjector:
+
+    def inject(self, event):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def synthetic_session(count=2000, interval_ms=2):
+    """A cursor sweeping at 500 Hz, with a key tap every 100 moves"""
+    events = list()
+    monotonic_ns = 0
+
+    for i in range(count):
+        monotonic_ns += interval_ms * 1000000
+
+        if i % 100 == 0:
+            events.append(KeyboardEvent(KeyboardEvents.DOWN, KeyboardKey.KEY_F13, monotonic_ns=monotonic_ns))
+            events.append(KeyboardEvent(KeyboardEvents.UP, KeyboardKey.KEY_F13, monotonic_ns=monotonic_ns + 500000))
+
+        events.append(MouseEvent(MouseEvents.MOVE, x=100 + (i % 500), y=100 + (i % 300), monotonic_ns=monotonic_ns))
+
+    return events
+
+
+def replay_and_record(events):
+    """Replays through XTest while recording the X server back, then compares recorded intervals with the intended ones"""
+    recorded = list()
+
+    recorder = Recorder.record(batch_callback=recorded.extend)
+    time.sleep(0.5)
+
+    player = Player()
+    report = player.play(events)
+
+    time.sleep(0.5)
+    recorder.stop()
+    player.close()
+
+    moves = [event for event in recorded if event.event is MouseEvents.MOVE]
+    intended = [event for event in events if event.event is MouseEvents.MOVE]
+
+    errors = sorted(abs((b.monotonic_ns - a.monotonic_ns) - (y.monotonic_ns - x.monotonic_ns)) for a, b, x, y in zip(moves, moves[1:], intended, intended[1:]))
+
+    print(report)
+
+    if errors:
+        print(f"Recorded back {len(moves)} of {len(intended)} moves - interval error p50 {errors[len(errors) // 2] / 1000:.1f} us, p99 {errors[int(len(errors) * 0.99)] / 1000:.1f} us")
+
+
+def run(count=2000):
+    events = synthetic_session(count)
+
+    for speed in [1.0, 4.0]:
+        print(Player(speed=speed, injector=NullInjector()).play(events))
+
+    if os.environ.get("DISPLAY"):
+        replay_and_record(events)
+    else:
+        print("DISPLAY is not set, skipping the XTest replay (try xvfb-run)")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,73 @@
+from sneakysnek.recorder import Recorder
+
+import statistics
+import time
+
+
+def _summary(seconds):
+    milliseconds = sorted(second * 1000 for second in seconds)
+    return f"{statistics.mean(milliseconds):>9.2f} {statistics.median(milliseconds):>9.2f} {milliseconds[-1]:>9.2f}"
+
+
+def run(cycles=50, backend=None):
+    """Toggles capture on and off: stopping and recording a fresh recorder, against pause() / resume() (requires an X server)
+
+    Raises RuntimeError when a stopped recorder does not join.
+    """
+    restarts = list()
+    stops = list()
+    joins = list()
+
+    for _ in range(cycles):
+        started_at = time.perf_counter()
+
+        recorder = Recorder.record(batch_callback=_nothing, backend=backend)
+        recorder.wait_recording()
+
+        restarts.append(time.perf_counter() - started_at)
+
+        started_at = time.perf_counter()
+        recorder.stop()
+        stops.append(time.perf_counter() - started_at)
+
+        # join() also waits for the threads a backend runs besides Recorder.thread, e.g. the Linux RECORD threads
+        started_at = time.perf_counter()
+
+        if not recorder.join(5):
+            raise RuntimeError(f"{backend or 'record'} backend: join() timed out after stop()")
+
+        joins.append(time.perf_counter() - started_at)
+
+    pauses = list()
+    resumes = list()
+
+    recorder = Recorder.record(batch_callback=_nothing, backend=backend)
+    recorder.wait_recording()
+
+    for _ in range(cycles):
+        started_at = time.perf_counter()
+        recorder.pause()
+        pauses.append(time.perf_counter() - started_at)
+
+        started_at = time.perf_counter()
+        recorder.resume()
+        resumes.append(time.perf_counter() - started_at)
+
+    recorder.stop()
+
+    print(f"{backend or 'record'} backend, {cycles} capture toggles")
+    print("")
+    print(f"{'':<32} {'mean ms':>9} {'p50 ms':>9} {'max ms':>9}")
+    print(f"{'record() until recording':<32} {_summary(restarts)}")
+    print(f"{'stop()':<32} {_summary(stops)}")
+    print(f"{'join() after stop()':<32} {_summary(joins)}")
+    print(f"{'pause()':<32} {_summary(pauses)}")
+    print(f"{'resume() until recording':<32} {_summary(resumes)}")
+
+
+def _nothing(events):
+    pass
+
+
+if __name__ == "__main__":
+    run()
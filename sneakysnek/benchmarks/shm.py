@@ -0,0 +1,100 @@
+from sneakysnek.shm import RingWriter, RingReader, RECORD
+
+from sneakysnek.benchmarks.storage import synthetic_events
+
+import multiprocessing
+import time
+
+
+def _ring_consumer(name, count, results):
+    received = 0
+    polls = 0
+
+    with RingReader(name, start="oldest") as reader:
+        while received + reader.lost < count:
+            start, views = reader.views()
+
+            if not views[0]:
+                polls += 1
+                continue
+
+            # Walks every record in place, as a feature extractor reading fields would
+            for view in views:
+                for _ in RECORD.iter_unpack(view):
+                    received += 1
+
+            del view, views
+            received -= reader.release(start)
+
+        results.put((received, reader.lost, reader.overruns, polls))
+
+
+def _queue_consumer(queue, count, results):
+    received = 0
+
+    while received < count:
+        received += len(queue.get())
+
+    results.put((received, 0, 0, 0))
+
+
+def run_ring(events, batch_size=64, capacity=65536):
+    results = multiprocessing.Queue()
+
+    with RingWriter(capacity=capacity) as writer:
+        consumer = multiprocessing.Process(target=_ring_consumer, args=(writer.name, len(events), results))
+        consumer.start()
+
+        started_at = time.perf_counter()
+
+        for i in range(0, len(events), batch_size):
+            writer.write_many(events[i:i + batch_size])
+
+        received, lost, overruns, polls = results.get()
+        seconds = time.perf_counter() - started_at
+
+        consumer.join()
+
+    return received, lost, overruns, seconds
+
+
+def run_queue(events, batch_size=64):
+    queue = multiprocessing.Queue()
+    results = multiprocessing.Queue()
+
+    consumer = multiprocessing.Process(target=_queue_consumer, args=(queue, len(events), results))
+    consumer.start()
+
+    started_at = time.perf_counter()
+
+    for i in range(0, len(events), batch_size):
+        queue.put(events[i:i + batch_size])
+
+    received, _, _, _ = results.get()
+    seconds = time.perf_counter() - started_at
+
+    consumer.join()
+
+    return received, 0, 0, seconds
+
+
+def run(count=1000000, batch_size=64):
+    events = synthetic_events(count)
+
+    print(f"{count} events written by this process and consumed by another, in batches of {batch_size}")
+    print("")
+    print(f"{'transport':<34} {'events/s':>12} {'received':>10} {'lost':>8} {'overruns':>9}")
+
+    transports = [
+        ("multiprocessing.Queue (pickled)", lambda: run_queue(events, batch_size=batch_size)),
+        ("shm ring, 65536 records", lambda: run_ring(events, batch_size=batch_size)),
+        ("shm ring, 1024 records", lambda: run_ring(events, batch_size=batch_size, capacity=1024))
+    ]
+
+    for label, transport in transports:
+        received, lost, overruns, seconds = transport()
+        print(f"{label:<34} {count / seconds:>12,.0f} {received:>10} {lost:>8} {overruns:>9}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,72 @@
+from sneakysnek.keyboard_keys import KeyboardKey
+
+from sneakysnek.keyboard_event import KeyboardEvent, KeyboardEvents
+from sneakysnek.mouse_event import MouseEvent, MouseEvents
+
+from sneakysnek.storage import EventWriter, EventReader
+
+import os
+import random
+import tempfile
+import time
+
+
+def synthetic_events(count):
+    events = list()
+    monotonic_ns = time.monotonic_ns()
+
+    for i in range(count):
+        monotonic_ns += 1000000
+
+        if i % 50 == 0:
+            events.append(KeyboardEvent(KeyboardEvents.DOWN, KeyboardKey.KEY_W, monotonic_ns=monotonic_ns))
+        else:
+            events.append(MouseEvent(MouseEvents.MOVE, x=i % 1920, y=i % 1080, monotonic_ns=monotonic_ns))
+
+    return events
+
+
+def run(count=1000000, queries=1000):
+    events = synthetic_events(count)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "events.snek")
+
+        with EventWriter(path) as writer:
+            started_at = time.perf_counter()
+
+            for event in events:
+                writer.write(event)
+
+            write_seconds = time.perf_counter() - started_at
+
+        os.remove(path)
+
+        with EventWriter(path) as writer:
+            started_at = time.perf_counter()
+            writer.write_many(events)
+            write_many_seconds = time.perf_counter() - started_at
+
+        size = os.path.getsize(path)
+
+        with EventReader(path) as reader:
+            first_ns = events[0].monotonic_ns
+            span_ns = events[-1].monotonic_ns - first_ns
+
+            started_at = time.perf_counter()
+
+            for _ in range(queries):
+                start_ns = first_ns + random.randrange(span_ns)
+                list(reader.events_between(start_ns, start_ns + 100000000))
+
+            query_seconds = time.perf_counter() - started_at
+
+    print(f"Binary event log for {count} events ({size / (1024 * 1024):.1f} MiB)")
+    print("")
+    print(f"write()           {count / write_seconds:12,.0f} events/s")
+    print(f"write_many()      {count / write_many_seconds:12,.0f} events/s")
+    print(f"events_between()  {query_seconds / queries * 1000000:12,.1f} us per 100 ms range")
+
+
+if __name__ == "__main__":
+    run()
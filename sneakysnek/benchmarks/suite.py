@@ -0,0 +1,178 @@
+from sneakysnek.recorder import Recorder
+
+from sneakysnek.coalescer import MoveCoalescer
+from sneakysnek.dispatcher import EventDispatcher, OverflowPolicy
+
+from sneakysnek.recorders.synthetic_recorder import profiles
+
+import argparse
+import asyncio
+import time
+
+
+class Consumer:
+    """Measures delivery latency from each event's monotonic_ns, spending work_us of CPU per event"""
+
+    def __init__(self, work_us=0):
+        self.work_ns = int(work_us * 1000)
+
+        self.latencies = list()
+
+    @property
+    def delivered(self):
+        return len(self.latencies)
+
+    def __call__(self, event):
+        self.latencies.append(time.monotonic_ns() - event.monotonic_ns)
+
+        if self.work_ns:
+            _spin(self.work_ns)
+
+    def batch(self, events):
+        now_ns = time.monotonic_ns()
+
+        self.latencies.extend(now_ns - event.monotonic_ns for event in events)
+
+        if self.work_ns:
+            _spin(self.work_ns * len(events))
+
+    def percentile(self, q):
+        if not self.latencies:
+            return 0
+
+        values = sorted(self.latencies)
+        return values[min(len(values) - 1, int(len(values) * q / 100))]
+
+
+def _spin(duration_ns):
+    end_ns = time.monotonic_ns() + duration_ns
+
+    while time.monotonic_ns() < end_ns:
+        pass
+
+
+def _callback(consumer, **kwargs):
+    return Recorder.record(consumer, **kwargs)
+
+
+def _batch_callback(consumer, **kwargs):
+    return Recorder.record(batch_callback=consumer.batch, **kwargs)
+
+
+def _dispatcher(overflow, batched=False):
+    def record(consumer, **kwargs):
+        dispatcher = EventDispatcher(queue_size=1024, overflow=overflow)
+
+        if batched:
+            return Recorder.record(batch_callback=consumer.batch, dispatcher=dispatcher, **kwargs)
+
+        return Recorder.record(consumer, dispatcher=dispatcher, **kwargs)
+
+    return record
+
+
+def _coalescer(consumer, **kwargs):
+    return Recorder.record(consumer, coalescer=MoveCoalescer(move_rate_hz=240), **kwargs)
+
+
+def _asyncio(consumer, **kwargs):
+    async def consume():
+        async with Recorder.open(**kwargs) as recorder:
+            # Iteration ends once the backend stops after its seconds=
+            await _consume(recorder, consumer)
+
+            return recorder.recorder
+
+    return asyncio.run(consume())
+
+
+async def _consume(recorder, consumer):
+    async for batch in recorder.batches():
+        consumer.batch(batch)
+
+
+modes = {
+    "callback": _callback,
+    "batch_callback": _batch_callback,
+    "dispatcher": _dispatcher(OverflowPolicy.BLOCK),
+    "dispatcher_batched": _dispatcher(OverflowPolicy.BLOCK, batched=True),
+    "dispatcher_drop_oldest": _dispatcher(OverflowPolicy.DROP_OLDEST),
+    "dispatcher_drop_newest": _dispatcher(OverflowPolicy.DROP_NEWEST),
+    "dispatcher_coalesce_moves": _dispatcher(OverflowPolicy.COALESCE_MOVES),
+    "coalescer": _coalescer,
+    "asyncio": _asyncio
+}
+
+
+def run_mode(mode, profile="mixed", seconds=2.0, work_us=0):
+    consumer = Consumer(work_us=work_us)
+
+    started = time.perf_counter()
+
+    recorder = modes[mode](consumer, backend="synthetic", profile=profile, seconds=seconds)
+    recorder.wait()
+
+    # Stopping drains whatever the pipeline still holds
+    recorder.stop()
+
+    elapsed = time.perf_counter() - started
+
+    dropped = 0
+    coalesced = 0
+
+    if recorder.dispatcher is not None:
+        dropped += recorder.dispatcher.dropped
+        coalesced += recorder.dispatcher.coalesced
+
+    if recorder.coalescer is not None:
+        coalesced += recorder.coalescer.coalesced
+
+    return {
+        "mode": mode,
+        "generated": recorder.generated,
+        "delivered": consumer.delivered,
+        "events_per_second": consumer.delivered / elapsed,
+        "p50_us": consumer.percentile(50) / 1000,
+        "p99_us": consumer.percentile(99) / 1000,
+        "max_us": consumer.percentile(100) / 1000,
+        "dropped": dropped,
+        "coalesced": coalesced,
+        # Neither delivered nor accounted for by a drop policy or coalescing
+        "lost": recorder.generated - consumer.delivered - dropped - coalesced
+    }
+
+
+def run(profile="mixed", seconds=2.0, work_us=0, selected_modes=None):
+    print(f"Synthetic profile '{profile}' for {seconds} s, {work_us} us of consumer work per event")
+    print("")
+    print(f"{'mode':<28} {'generated':>10} {'delivered':>10} {'events/s':>12} {'p50 us':>10} {'p99 us':>10} {'max us':>10} {'dropped':>8} {'coalesced':>10} {'lost':>6}")
+
+    results = list()
+
+    for mode in (selected_modes or modes):
+        result = run_mode(mode, profile=profile, seconds=seconds, work_us=work_us)
+        results.append(result)
+
+        print(
+            f"{result['mode']:<28} {result['generated']:>10} {result['delivered']:>10} {result['events_per_second']:>12,.0f} "
+            f"{result['p50_us']:>10.1f} {result['p99_us']:>10.1f} {result['max_us']:>10.1f} {result['dropped']:>8} {result['coalesced']:>10} {result['lost']:>6}"
+        )
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="sneakysnek-bench", description="Throughput, latency and drops of each delivery mode under a synthetic input load")
+
+    parser.add_argument("--profile", default="mixed", choices=sorted(profiles))
+    parser.add_argument("--seconds", type=float, default=2.0)
+    parser.add_argument("--work-us", type=float, default=0, help="CPU time the consumer spends per event")
+    parser.add_argument("--mode", action="append", choices=list(modes), help="Delivery mode to run, repeatable (default: all)")
+
+    args = parser.parse_args()
+
+    run(profile=args.profile, seconds=args.seconds, work_us=args.work_us, selected_modes=args.mode)
+
+
+if __name__ == "__main__":
+    main()
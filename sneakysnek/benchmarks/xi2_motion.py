@@ -0,0 +1,59 @@
+from sneakysnek.recorder import Recorder
+
+from sneakysnek.mouse_event import MouseEvents
+
+import time
+
+import Xlib.X
+import Xlib.display
+import Xlib.ext.xtest
+
+
+def inject_motion(display, count=1000, step=3):
+    """Relative XTest motion, back and forth so the cursor never reaches a screen edge"""
+    for i in range(count):
+        dx = step if (i // 50) % 2 == 0 else -step
+
+        Xlib.ext.xtest.fake_input(display, Xlib.X.MotionNotify, detail=True, x=dx, y=0)
+
+        if i % 50 == 49:
+            display.sync()
+
+    display.sync()
+
+
+def run(count=1000, step=3, backend="xi2"):
+    display = Xlib.display.Display()
+
+    screen = display.screen()
+    screen.root.warp_pointer(screen.width_in_pixels // 2, screen.height_in_pixels // 2)
+    display.sync()
+
+    moves = list()
+
+    recorder = Recorder.record(batch_callback=lambda events: moves.extend(e for e in events if e.event is MouseEvents.MOVE), backend=backend)
+
+    # Let the backend select its events before injecting any
+    time.sleep(0.5)
+
+    started = time.perf_counter()
+    inject_motion(display, count=count, step=step)
+
+    deadline = time.perf_counter() + 5
+
+    while len(moves) < count and time.perf_counter() < deadline:
+        time.sleep(0.01)
+
+    elapsed = time.perf_counter() - started
+
+    recorder.stop()
+    display.close()
+
+    print(f"{backend} backend: {len(moves)} of {count} XTest motions delivered in {elapsed:.3f} s")
+
+    if moves and moves[0].dx is not None:
+        print(f"Sum of raw dx: {sum(e.dx for e in moves):.1f} (expected 0.0), |dx| per event: {sorted({abs(e.dx) for e in moves})}")
+
+
+if __name__ == "__main__":
+    run()
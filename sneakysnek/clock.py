@@ -0,0 +1,198 @@
+import collections
+
+
+# 2 ** 32 ms
+WRAP_NS = 0x100000000 * 1000000
+
+
+class ServerClock:
+    """Maps a wrapping 32-bit millisecond clock (X server time) onto time.monotonic_ns
+
+    The offset between the two clocks is the smallest receive delay seen per bucket_ms, which is the sample least
+    disturbed by queuing. A line fitted through the last window_buckets of those minima tracks drift between the clocks.
+    observe() feeds the estimate, once per batch of events read together; correct() maps each event with it.
+    """
+
+    def __init__(self, bucket_ms=1000, window_buckets=60):
+        self.bucket_ns = bucket_ms * 1000000
+        self.window_buckets = window_buckets
+
+        self.samples = 0
+
+        # (source_ns, min offset_ns) per closed bucket
+        self.buckets = collections.deque(maxlen=window_buckets)
+
+        self.offset_ns = None
+
+        self._epoch_ns = 0
+        self._last_ms = None
+
+        self._bucket_end_ns = None
+        self._bucket_offset_ns = None
+        self._bucket_source_ns = None
+
+        self._min_offset_ns = None
+
+        self._reference_ns = 0
+        self._intercept_ns = None
+        self._slope = 0.0
+
+    @property
+    def drift_ppm(self):
+        return self._slope * 1000000
+
+    def observe(self, source_ms, received_ns):
+        """Takes the newest source timestamp of a batch received at received_ns; returns it in ns, unwrapped"""
+        if self._last_ms is not None and source_ms < self._last_ms - 0x80000000:
+            self._epoch_ns += WRAP_NS
+
+        self._last_ms = source_ms
+
+        source_ns = self._epoch_ns + (source_ms * 1000000)
+        offset_ns = received_ns - source_ns
+
+        self.samples += 1
+
+        if self._bucket_end_ns is None:
+            self._bucket_end_ns = received_ns + self.bucket_ns
+        elif received_ns >= self._bucket_end_ns:
+            self._close_bucket(received_ns)
+
+        if self._bucket_offset_ns is None or offset_ns < self._bucket_offset_ns:
+            self._bucket_offset_ns = offset_ns
+            self._bucket_source_ns = source_ns
+
+        if self._intercept_ns is None:
+            if self._min_offset_ns is None or offset_ns < self._min_offset_ns:
+                self._min_offset_ns = offset_ns
+
+            self.offset_ns = self._min_offset_ns
+        else:
+            self.offset_ns = int(self._intercept_ns + self._slope * (source_ns - self._reference_ns))
+
+        return source_ns
+
+    def correct(self, source_ms, received_ns):
+        """(source_ns, corrected monotonic_ns) for an event of the batch last observed, never later than received_ns"""
+        source_ns = self._epoch_ns + (source_ms * 1000000)
+
+        # Later than the newest timestamp of its batch: stamped before the clock wrapped
+        if source_ms > self._last_ms:
+            source_ns -= WRAP_NS
+
+        monotonic_ns = source_ns + self.offset_ns
+
+        return source_ns, monotonic_ns if monotonic_ns < received_ns else received_ns
+
+    def _close_bucket(self, received_ns):
+        if self._bucket_offset_ns is not None:
+            self.buckets.append((self._bucket_source_ns, self._bucket_offset_ns))
+
+        self._bucket_end_ns = received_ns + self.bucket_ns
+        self._bucket_offset_ns = None
+
+        if len(self.buckets) >= 2:
+            self._fit()
+
+    def _fit(self):
+        # Least squares over the bucket minima, relative to the newest one to keep the floats small
+        self._reference_ns = self.buckets[-1][0]
+
+        xs = [source_ns - self._reference_ns for source_ns, _ in self.buckets]
+        ys = [offset_ns for _, offset_ns in self.buckets]
+
+        count = len(xs)
+        mean_x = sum(xs) / count
+        mean_y = sum(ys) / count
+
+        variance = sum((x - mean_x) ** 2 for x in xs)
+
+        if variance:
+            self._slope = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / variance
+        else:
+            self._slope = 0.0
+
+        self._intercept_ns = mean_y - self._slope * mean_x
+
+
+class LatencyHistogram:
+    """Power-of-two microsecond buckets: bucket i counts latencies below 2 ** i us (bucket 0 is under 1 us)"""
+
+    def __init__(self, buckets=32):
+        self.counts = [0] * buckets
+
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def observe(self, latency_ns, count=1):
+        if latency_ns < 0:
+            latency_ns = 0
+
+        index = (latency_ns // 1000).bit_length()
+
+        if index >= len(self.counts):
+            index = len(self.counts) - 1
+
+        self.counts[index] += count
+
+        self.count += count
+        self.total_ns += latency_ns * count
+
+        if latency_ns > self.max_ns:
+            self.max_ns = latency_ns
+
+    def observe_many(self, latencies_ns):
+        counts = self.counts
+        last = len(counts) - 1
+
+        total_ns = 0
+        max_ns = self.max_ns
+
+        for latency_ns in latencies_ns:
+            if latency_ns < 0:
+                latency_ns = 0
+
+            index = (latency_ns // 1000).bit_length()
+            counts[index if index < last else last] += 1
+
+            total_ns += latency_ns
+
+            if latency_ns > max_ns:
+                max_ns = latency_ns
+
+        self.count += len(latencies_ns)
+        self.total_ns += total_ns
+        self.max_ns = max_ns
+
+    def percentile(self, q):
+        """Upper bound, in ns, of the bucket holding the q-th percentile"""
+        if not self.count:
+            return 0
+
+        target = self.count * q / 100
+        seen = 0
+
+        for index, count in enumerate(self.counts):
+            seen += count
+
+            if seen >= target and count:
+                return min((1 << index) * 1000, self.max_ns)
+
+        return self.max_ns
+
+    @property
+    def mean_ns(self):
+        return self.total_ns / self.count if self.count else 0
+
+    def stats(self):
+        return {
+            "count": self.count,
+            "mean_ns": self.mean_ns,
+            "p50_ns": self.percentile(50),
+            "p99_ns": self.percentile(99),
+            "max_ns": self.max_ns
+        }
+
+    def __str__(self):
+        return f"LatencyHistogram - {self.count} samples - mean {self.mean_ns / 1000:.1f} us - p50 < {self.percentile(50) / 1000:.0f} us - p99 < {self.percentile(99) / 1000:.0f} us - max {self.max_ns / 1000:.1f} us"
@@ -0,0 +1,269 @@
+from sneakysnek.mouse_event import MouseEvent, DetailedMouseEvent, MouseEvents
+
+import threading
+import time
+
+
+class MoveCoalescer:
+    """Collapses bursts of MouseEvents.MOVE into single events without reordering them relative to other events"""
+
+    def __init__(self, move_rate_hz=None, min_pixel_delta=None, max_hold_ms=100):
+        if move_rate_hz is None and min_pixel_delta is None:
+            raise ValueError("At least one of move_rate_hz or min_pixel_delta is required")
+
+        self.move_rate_hz = move_rate_hz
+        self.min_pixel_delta = min_pixel_delta
+        self.max_hold_ms = max_hold_ms
+
+        self.interval_ns = int(1000000000 / move_rate_hz) if move_rate_hz else 0
+        self.max_hold_ns = None if max_hold_ms is None else int(max_hold_ms * 1000000)
+
+        self.callback = None
+        self.batch_callback = None
+
+        self.is_running = False
+        self.thread = None
+
+        self.received = 0
+        self.delivered = 0
+        self.coalesced = 0
+
+        self._pending = None
+        self._pending_since_ns = None
+
+        # Callbacks run outside the lock, on whichever thread finds nobody delivering; the others only append
+        self._outbox = list()
+        self._delivering = False
+
+        self._x = None
+        self._y = None
+
+        # Display of _x / _y, and the last positions on the others when events come from several displays
+        self._display = None
+        self._positions = dict()
+        self._last_move_ns = None
+
+        self._lock = threading.RLock()
+        self._has_pending = threading.Condition(self._lock)
+
+    def stats(self):
+        return {
+            "received": self.received,
+            "delivered": self.delivered,
+            "coalesced": self.coalesced
+        }
+
+    def start(self, callback, batch_callback=None):
+        self.callback = callback
+        self.batch_callback = batch_callback
+        self.is_running = True
+
+        # Releases trailing moves once their interval has elapsed, or once they were held back for max_hold_ms
+        if self.interval_ns or self.max_hold_ns is not None:
+            self.thread = threading.Thread(target=self._flush_when_due, args=(), name="sneakysnek-coalescer")
+            self.thread.daemon = True
+            self.thread.start()
+
+    def stop(self, timeout=None):
+        with self._lock:
+            self.is_running = False
+            self._has_pending.notify_all()
+
+            self._flush()
+
+        self._deliver_outbox()
+
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+        self._deliver_outbox()
+
+    def put(self, event):
+        with self._lock:
+            self._put(event)
+
+        self._deliver_outbox()
+
+    def put_batch(self, events):
+        with self._lock:
+            for event in events:
+                self._put(event)
+
+        self._deliver_outbox()
+
+    def _put(self, event):
+        self.received += 1
+
+        if event.display != self._display:
+            self._switch_display(event.display)
+
+        if event.event is not MouseEvents.MOVE:
+            self._flush()
+
+            if isinstance(event, MouseEvent):
+                self._x = event.x
+                self._y = event.y
+
+            self._deliver(event)
+            return
+
+        pending = self._pending
+
+        if pending is not None:
+            pending.x = event.x
+            pending.y = event.y
+            pending.samples += 1
+
+            # Deltas reported by the backend (relative motion) are summed rather than derived from positions
+            if event.dx is not None:
+                pending.dx = event.dx if pending.dx is None else pending.dx + event.dx
+                pending.dy = event.dy if pending.dy is None else pending.dy + event.dy
+
+            pending.timestamp = event.timestamp
+            pending.monotonic_ns = event.monotonic_ns
+            pending.received_ns = event.received_ns
+            pending.source_ns = event.source_ns
+
+            self.coalesced += 1
+        else:
+            pending = DetailedMouseEvent(
+                MouseEvents.MOVE,
+                x=event.x,
+                y=event.y,
+                dx=event.dx,
+                dy=event.dy,
+                samples=1,
+                timestamp=event.timestamp,
+                monotonic_ns=event.monotonic_ns,
+                received_ns=event.received_ns,
+                source_ns=event.source_ns,
+                display=event.display
+            )
+
+            self._pending = pending
+            self._pending_since_ns = time.monotonic_ns()
+            self._has_pending.notify()
+
+        if self._is_due(pending, pending.monotonic_ns):
+            self._flush()
+
+    def _switch_display(self, display):
+        """Moves are never merged across displays, and their deltas are taken on their own display"""
+        self._flush()
+
+        self._positions[self._display] = (self._x, self._y)
+        self._x, self._y = self._positions.get(display, (None, None))
+
+        self._display = display
+
+    def _is_due(self, pending, monotonic_ns):
+        if self.interval_ns and self._last_move_ns is not None and monotonic_ns - self._last_move_ns < self.interval_ns:
+            return False
+
+        if self.min_pixel_delta and self._x is not None:
+            if abs(pending.x - self._x) < self.min_pixel_delta and abs(pending.y - self._y) < self.min_pixel_delta:
+                return False
+
+        return True
+
+    def _flush(self):
+        pending = self._pending
+
+        if pending is None:
+            return
+
+        self._pending = None
+
+        if pending.dx is None:
+            if self._x is None:
+                pending.dx = 0
+                pending.dy = 0
+            else:
+                pending.dx = pending.x - self._x
+                pending.dy = pending.y - self._y
+
+        self._x = pending.x
+        self._y = pending.y
+        self._last_move_ns = pending.monotonic_ns
+
+        self._deliver(pending)
+
+    def _deliver(self, event):
+        self.delivered += 1
+        self._outbox.append(event)
+
+    def _deliver_outbox(self):
+        """Runs the callbacks outside the lock, in order: a thread that finds another one delivering leaves its events to it"""
+        with self._lock:
+            if self._delivering or not self._outbox:
+                return
+
+            self._delivering = True
+
+        try:
+            while True:
+                with self._lock:
+                    events = self._outbox
+
+                    if not events:
+                        self._delivering = False
+                        return
+
+                    self._outbox = list()
+
+                if self.batch_callback is None:
+                    for event in events:
+                        self.callback(event)
+                else:
+                    self.batch_callback(events)
+        except BaseException:
+            with self._lock:
+                self._delivering = False
+
+            raise
+
+    def _flush_when_due(self):
+        while True:
+            with self._lock:
+                if not self.is_running:
+                    return
+
+                wait_ns = self._due_in_ns()
+
+                if wait_ns is None:
+                    self._has_pending.wait()
+                    continue
+
+                if wait_ns > 0:
+                    self._has_pending.wait(wait_ns / 1000000000)
+                    continue
+
+                self._flush()
+
+            self._deliver_outbox()
+
+    def _due_in_ns(self):
+        """Nanoseconds until the pending move is released, None while nothing is pending or it waits for the next event"""
+        if self._pending is None:
+            return None
+
+        now_ns = time.monotonic_ns()
+
+        if self.interval_ns and self._last_move_ns is not None:
+            wait_ns = self._last_move_ns + self.interval_ns - now_ns
+
+            if wait_ns > 0:
+                return wait_ns
+
+        if self._is_due(self._pending, now_ns):
+            return 0
+
+        # Below min_pixel_delta: the next event moves the cursor further, or the move is released after max_hold_ms
+        if self.max_hold_ns is None:
+            return None
+
+        return max(0, self._pending_since_ns + self.max_hold_ns - now_ns)
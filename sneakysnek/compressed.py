@@ -0,0 +1,443 @@
+from sneakysnek import storage
+
+import lzma
+import os
+import struct
+import threading
+import zlib
+
+
+MAGIC = b"SNKZ"
+VERSION = 1
+
+# magic, version, codec, reserved
+HEADER = struct.Struct("<4sHH8x")
+
+# compressed size, event count, crc32 of the compressed payload, first and last monotonic_ns
+BLOCK = struct.Struct("<IIIqq")
+
+# Byte sizes of the payload sections, in the order below
+SECTIONS = struct.Struct("<7I")
+
+# How a block codes its timestamp column
+TIMESTAMPS_XOR = 0
+TIMESTAMPS_PREDICTED = 1
+
+CODEC_ZLIB = 0
+CODEC_LZMA = 1
+
+codecs = {
+    "zlib": CODEC_ZLIB,
+    "lzma": CODEC_LZMA
+}
+
+
+class BlockInfo:
+
+    __slots__ = ("offset", "size", "count", "crc32", "first_ns", "last_ns")
+
+    def __init__(self, offset, size, count, crc32, first_ns, last_ns):
+        self.offset = offset
+        self.size = size
+        self.count = count
+        self.crc32 = crc32
+        self.first_ns = first_ns
+        self.last_ns = last_ns
+
+    def __repr__(self):
+        return f"BlockInfo(offset={self.offset}, size={self.size}, count={self.count}, first_ns={self.first_ns}, last_ns={self.last_ns})"
+
+
+class CompressedWriter:
+    """Appends events to a log of independently compressed blocks of delta / varint coded columns
+
+    Each block holds up to block_events events and decodes on its own: timestamps, coordinates and the rest restart
+    from absolute values at every block. flush() closes the current block early, so a recording can be read while
+    it is still being appended to. Requires numpy.
+    """
+
+    def __init__(self, path, codec="zlib", level=None, block_events=65536):
+        if codec not in codecs:
+            raise storage.StorageError(f"Unknown codec '{codec}', expected one of {sorted(codecs)}")
+
+        if block_events < 1:
+            raise ValueError("block_events must be at least 1")
+
+        self.path = path
+        self.level = level
+        self.block_events = block_events
+
+        self.count = 0
+        self.blocks = 0
+
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+
+        self._pending = list()
+        self._lock = threading.Lock()
+
+        self.file = open(path, "ab")
+
+        if self.file.tell() == 0:
+            self.codec = codec
+            self.file.write(HEADER.pack(MAGIC, VERSION, codecs[codec]))
+        else:
+            # Appending keeps the codec the log was started with
+            with CompressedReader(path) as reader:
+                self.codec = reader.codec
+                self.count = len(reader)
+                self.blocks = len(reader.blocks)
+
+                end = reader.end
+
+            if end != self.file.tell():
+                # A block torn by a crash: later blocks go after the last complete one
+                self.file.truncate(end)
+                self.file.seek(end)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __call__(self, event):
+        self.write(event)
+
+    def write(self, event):
+        with self._lock:
+            self._pending.append(storage.encode(event))
+            self.count += 1
+
+            if len(self._pending) >= self.block_events:
+                self._write_pending()
+
+    def write_many(self, events):
+        encode = storage.encode
+
+        with self._lock:
+            for event in events:
+                self._pending.append(encode(event))
+                self.count += 1
+
+                if len(self._pending) >= self.block_events:
+                    self._write_pending()
+
+    def write_records(self, records):
+        """Appends a structured array of storage records, e.g. EventReader.to_numpy(), block by block"""
+        with self._lock:
+            self._write_pending()
+
+            for start in range(0, len(records), self.block_events):
+                self._write_block(records[start:start + self.block_events])
+
+            self.count += len(records)
+
+    def flush(self):
+        with self._lock:
+            self._write_pending()
+            self.file.flush()
+
+    def close(self):
+        if self.file.closed:
+            return
+
+        self.flush()
+        self.file.close()
+
+    def _write_pending(self):
+        if not self._pending:
+            return
+
+        import numpy as np
+
+        records = np.array(self._pending, dtype=storage.numpy_dtype())
+        self._pending = list()
+
+        self._write_block(records)
+
+    def _write_block(self, records):
+        if not len(records):
+            return
+
+        payload = encode_block(records)
+
+        if self.codec == "lzma":
+            data = lzma.compress(payload, preset=6 if self.level is None else self.level)
+        else:
+            data = zlib.compress(payload, 6 if self.level is None else self.level)
+
+        # One write per block, so a reader never sees a header without its payload unless the process died mid-write
+        self.file.write(BLOCK.pack(len(data), len(records), zlib.crc32(data), int(records["monotonic_ns"][0]), int(records["monotonic_ns"][-1])) + data)
+
+        self.blocks += 1
+        self.raw_bytes += len(records) * storage.RECORD.size
+        self.compressed_bytes += BLOCK.size + len(data)
+
+
+class CompressedReader:
+    """Indexes the blocks of a compressed log, decompressing any of them on demand. Requires numpy."""
+
+    def __init__(self, path):
+        self.path = path
+
+        self.file = open(path, "rb")
+
+        header = self.file.read(HEADER.size)
+
+        if len(header) < HEADER.size:
+            raise storage.StorageError("Truncated compressed log header")
+
+        magic, version, codec = HEADER.unpack(header)
+
+        if magic != MAGIC:
+            raise storage.StorageError("Not a sneakysnek compressed log")
+
+        if version != VERSION or codec not in codecs.values():
+            raise storage.StorageError(f"Unsupported compressed log version {version} with codec {codec}")
+
+        self.codec = [name for name, value in codecs.items() if value == codec][0]
+
+        self.blocks = list()
+        self.count = 0
+
+        # Offset just past the last complete block
+        self.end = HEADER.size
+
+        self.refresh()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        return self.events()
+
+    def refresh(self):
+        """Picks up blocks appended since the log was opened; returns how many"""
+        size = os.fstat(self.file.fileno()).st_size
+        added = 0
+
+        while self.end + BLOCK.size <= size:
+            self.file.seek(self.end)
+            block_size, count, crc32, first_ns, last_ns = BLOCK.unpack(self.file.read(BLOCK.size))
+
+            # Still being written, or torn
+            if self.end + BLOCK.size + block_size > size:
+                break
+
+            self.blocks.append(BlockInfo(self.end + BLOCK.size, block_size, count, crc32, first_ns, last_ns))
+
+            self.count += count
+            self.end += BLOCK.size + block_size
+
+            added += 1
+
+        return added
+
+    def block(self, index):
+        """Structured array of storage records (storage.numpy_dtype()) of one block, decompressing only that block"""
+        info = self.blocks[index]
+
+        self.file.seek(info.offset)
+        data = self.file.read(info.size)
+
+        if zlib.crc32(data) != info.crc32:
+            raise storage.StorageError(f"Block {index} of '{self.path}' is corrupt")
+
+        payload = lzma.decompress(data) if self.codec == "lzma" else zlib.decompress(data)
+
+        return decode_block(payload, info.count, info.first_ns)
+
+    def to_numpy(self):
+        import numpy as np
+
+        if not self.blocks:
+            return np.empty(0, dtype=storage.numpy_dtype())
+
+        return np.concatenate([self.block(index) for index in range(len(self.blocks))])
+
+    def records(self, start_block=0, stop_block=None):
+        for index in range(start_block, len(self.blocks) if stop_block is None else stop_block):
+            yield from self.block(index).tolist()
+
+    def events(self, start_block=0, stop_block=None):
+        for record in self.records(start_block, stop_block):
+            yield storage.decode(record)
+
+    def events_between(self, start_ns, end_ns):
+        """Events with start_ns <= monotonic_ns < end_ns, decompressing only the blocks that overlap the range"""
+        for index, info in enumerate(self.blocks):
+            if info.last_ns < start_ns or info.first_ns >= end_ns:
+                continue
+
+            records = self.block(index)
+            monotonic_ns = records["monotonic_ns"]
+
+            for record in records[(monotonic_ns >= start_ns) & (monotonic_ns < end_ns)].tolist():
+                yield storage.decode(record)
+
+    def close(self):
+        self.file.close()
+
+
+def encode_block(records):
+    """Delta / zigzag varint coded columns of a structured array of storage records, before compression"""
+    import numpy as np
+
+    kinds = records["kind"]
+    is_mouse = kinds >= storage.KIND_MOUSE_CLICK
+    is_move = kinds == storage.KIND_MOUSE_MOVE
+
+    # Kind and direction as one symbol, run-length encoded: long runs of moves collapse to a couple of bytes
+    symbols = (kinds.astype(np.uint64) << 2) | records["direction"]
+    starts = np.flatnonzero(np.concatenate([[True], symbols[1:] != symbols[:-1]]))
+    runs = np.diff(np.append(starts, len(symbols)))
+
+    symbol_runs = np.empty(len(starts) * 2, dtype=np.uint64)
+    symbol_runs[0::2] = symbols[starts]
+    symbol_runs[1::2] = runs
+
+    # Coordinates only mean something on mouse events, so deltas run from one mouse event to the next
+    x = records["x"][is_mouse].astype(np.int64)
+    y = records["y"][is_mouse].astype(np.int64)
+
+    monotonic_ns = records["monotonic_ns"].astype(np.int64)
+
+    timestamps = records["timestamp"].astype("<f8")
+
+    sections = [
+        _varints(np, symbol_runs),
+        _varints(np, records["code"][~is_move].astype(np.uint64)),
+        _varints(np, _zigzag(np, np.diff(x, prepend=0))),
+        _varints(np, _zigzag(np, np.diff(y, prepend=0))),
+        _varints(np, _zigzag(np, records["velocity"][is_mouse & ~is_move].astype(np.int64))),
+        _varints(np, _zigzag(np, np.diff(monotonic_ns, prepend=monotonic_ns[0]))),
+        _timestamps(np, timestamps, monotonic_ns)
+    ]
+
+    return SECTIONS.pack(*[len(section) for section in sections]) + b"".join(sections)
+
+
+def decode_block(payload, count, first_ns):
+    import numpy as np
+
+    sizes = SECTIONS.unpack_from(payload)
+    data = np.frombuffer(payload, dtype=np.uint8, offset=SECTIONS.size)
+
+    sections = list()
+    offset = 0
+
+    for size in sizes:
+        sections.append(data[offset:offset + size])
+        offset += size
+
+    symbol_runs = _unvarints(np, sections[0])
+    symbols = np.repeat(symbol_runs[0::2], symbol_runs[1::2].astype(np.int64))
+
+    if len(symbols) != count:
+        raise storage.StorageError(f"Block holds {len(symbols)} events instead of {count}")
+
+    records = np.zeros(count, dtype=storage.numpy_dtype())
+
+    kinds = (symbols >> 2).astype(np.uint8)
+
+    records["kind"] = kinds
+    records["direction"] = symbols & 3
+
+    is_mouse = kinds >= storage.KIND_MOUSE_CLICK
+    is_move = kinds == storage.KIND_MOUSE_MOVE
+
+    records["code"] = storage.NO_CODE
+    records["code"][~is_move] = _unvarints(np, sections[1])
+
+    records["x"][is_mouse] = np.cumsum(_unzigzag(np, _unvarints(np, sections[2])))
+    records["y"][is_mouse] = np.cumsum(_unzigzag(np, _unvarints(np, sections[3])))
+
+    records["velocity"][is_mouse & ~is_move] = _unzigzag(np, _unvarints(np, sections[4]))
+
+    records["monotonic_ns"] = first_ns + np.cumsum(_unzigzag(np, _unvarints(np, sections[5])))
+    timestamps = _unvarints(np, sections[6])
+
+    if timestamps[0] == TIMESTAMPS_PREDICTED:
+        predicted = timestamps[1:2].view("<f8") + records["monotonic_ns"] / 1e9
+        records["timestamp"] = (predicted.view(np.int64) + _unzigzag(np, timestamps[2:])).view("<f8")
+    else:
+        records["timestamp"] = np.bitwise_xor.accumulate(timestamps[1:]).view("<f8")
+
+    return records
+
+
+def _zigzag(np, values):
+    values = values.astype(np.int64)
+    return ((values << 1) ^ (values >> 63)).view(np.uint64)
+
+
+def _unzigzag(np, values):
+    return (values >> np.uint64(1)).view(np.int64) ^ -(values & np.uint64(1)).view(np.int64)
+
+
+def _timestamps(np, timestamps, monotonic_ns):
+    """Varints of the timestamp column, whichever of the two codings is shorter for this block"""
+    # Wall clock time sampled along with monotonic_ns: only its distance in ulps from offset + monotonic_ns / 1e9
+    offset = timestamps[:1] - monotonic_ns[:1] / 1e9
+    residuals = timestamps.view(np.int64) - (offset + monotonic_ns / 1e9).view(np.int64)
+
+    predicted = _varints(np, np.concatenate([[np.uint64(TIMESTAMPS_PREDICTED)], offset.view(np.uint64), _zigzag(np, residuals)]))
+
+    # Otherwise successive timestamps still share their sign, exponent and high mantissa bits
+    bits = timestamps.view(np.uint64)
+    xored = _varints(np, np.concatenate([[np.uint64(TIMESTAMPS_XOR)], bits[:1], bits[1:] ^ bits[:-1]]))
+
+    return predicted if len(predicted) <= len(xored) else xored
+
+
+def _varints(np, values):
+    """LEB128 bytes of an array of uint64, all at once"""
+    if not len(values):
+        return b""
+
+    values = values.astype(np.uint64)
+
+    lengths = np.ones(len(values), dtype=np.int64)
+
+    for index in range(1, 10):
+        lengths += values >= np.uint64(1 << (7 * index))
+
+    out = np.empty(int(lengths.sum()), dtype=np.uint8)
+    starts = np.cumsum(lengths) - lengths
+
+    for index in range(10):
+        selected = lengths > index
+
+        if not selected.any():
+            break
+
+        chunk = (values[selected] >> np.uint64(7 * index)) & np.uint64(0x7F)
+        more = (lengths[selected] > index + 1).astype(np.uint64) << np.uint64(7)
+
+        out[starts[selected] + index] = chunk | more
+
+    return out.tobytes()
+
+
+def _unvarints(np, data):
+    """uint64 array out of consecutive LEB128 varints"""
+    ends = np.flatnonzero(data < 0x80)
+
+    if not len(ends):
+        return np.empty(0, dtype=np.uint64)
+
+    starts = np.concatenate([[0], ends[:-1] + 1])
+
+    lengths = ends - starts + 1
+    positions = np.arange(ends[-1] + 1) - np.repeat(starts, lengths)
+
+    contributions = (data[:ends[-1] + 1] & 0x7F).astype(np.uint64) << (positions * 7).astype(np.uint64)
+
+    return np.add.reduceat(contributions, starts)
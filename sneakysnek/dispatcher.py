@@ -0,0 +1,168 @@
+import collections
+import enum
+import threading
+
+from sneakysnek.mouse_event import MouseEvents
+
+
+class OverflowPolicy(enum.Enum):
+    BLOCK = "BLOCK"
+    DROP_OLDEST = "DROP_OLDEST"
+    DROP_NEWEST = "DROP_NEWEST"
+    COALESCE_MOVES = "COALESCE_MOVES"
+
+
+class EventDispatcher:
+    """Bounded ring buffer between capture threads and user callbacks, drained by worker threads"""
+
+    def __init__(self, queue_size=4096, workers=1, overflow=OverflowPolicy.BLOCK, max_batch_size=1024):
+        if queue_size < 1:
+            raise ValueError("queue_size must be at least 1")
+
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+
+        self.queue_size = queue_size
+        self.workers = workers
+        self.overflow = overflow
+        self.max_batch_size = max_batch_size
+
+        self.callback = None
+        self.batch_callback = None
+
+        self.is_running = False
+        self.threads = list()
+
+        self.enqueued = 0
+        self.dispatched = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.max_depth = 0
+
+        self._queue = collections.deque()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+
+    @property
+    def depth(self):
+        return len(self._queue)
+
+    def stats(self):
+        return {
+            "enqueued": self.enqueued,
+            "dispatched": self.dispatched,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "max_depth": self.max_depth,
+            "depth": self.depth
+        }
+
+    def start(self, callback, batch_callback=None):
+        self.callback = callback
+        self.batch_callback = batch_callback
+        self.is_running = True
+
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, args=(), name=f"sneakysnek-dispatcher-{i}")
+            thread.daemon = True
+            thread.start()
+
+            self.threads.append(thread)
+
+    def stop(self, timeout=None):
+        with self._lock:
+            self.is_running = False
+
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+
+        current_thread = threading.current_thread()
+
+        for thread in self.threads:
+            if thread is not current_thread:
+                thread.join(timeout)
+
+    def put(self, event):
+        with self._lock:
+            return self._put(event)
+
+    def put_batch(self, events):
+        with self._lock:
+            for event in events:
+                self._put(event)
+
+    def _put(self, event):
+        if not self.is_running:
+            self.dropped += 1
+            return False
+
+        if len(self._queue) >= self.queue_size:
+            if not self._make_room(event):
+                return False
+
+            if not self.is_running:
+                self.dropped += 1
+                return False
+
+        self._queue.append(event)
+        self.enqueued += 1
+
+        depth = len(self._queue)
+
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+        self._not_empty.notify()
+
+        return True
+
+    def _make_room(self, event):
+        if self.overflow == OverflowPolicy.BLOCK:
+            # A worker putting from its own callback would wait for itself: its event goes in over the limit
+            if threading.current_thread() in self.threads:
+                return True
+
+            while self.is_running and len(self._queue) >= self.queue_size:
+                self._not_full.wait()
+        elif self.overflow == OverflowPolicy.DROP_NEWEST:
+            self.dropped += 1
+            return False
+        elif self.overflow == OverflowPolicy.COALESCE_MOVES and _is_move(event) and _is_move(self._queue[-1]):
+            self._queue[-1] = event
+            self.coalesced += 1
+            return False
+        else:
+            self._queue.popleft()
+            self.dropped += 1
+
+        return True
+
+    def _work(self):
+        queue = self._queue
+
+        while True:
+            with self._lock:
+                while self.is_running and not queue:
+                    self._not_empty.wait()
+
+                if not queue:
+                    return
+
+                if self.batch_callback is None:
+                    event = queue.popleft()
+                    self.dispatched += 1
+                else:
+                    batch = [queue.popleft() for _ in range(min(len(queue), self.max_batch_size))]
+                    self.dispatched += len(batch)
+
+                self._not_full.notify_all()
+
+            if self.batch_callback is None:
+                self.callback(event)
+            else:
+                self.batch_callback(batch)
+
+
+def _is_move(event):
+    return getattr(event, "event", None) == MouseEvents.MOVE
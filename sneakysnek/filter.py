@@ -0,0 +1,121 @@
+from sneakysnek.keyboard_event import KeyboardEvent, KeyboardEvents
+from sneakysnek.mouse_event import MouseEvents
+
+import threading
+
+
+class EventFilter:
+    """Which events a recorder delivers. Every criterion left as None lets everything through.
+
+    kinds: KeyboardEvents and MouseEvents members to deliver
+    keys: KeyboardKeys whose keyboard events are delivered
+    buttons: MouseButtons whose clicks are delivered
+    region: (x, y, width, height) of the screen area mouse events must fall in
+
+    keys, buttons and region only restrict the events they apply to: a keys filter lets every mouse event through.
+    Backends that can push the filter down apply it before building events, or ask the OS not to send them at all.
+    Others get it applied to their events right before the callback.
+    """
+
+    def __init__(self, kinds=None, keys=None, buttons=None, region=None):
+        if kinds is not None:
+            kinds = list(kinds)
+
+            for kind in kinds:
+                if kind.__class__ is not KeyboardEvents and kind.__class__ is not MouseEvents:
+                    raise ValueError(f"Expected KeyboardEvents or MouseEvents members in kinds, got {kind!r}")
+
+            if not kinds:
+                raise ValueError("kinds must not be empty")
+
+        if region is not None:
+            x, y, width, height = region
+
+            if width <= 0 or height <= 0:
+                raise ValueError("region width and height must be positive")
+
+        self.kinds = kinds
+        self.keys = None if keys is None else list(keys)
+        self.buttons = None if buttons is None else list(buttons)
+        self.region = None if region is None else tuple(region)
+
+        # Keyed by value: the kinds of both enumerations have distinct values, see keyboard_key_ordinals
+        self.kind_values = None if kinds is None else frozenset(kind._value_ for kind in kinds)
+        self.key_values = None if keys is None else frozenset(key._value_ for key in self.keys)
+        self.button_values = None if buttons is None else frozenset(button._value_ for button in self.buttons)
+
+        # Half-open x0, y0, x1, y1
+        self.bounds = None if region is None else (x, y, x + width, y + height)
+
+        # What the backend asked the OS to leave out, e.g. RECORD device event ranges. Those events are never seen.
+        self.pushed_down = dict()
+
+        self.filtered_decode = 0
+        self.filtered_callback = 0
+
+        self._lock = threading.Lock()
+
+    def wants(self, kind):
+        return self.kind_values is None or kind._value_ in self.kind_values
+
+    def matches(self, event):
+        if self.kind_values is not None and event.event._value_ not in self.kind_values:
+            return False
+
+        if isinstance(event, KeyboardEvent):
+            return self.key_values is None or event.keyboard_key._value_ in self.key_values
+
+        if self.button_values is not None and event.event is MouseEvents.CLICK and event.button._value_ not in self.button_values:
+            return False
+
+        if self.bounds is not None and event.x is not None:
+            x0, y0, x1, y1 = self.bounds
+            return x0 <= event.x < x1 and y0 <= event.y < y1
+
+        return True
+
+    def contains(self, x, y):
+        x0, y0, x1, y1 = self.bounds
+        return x0 <= x < x1 and y0 <= y < y1
+
+    def count(self, stage, filtered):
+        # Backends can decode on several threads
+        with self._lock:
+            if stage == "decode":
+                self.filtered_decode += filtered
+            else:
+                self.filtered_callback += filtered
+
+    def wrap(self, callback, batch_callback=None):
+        """callback and batch_callback, applying the filter to the events on their way in"""
+        matches = self.matches
+
+        if batch_callback is not None:
+            def filtered_batch_callback(events):
+                matched = [event for event in events if matches(event)]
+
+                if len(matched) < len(events):
+                    self.count("callback", len(events) - len(matched))
+
+                if matched:
+                    batch_callback(matched)
+
+            return None, filtered_batch_callback
+
+        def filtered_callback(event):
+            if matches(event):
+                callback(event)
+            else:
+                self.count("callback", 1)
+
+        return filtered_callback, None
+
+    def stats(self):
+        return {
+            "pushed_down": dict(self.pushed_down),
+            "filtered_decode": self.filtered_decode,
+            "filtered_callback": self.filtered_callback
+        }
+
+    def __repr__(self):
+        return f"EventFilter(kinds={self.kinds}, keys={self.keys}, buttons={self.buttons}, region={self.region})"
@@ -0,0 +1,239 @@
+from sneakysnek import storage
+
+from sneakysnek.state import InputSnapshot, to_numpy
+
+import bisect
+
+
+class _Carry:
+    """Input state at the end of the events bucketed so far"""
+
+    def __init__(self, initial):
+        columns = to_numpy([initial or InputSnapshot(None, 0, 0, None, None)])
+
+        self.keys = columns["keys"][0].copy()
+        self.buttons = columns["buttons"][0].copy()
+
+        self.has_cursor = bool(columns["has_cursor"][0])
+        self.x = int(columns["x"][0])
+        self.y = int(columns["y"][0])
+
+        # Cursor at the last frame, where the next frame's travel starts from
+        self.frame_x = self.x if self.has_cursor else None
+        self.frame_y = self.y if self.has_cursor else None
+
+        # Events bucketed before the next frame was known, which still count towards it
+        self.pending_events = 0
+        self.pending_scroll = 0
+
+
+def iter_frames(frame_ns, events, chunk_frames=4096, chunk_events=1048576, initial=None):
+    """Buckets events into frames, yielding one dict of per-frame arrays for up to chunk_frames frames at a time
+
+    frame_ns: sorted frame timestamps on the events' monotonic_ns clock
+    events: an EventReader, a Session, or a structured array of storage records (storage.numpy_dtype())
+    initial: InputSnapshot held before the first event, if it is not a blank state
+
+    Frame i gets the events with frame_ns[i - 1] < monotonic_ns <= frame_ns[i] (everything up to frame_ns[0] for
+    the first one). Each dict holds:
+
+    frame_ns, events (count per frame), keys (frames x keys bool, held at the frame, by keyboard_key_ordinals),
+    buttons (frames x buttons bool), x, y, has_cursor (cursor at the frame), travel_x, travel_y (cursor travel since the
+    previous frame) and scroll (wheel velocity over the frame, up positive)
+
+    Travel is the difference between logged cursor positions. Storage records keep no relative motion, so the raw
+    deltas of the xi2 and evdev backends are not summed: with the pointer locked, travel stays 0.
+
+    At most about chunk_events events are decoded at a time: an event log is searched and sliced in place through its
+    memory map, so sessions far larger than RAM stream through.
+    """
+    import numpy as np
+
+    if chunk_frames < 1 or chunk_events < 1:
+        raise ValueError("chunk_frames and chunk_events must be at least 1")
+
+    records, search = _timeline(np, events)
+
+    frame_ns = np.asarray(frame_ns, dtype=np.int64)
+    carry = _Carry(initial)
+
+    frame = 0
+    start = 0
+    last_ns = None
+
+    while frame < len(frame_ns):
+        frames = frame_ns[frame:frame + chunk_frames]
+
+        if np.any(frames[1:] < frames[:-1]) or (last_ns is not None and frames[0] < last_ns):
+            raise ValueError("frame_ns must be sorted")
+
+        stop = search(int(frames[-1]))
+
+        if stop - start > chunk_events:
+            # Only take the frames that fit in chunk_events more events
+            count = int(np.searchsorted(frames, records["monotonic_ns"][start + chunk_events - 1], side="right"))
+
+            if count == 0:
+                _bucket(np, frames[:0], records[start:start + chunk_events], carry)
+
+                start += chunk_events
+                continue
+
+            frames = frames[:count]
+            stop = search(int(frames[-1]))
+
+        yield _bucket(np, frames, records[start:stop], carry)
+
+        start = stop
+        frame += len(frames)
+        last_ns = frames[-1]
+
+
+def align_frames(frame_ns, events, chunk_frames=4096, chunk_events=1048576, initial=None):
+    """iter_frames(), concatenated into a single dict of arrays"""
+    import numpy as np
+
+    chunks = list(iter_frames(frame_ns, events, chunk_frames=chunk_frames, chunk_events=chunk_events, initial=initial))
+
+    if not chunks:
+        return _bucket(np, np.empty(0, dtype=np.int64), np.empty(0, dtype=storage.numpy_dtype()), _Carry(initial))
+
+    return {name: np.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0]}
+
+
+def _timeline(np, events):
+    """(records, search(monotonic_ns) -> index past the last event at or before it)"""
+    if hasattr(events, "events") and isinstance(events.events, storage.EventReader):
+        events = events.events
+
+    if isinstance(events, storage.EventReader):
+        records = events.to_numpy()
+
+        # numpy's searchsorted would make a contiguous copy of the whole column first, bisect reads a few pages
+        try:
+            monotonic_ns = events.column("monotonic_ns")
+        except storage.StorageError:
+            monotonic_ns = None
+
+        if monotonic_ns is not None:
+            return records, lambda value: bisect.bisect_right(monotonic_ns, value)
+    else:
+        records = np.asarray(events)
+
+        if records.dtype != storage.numpy_dtype():
+            raise ValueError("events must be an EventReader, a Session or an array of storage.numpy_dtype() records")
+
+    monotonic_ns = records["monotonic_ns"]
+
+    return records, lambda value: int(np.searchsorted(monotonic_ns, value, side="right"))
+
+
+def _bucket(np, frames, records, carry):
+    count = len(frames)
+
+    # Contiguous copies of this chunk's columns
+    times = np.ascontiguousarray(records["monotonic_ns"])
+    kinds = np.ascontiguousarray(records["kind"])
+    codes = np.ascontiguousarray(records["code"])
+    directions = np.ascontiguousarray(records["direction"])
+
+    bounds = np.searchsorted(times, frames, side="right")
+    counts = np.diff(bounds, prepend=0)
+
+    keys = np.repeat(carry.keys[None, :], count, axis=0)
+    _hold(np, frames, times, kinds <= storage.KIND_KEY_UP, codes, kinds == storage.KIND_KEY_DOWN, keys, carry.keys)
+
+    buttons = np.repeat(carry.buttons[None, :], count, axis=0)
+    is_click = (kinds == storage.KIND_MOUSE_CLICK) & (codes != storage.NO_CODE)
+    _hold(np, frames, times, is_click, codes, directions == storage.DIRECTION_DOWN, buttons, carry.buttons)
+
+    # Mouse events carry the cursor position, unless it was unknown
+    is_mouse = (kinds >= storage.KIND_MOUSE_CLICK) & (records["x"] != storage.NO_POSITION)
+
+    mouse_times = times[is_mouse]
+    mouse_x = records["x"][is_mouse].astype(np.int32)
+    mouse_y = records["y"][is_mouse].astype(np.int32)
+
+    last = np.searchsorted(mouse_times, frames, side="right") - 1
+    has_position = last >= 0
+
+    if carry.has_cursor:
+        base_x, base_y = carry.x, carry.y
+    elif len(mouse_times):
+        # Travel counts from the first known position
+        base_x, base_y = int(mouse_x[0]), int(mouse_y[0])
+    else:
+        base_x, base_y = 0, 0
+
+    x = np.where(has_position, mouse_x[np.maximum(last, 0)] if len(mouse_times) else 0, base_x).astype(np.int32)
+    y = np.where(has_position, mouse_y[np.maximum(last, 0)] if len(mouse_times) else 0, base_y).astype(np.int32)
+
+    has_cursor = has_position | carry.has_cursor
+
+    travel_x = np.diff(x, prepend=np.int32(base_x if carry.frame_x is None else carry.frame_x))
+    travel_y = np.diff(y, prepend=np.int32(base_y if carry.frame_y is None else carry.frame_y))
+
+    is_scroll = kinds == storage.KIND_MOUSE_SCROLL
+    scroll_velocity = records["velocity"][is_scroll].astype(np.int64)
+    scroll_velocity = np.where(directions[is_scroll] == storage.DIRECTION_UP, scroll_velocity, -scroll_velocity)
+
+    scrolled = np.concatenate([np.zeros(1, dtype=np.int64), np.cumsum(scroll_velocity)])[np.searchsorted(times[is_scroll], frames, side="right")]
+    scroll = np.diff(scrolled, prepend=0)
+
+    if count:
+        counts[0] += carry.pending_events
+        scroll[0] += carry.pending_scroll
+
+        carry.pending_events = 0
+        carry.pending_scroll = 0
+
+        if has_cursor[-1]:
+            carry.frame_x = int(x[-1])
+            carry.frame_y = int(y[-1])
+    else:
+        carry.pending_events += len(times)
+        carry.pending_scroll += int(scroll_velocity.sum())
+
+        if carry.frame_x is None and len(mouse_times):
+            carry.frame_x = base_x
+            carry.frame_y = base_y
+
+    if len(mouse_times):
+        carry.has_cursor = True
+        carry.x = int(mouse_x[-1])
+        carry.y = int(mouse_y[-1])
+
+    return {
+        "frame_ns": frames,
+        "events": counts,
+        "keys": keys,
+        "buttons": buttons,
+        "x": x,
+        "y": y,
+        "has_cursor": has_cursor,
+        "travel_x": travel_x,
+        "travel_y": travel_y,
+        "scroll": scroll
+    }
+
+
+def _hold(np, frames, times, selected, codes, is_down, held, carry):
+    """Fills held (frames x codes) with each code's last press / release at or before each frame, updating carry"""
+    times = times[selected]
+    codes = codes[selected]
+    is_down = is_down[selected]
+
+    for code in np.unique(codes):
+        if code >= held.shape[1]:
+            continue
+
+        mask = codes == code
+
+        code_times = times[mask]
+        code_is_down = is_down[mask]
+
+        last = np.searchsorted(code_times, frames, side="right") - 1
+        has_event = last >= 0
+
+        held[has_event, code] = code_is_down[last[has_event]]
+        carry[code] = code_is_down[-1]
@@ -0,0 +1,423 @@
+from sneakysnek.keyboard_keys import KeyboardKey, keyboard_key_ordinals
+
+from sneakysnek.keyboard_event import KeyboardEvent, KeyboardEvents
+
+import collections
+import queue
+import threading
+import traceback
+
+
+# One bit per physical modifier key: the left key of each pair on the even bit, the right one on the odd bit above it
+modifier_bits = {
+    KeyboardKey.KEY_LEFT_CTRL.value: 1 << 0,
+    KeyboardKey.KEY_RIGHT_CTRL.value: 1 << 1,
+    KeyboardKey.KEY_LEFT_SHIFT.value: 1 << 2,
+    KeyboardKey.KEY_RIGHT_SHIFT.value: 1 << 3,
+    KeyboardKey.KEY_LEFT_ALT.value: 1 << 4,
+    KeyboardKey.KEY_RIGHT_ALT.value: 1 << 5,
+    KeyboardKey.KEY_LEFT_WINDOWS.value: 1 << 6,
+    KeyboardKey.KEY_RIGHT_WINDOWS.value: 1 << 7,
+    KeyboardKey.KEY_COMMAND.value: 1 << 6
+}
+
+LEFT_MODIFIERS = 0x55
+
+# Modifier names usable in hotkey specs, either side of the keyboard
+modifier_names = {
+    "CTRL": (KeyboardKey.KEY_LEFT_CTRL, KeyboardKey.KEY_RIGHT_CTRL),
+    "CONTROL": (KeyboardKey.KEY_LEFT_CTRL, KeyboardKey.KEY_RIGHT_CTRL),
+    "SHIFT": (KeyboardKey.KEY_LEFT_SHIFT, KeyboardKey.KEY_RIGHT_SHIFT),
+    "ALT": (KeyboardKey.KEY_LEFT_ALT, KeyboardKey.KEY_RIGHT_ALT),
+    "META": (KeyboardKey.KEY_LEFT_WINDOWS, KeyboardKey.KEY_RIGHT_WINDOWS),
+    "WIN": (KeyboardKey.KEY_LEFT_WINDOWS, KeyboardKey.KEY_RIGHT_WINDOWS),
+    "WINDOWS": (KeyboardKey.KEY_LEFT_WINDOWS, KeyboardKey.KEY_RIGHT_WINDOWS),
+    "SUPER": (KeyboardKey.KEY_LEFT_WINDOWS, KeyboardKey.KEY_RIGHT_WINDOWS),
+    "CMD": (KeyboardKey.KEY_COMMAND,),
+    "COMMAND": (KeyboardKey.KEY_COMMAND,)
+}
+
+key_aliases = {
+    "ESC": KeyboardKey.KEY_ESCAPE,
+    "ENTER": KeyboardKey.KEY_RETURN,
+    "DEL": KeyboardKey.KEY_DELETE,
+    "INS": KeyboardKey.KEY_INSERT,
+    "PGUP": KeyboardKey.KEY_PAGE_UP,
+    "PGDN": KeyboardKey.KEY_PAGE_DOWN,
+    "-": KeyboardKey.KEY_MINUS,
+    "=": KeyboardKey.KEY_EQUALS,
+    "[": KeyboardKey.KEY_LEFT_BRACKET,
+    "]": KeyboardKey.KEY_RIGHT_BRACKET,
+    ";": KeyboardKey.KEY_SEMICOLON,
+    "'": KeyboardKey.KEY_APOSTROPHE,
+    ",": KeyboardKey.KEY_COMMA,
+    ".": KeyboardKey.KEY_PERIOD,
+    "/": KeyboardKey.KEY_SLASH,
+    "\\": KeyboardKey.KEY_BACKSLASH,
+    "`": KeyboardKey.KEY_GRAVE
+}
+
+
+class Binding:
+    """A chord, or a sequence of chords pressed at most within_ms apart, and the handler it fires"""
+
+    def __init__(self, spec, steps, handler, within_ms):
+        self.spec = spec
+        self.steps = steps
+        self.handler = handler
+        self.within_ms = within_ms
+
+        self.within_ns = int(within_ms * 1000000)
+
+        # Modifiers that must be held on a given side for the last chord, e.g. for "RIGHT_CTRL+F9"
+        self.sides = steps[-1][1]
+
+        self.fired = 0
+
+    def __repr__(self):
+        return f"Binding({self.spec!r}, within_ms={self.within_ms})"
+
+
+class _Node:
+
+    __slots__ = ("children", "fail", "depth", "bindings", "output")
+
+    def __init__(self, depth):
+        self.children = dict()
+        self.fail = None
+        self.depth = depth
+
+        # Bindings ending exactly here, then everything ending here or at a suffix of this path
+        self.bindings = list()
+        self.output = list()
+
+
+class Hotkeys:
+    """Matches registered chords and sequences against KeyboardEvents in constant time per event
+
+    Bindings compile into an Aho-Corasick automaton over chord codes (held modifiers, left and right folded together,
+    plus the pressed key), so overlapping sequences are all found without rescanning. Handlers run on a worker thread
+    unless threaded=False, keeping the capture or dispatch thread free.
+    """
+
+    def __init__(self, threaded=True):
+        self.threaded = threaded
+
+        self.bindings = list()
+
+        self.events = 0
+        self.matched = 0
+        self.errors = 0
+
+        self.is_running = False
+        self.thread = None
+
+        self._root = _Node(0)
+        self._node = self._root
+        self._codes = frozenset()
+        self._max_within_ns = 0
+        self._is_compiled = True
+
+        # Physical modifier bits currently held and non-modifier keys held down, to ignore autorepeat
+        self._held = 0
+        self._pressed = set()
+
+        self._times = collections.deque(maxlen=1)
+        self._last_ns = None
+
+        # Reentrant so that handlers running inline can bind and unbind
+        self._lock = threading.RLock()
+        self._queue = queue.SimpleQueue()
+
+        self.start()
+
+    def __call__(self, event):
+        self.put(event)
+
+    def bind(self, spec, handler, within_ms=300):
+        """Registers a handler(event) for spec: "CTRL+SHIFT+F9", "G G", or a list of KeyboardKeys / tuples of them"""
+        binding = Binding(spec, parse(spec), handler, within_ms)
+
+        with self._lock:
+            self.bindings.append(binding)
+            self._is_compiled = False
+
+        return binding
+
+    def unbind(self, binding):
+        with self._lock:
+            self.bindings.remove(binding)
+            self._is_compiled = False
+
+    def start(self):
+        if not self.threaded or self.is_running:
+            return
+
+        self.is_running = True
+
+        self.thread = threading.Thread(target=self._work, args=(), name="sneakysnek-hotkeys")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self, timeout=None):
+        if not self.is_running:
+            return
+
+        self.is_running = False
+        self._queue.put(None)
+
+        if self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+
+    def stats(self):
+        return {
+            "bindings": len(self.bindings),
+            "events": self.events,
+            "matched": self.matched,
+            "errors": self.errors,
+            "pending": self._queue.qsize()
+        }
+
+    def put(self, event):
+        with self._lock:
+            if not self._is_compiled:
+                self._compile()
+
+            self._put(event)
+
+    def put_batch(self, events):
+        with self._lock:
+            if not self._is_compiled:
+                self._compile()
+
+            for event in events:
+                self._put(event)
+
+    def _put(self, event):
+        if not isinstance(event, KeyboardEvent):
+            return
+
+        self.events += 1
+
+        value = event.keyboard_key._value_
+        bit = modifier_bits.get(value)
+
+        if event.event is KeyboardEvents.UP:
+            if bit is None:
+                self._pressed.discard(value)
+            else:
+                self._held &= ~bit
+
+            return
+
+        held = self._held
+
+        if bit is None:
+            if value in self._pressed:
+                return
+
+            self._pressed.add(value)
+        else:
+            if held & bit:
+                return
+
+            self._held = held | bit
+
+        code = ((held | (held >> 1)) & LEFT_MODIFIERS) << 8 | keyboard_key_ordinals[value]
+
+        if code not in self._codes:
+            # Modifiers on their way to a chord do not interrupt a sequence, any other key does
+            if bit is None:
+                self._node = self._root
+
+            return
+
+        monotonic_ns = event.monotonic_ns
+        node = self._node
+
+        if node is not self._root and monotonic_ns - self._last_ns > self._max_within_ns:
+            node = self._root
+
+        while node is not self._root and code not in node.children:
+            node = node.fail
+
+        node = node.children.get(code, self._root)
+
+        self._node = node
+        self._last_ns = monotonic_ns
+        self._times.append(monotonic_ns)
+
+        for binding in node.output:
+            if binding.sides and (held & binding.sides) != binding.sides:
+                continue
+
+            if binding.within_ns < self._max_within_ns and not self._is_within(binding):
+                continue
+
+            binding.fired += 1
+            self.matched += 1
+
+            if self.is_running:
+                self._queue.put((binding, event))
+            else:
+                binding.handler(event)
+
+    def _is_within(self, binding):
+        times = self._times
+        count = len(binding.steps)
+
+        for index in range(len(times) - count + 1, len(times)):
+            if times[index] - times[index - 1] > binding.within_ns:
+                return False
+
+        return True
+
+    def _compile(self):
+        root = _Node(0)
+        codes = set()
+
+        for binding in self.bindings:
+            nodes = [root]
+
+            # A chord of modifiers only completes with whichever of them goes down last, so each one is a possible ending
+            for step in binding.steps:
+                next_nodes = list()
+
+                for code in step[0]:
+                    codes.add(code)
+
+                    for node in nodes:
+                        child = node.children.get(code)
+
+                        if child is None:
+                            child = node.children[code] = _Node(node.depth + 1)
+
+                        next_nodes.append(child)
+
+                nodes = next_nodes
+
+            for node in nodes:
+                node.bindings.append(binding)
+
+        # Breadth first, so every failure link points at an already linked, shallower node
+        pending = collections.deque()
+
+        for child in root.children.values():
+            child.fail = root
+            child.output = list(child.bindings)
+            pending.append(child)
+
+        while pending:
+            node = pending.popleft()
+
+            for code, child in node.children.items():
+                fail = node.fail
+
+                while fail is not root and code not in fail.children:
+                    fail = fail.fail
+
+                child.fail = fail.children.get(code, root)
+
+                if child.fail is child:
+                    child.fail = root
+
+                child.output = child.bindings + child.fail.output
+                pending.append(child)
+
+        self._root = root
+        self._node = root
+        self._codes = frozenset(codes)
+
+        self._max_within_ns = max((binding.within_ns for binding in self.bindings), default=0)
+        self._times = collections.deque(maxlen=max((len(binding.steps) for binding in self.bindings), default=1))
+
+        self._is_compiled = True
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+
+            if item is None:
+                return
+
+            binding, event = item
+
+            try:
+                binding.handler(event)
+            except Exception:
+                # The worker is shared by every binding: a failing handler must not stop the others from firing
+                self.errors += 1
+                traceback.print_exc()
+
+
+def parse(spec):
+    """[(chord codes, modifier sides)] for each step of a hotkey spec"""
+    if isinstance(spec, str):
+        steps = [step.split("+") for step in spec.replace(",", " ").split()]
+    elif isinstance(spec, KeyboardKey):
+        steps = [[spec]]
+    else:
+        steps = [[step] if isinstance(step, (str, KeyboardKey)) else list(step) for step in spec]
+
+    if not steps:
+        raise ValueError(f"Empty hotkey spec {spec!r}")
+
+    return [_parse_chord(spec, [_parse_key(spec, key) for key in step]) for step in steps]
+
+
+def _parse_key(spec, key):
+    """The KeyboardKeys a spec token stands for: both sides for a modifier name"""
+    if isinstance(key, KeyboardKey):
+        return (key,)
+
+    name = key.strip().upper()
+
+    if name in modifier_names:
+        return modifier_names[name]
+
+    if name in key_aliases:
+        return (key_aliases[name],)
+
+    name = name.replace(" ", "_")
+
+    for candidate in (name, f"KEY_{name}"):
+        if candidate in KeyboardKey.__members__:
+            return (KeyboardKey[candidate],)
+
+    raise ValueError(f"Unknown key '{key}' in hotkey spec {spec!r}")
+
+
+def _parse_chord(spec, keys):
+    """Chord codes a step matches, plus the modifier bits that must be held on a specific side"""
+    modifiers = [alternatives for alternatives in keys if alternatives[0].value in modifier_bits]
+    triggers = [alternatives for alternatives in keys if alternatives[0].value not in modifier_bits]
+
+    if len(triggers) > 1:
+        raise ValueError(f"A chord can only hold one non-modifier key in hotkey spec {spec!r}")
+
+    if triggers:
+        endings = [(triggers[0], modifiers)]
+    else:
+        endings = [(modifiers[index], modifiers[:index] + modifiers[index + 1:]) for index in range(len(modifiers))]
+
+    codes = list()
+    sides = 0
+
+    for alternatives in keys:
+        # A single side spelled out, e.g. RIGHT_CTRL, must be the one held, unless it is what completes the chord
+        if len(alternatives) == 1 and alternatives[0].value in modifier_bits and triggers:
+            sides |= modifier_bits[alternatives[0].value]
+
+    for trigger, held in endings:
+        mask = 0
+
+        for alternatives in held:
+            bit = modifier_bits[alternatives[0].value]
+            mask |= bit | (bit >> 1)
+
+        mask &= LEFT_MODIFIERS
+
+        for key in trigger:
+            codes.append(mask << 8 | keyboard_key_ordinals[key.value])
+
+    return codes, sides
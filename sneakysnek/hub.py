@@ -0,0 +1,166 @@
+from sneakysnek.recorder import Recorder, RecorderError
+
+from sneakysnek.dispatcher import EventDispatcher, OverflowPolicy
+
+import threading
+
+
+class Subscription:
+    """One subscriber of a Hub, with its own filter and its own queue drained by its own worker thread"""
+
+    def __init__(self, hub, callback=None, batch_callback=None, event_filter=None, dispatcher=None):
+        if (callback is None) == (batch_callback is None):
+            raise RecorderError("Exactly one of 'callback' or 'batch_callback' is required")
+
+        self.hub = hub
+        self.event_filter = event_filter
+
+        # A slow subscriber must not hold up capture or the other subscribers, so the default queue drops instead of blocking
+        self.dispatcher = dispatcher or EventDispatcher(queue_size=65536, overflow=OverflowPolicy.DROP_OLDEST)
+        self.dispatcher.start(callback, batch_callback=batch_callback)
+
+        if event_filter is None:
+            self._put_batch = self.dispatcher.put_batch
+        else:
+            _, self._put_batch = event_filter.wrap(None, batch_callback=self.dispatcher.put_batch)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def is_active(self):
+        return self.dispatcher.is_running
+
+    def put_batch(self, events):
+        self._put_batch(events)
+
+    def stats(self):
+        stats = self.dispatcher.stats()
+
+        if self.event_filter is not None:
+            stats["filter"] = self.event_filter.stats()
+
+        return stats
+
+    def close(self, timeout=None):
+        """Unsubscribes, delivers what is already queued and stops the worker; the last one out stops the backend"""
+        self.hub.unsubscribe(self, timeout=timeout)
+
+
+class Hub:
+    """Shares one capture backend between any number of subscriptions
+
+    The backend starts with the first subscription and stops when the last one closes. It delivers batches to the
+    hub, which hands each subscription the events its filter lets through; the subscription's dispatcher queues them
+    for its callback. Use get() for the process-wide hub of a backend.
+    """
+
+    def __init__(self, backend=None, **options):
+        self.backend = backend
+        self.options = options
+
+        self.recorder = None
+        self.starts = 0
+        self.fanned_out = 0
+
+        # Replaced rather than mutated, so the capture thread iterates it without locking
+        self._subscriptions = tuple()
+        self._lock = threading.Lock()
+
+        # Linux backends deliver from a keyboard and a mouse thread
+        self._count_lock = threading.Lock()
+
+    @property
+    def subscriptions(self):
+        return self._subscriptions
+
+    @property
+    def is_recording(self):
+        return self.recorder is not None and self.recorder.is_recording
+
+    def subscribe(self, callback=None, batch_callback=None, event_filter=None, dispatcher=None):
+        subscription = Subscription(self, callback=callback, batch_callback=batch_callback, event_filter=event_filter, dispatcher=dispatcher)
+
+        with self._lock:
+            self._subscriptions += (subscription,)
+
+            # The backend can stop by itself (end of a capture, synthetic seconds=, a lost connection)
+            if self.recorder is not None and not self.recorder.is_recording:
+                self.recorder.stop()
+                self.recorder = None
+
+            if self.recorder is None:
+                try:
+                    self.recorder = Recorder.record(batch_callback=self._fan_out, backend=self.backend, **self.options)
+                except BaseException:
+                    self._subscriptions = tuple(other for other in self._subscriptions if other is not subscription)
+                    subscription.dispatcher.stop()
+                    raise
+
+                self.starts += 1
+
+        return subscription
+
+    def unsubscribe(self, subscription, timeout=None):
+        with self._lock:
+            if subscription not in self._subscriptions:
+                return
+
+            self._subscriptions = tuple(other for other in self._subscriptions if other is not subscription)
+
+            recorder = None
+
+            if not self._subscriptions:
+                recorder, self.recorder = self.recorder, None
+
+        if recorder is not None:
+            recorder.stop()
+
+        subscription.dispatcher.stop(timeout)
+
+    def stop(self, timeout=None):
+        """Closes every subscription, stopping the backend"""
+        for subscription in self._subscriptions:
+            self.unsubscribe(subscription, timeout=timeout)
+
+    def stats(self):
+        return {
+            "recording": self.is_recording,
+            "starts": self.starts,
+            "fanned_out": self.fanned_out,
+            "subscriptions": [subscription.stats() for subscription in self._subscriptions]
+        }
+
+    def _fan_out(self, events):
+        with self._count_lock:
+            self.fanned_out += len(events)
+
+        for subscription in self._subscriptions:
+            subscription.put_batch(events)
+
+
+# Process-wide hubs, by backend
+hubs = dict()
+
+_hubs_lock = threading.Lock()
+
+
+def get(backend=None, **options):
+    """The process-wide Hub for backend, created on first use with options for the backend"""
+    with _hubs_lock:
+        hub = hubs.get(backend)
+
+        if hub is None:
+            hub = hubs[backend] = Hub(backend=backend, **options)
+        elif options and options != hub.options:
+            raise RecorderError(f"The hub for backend '{backend}' already exists with other options")
+
+        return hub
+
+
+def subscribe(callback=None, batch_callback=None, event_filter=None, dispatcher=None, backend=None):
+    """Subscribes to the process-wide hub of backend"""
+    return get(backend).subscribe(callback=callback, batch_callback=batch_callback, event_filter=event_filter, dispatcher=dispatcher)
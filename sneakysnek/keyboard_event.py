@@ -9,10 +9,54 @@ class KeyboardEvents(enum.Enum):
 
 class KeyboardEvent:
 
-    def __init__(self, event, keyboard_key):
+    __slots__ = ("event", "keyboard_key", "timestamp", "monotonic_ns")
+
+    # Rarely set, so kept out of every event's slots: DetailedKeyboardEvent carries them
+    received_ns = None
+    source_ns = None
+    display = None
+
+    def __init__(self, event, keyboard_key, timestamp=None, monotonic_ns=None):
         self.event = event
         self.keyboard_key = keyboard_key
-        self.timestamp = time.time()
+        self.timestamp = time.time() if timestamp is None else timestamp
+        self.monotonic_ns = time.monotonic_ns() if monotonic_ns is None else monotonic_ns
+
+    def __eq__(self, other):
+        if not isinstance(other, KeyboardEvent):
+            return NotImplemented
+
+        return (
+            self.monotonic_ns == other.monotonic_ns and
+            self.event is other.event and
+            self.keyboard_key is other.keyboard_key and
+            self.timestamp == other.timestamp and
+            self.display == other.display
+        )
+
+    def __hash__(self):
+        return hash((self.monotonic_ns, self.timestamp))
+
+    def __repr__(self):
+        return f"KeyboardEvent({self.event}, {self.keyboard_key}, timestamp={self.timestamp}, monotonic_ns={self.monotonic_ns})"
 
     def __str__(self):
         return f"KeyboardEvent.{self.event.name} - {self.keyboard_key.name} - {self.timestamp}"
+
+
+class DetailedKeyboardEvent(KeyboardEvent):
+    """A KeyboardEvent with the latency stamps or display that some backends provide"""
+
+    __slots__ = ("received_ns", "source_ns", "display")
+
+    def __init__(self, event, keyboard_key, timestamp=None, monotonic_ns=None, received_ns=None, source_ns=None, display=None):
+        self.event = event
+        self.keyboard_key = keyboard_key
+        self.timestamp = time.time() if timestamp is None else timestamp
+        self.monotonic_ns = time.monotonic_ns() if monotonic_ns is None else monotonic_ns
+        self.received_ns = received_ns
+        self.source_ns = source_ns
+        self.display = display
+
+    def __repr__(self):
+        return f"DetailedKeyboardEvent({self.event}, {self.keyboard_key}, timestamp={self.timestamp}, monotonic_ns={self.monotonic_ns}, received_ns={self.received_ns}, source_ns={self.source_ns}, display={self.display!r})"
@@ -130,4 +130,8 @@ class KeyboardKey(enum.Enum):
 
     # macOS
     KEY_COMMAND = "KEY_COMMAND"
-    KEY_FN = "KEY_FN"
\ No newline at end of file
+    KEY_FN = "KEY_FN"
+
+# Stable integer codes for compact encodings. New keys must only ever be appended to the enumeration.
+# Keyed by value: hashing a str is much cheaper than hashing an Enum member on hot paths.
+keyboard_key_ordinals = {keyboard_key.value: ordinal for ordinal, keyboard_key in enumerate(KeyboardKey)}
@@ -4,4 +4,7 @@ import enum
 class MouseButton(enum.Enum):
     LEFT = "LEFT"
     RIGHT = "RIGHT"
-    MIDDLE = "MIDDLE"
\ No newline at end of file
+    MIDDLE = "MIDDLE"
+
+# Keyed by value, see keyboard_key_ordinals
+mouse_button_ordinals = {mouse_button.value: ordinal for ordinal, mouse_button in enumerate(MouseButton)}
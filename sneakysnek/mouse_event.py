@@ -10,14 +10,75 @@ class MouseEvents(enum.Enum):
 
 class MouseEvent:
 
-    def __init__(self, event, button=None, direction=None, velocity=None, x=None, y=None):
+    __slots__ = ("event", "button", "direction", "velocity", "x", "y", "timestamp", "monotonic_ns")
+
+    # Rarely set, so kept out of every event's slots: DetailedMouseEvent carries them
+    dx = None
+    dy = None
+    samples = None
+    received_ns = None
+    source_ns = None
+    display = None
+
+    def __init__(self, event, button=None, direction=None, velocity=None, x=None, y=None, timestamp=None, monotonic_ns=None):
         self.event = event
         self.button = button
         self.direction = direction
         self.velocity = velocity
         self.x = x
         self.y = y
-        self.timestamp = time.time()
+        self.timestamp = time.time() if timestamp is None else timestamp
+        self.monotonic_ns = time.monotonic_ns() if monotonic_ns is None else monotonic_ns
+
+    def __eq__(self, other):
+        if not isinstance(other, MouseEvent):
+            return NotImplemented
+
+        return (
+            self.monotonic_ns == other.monotonic_ns and
+            self.event is other.event and
+            self.button is other.button and
+            self.direction == other.direction and
+            self.velocity == other.velocity and
+            self.x == other.x and
+            self.y == other.y and
+            self.dx == other.dx and
+            self.dy == other.dy and
+            self.samples == other.samples and
+            self.timestamp == other.timestamp and
+            self.display == other.display
+        )
+
+    def __hash__(self):
+        return hash((self.monotonic_ns, self.timestamp))
+
+    def __repr__(self):
+        return f"MouseEvent({self.event}, button={self.button}, direction={self.direction!r}, velocity={self.velocity}, x={self.x}, y={self.y}, timestamp={self.timestamp}, monotonic_ns={self.monotonic_ns})"
 
     def __str__(self):
         return f"MouseEvent.{self.event.name} - {self.button} - {self.direction} - {self.velocity} - {self.x} - {self.y} - {self.timestamp}"
+
+
+class DetailedMouseEvent(MouseEvent):
+    """A MouseEvent with the deltas, samples, latency stamps or display that some backends and the coalescer provide"""
+
+    __slots__ = ("dx", "dy", "samples", "received_ns", "source_ns", "display")
+
+    def __init__(self, event, button=None, direction=None, velocity=None, x=None, y=None, dx=None, dy=None, samples=None, timestamp=None, monotonic_ns=None, received_ns=None, source_ns=None, display=None):
+        self.event = event
+        self.button = button
+        self.direction = direction
+        self.velocity = velocity
+        self.x = x
+        self.y = y
+        self.dx = dx
+        self.dy = dy
+        self.samples = samples
+        self.timestamp = time.time() if timestamp is None else timestamp
+        self.monotonic_ns = time.monotonic_ns() if monotonic_ns is None else monotonic_ns
+        self.received_ns = received_ns
+        self.source_ns = source_ns
+        self.display = display
+
+    def __repr__(self):
+        return f"DetailedMouseEvent({self.event}, button={self.button}, direction={self.direction!r}, velocity={self.velocity}, x={self.x}, y={self.y}, dx={self.dx}, dy={self.dy}, samples={self.samples}, timestamp={self.timestamp}, monotonic_ns={self.monotonic_ns}, received_ns={self.received_ns}, source_ns={self.source_ns}, display={self.display!r})"
@@ -0,0 +1,386 @@
+from sneakysnek import storage
+
+import os
+import socket
+import stat
+import struct
+import threading
+import time
+
+
+class NetError(BaseException):
+    pass
+
+
+MAGIC = b"SNKN"
+VERSION = 1
+
+# Sent by the publisher to each subscriber on connect: magic, version, record size
+HEADER = struct.Struct("<4sHH")
+
+# Each frame is its payload size in bytes followed by that many bytes of fixed-width storage records
+FRAME = struct.Struct("<I")
+
+RECORD = storage.RECORD
+
+
+class Publisher:
+    """Streams events to any number of subscribers as length-prefixed frames of storage records
+
+    address: (host, port) for TCP, port 0 picking a free one, or a path for a Unix socket. The bound address is in
+    publisher.address.
+
+    Events are buffered and sent as one frame when max_batch are waiting or the oldest has waited max_delay_ms,
+    whichever comes first. Sockets run with Nagle's algorithm off since batching happens here. Sending happens on a
+    thread of its own, so callers only ever pay for encoding; past max_buffered waiting events, new ones are dropped
+    and counted. A subscriber that cannot take a frame within send_timeout seconds is disconnected.
+
+    Frames carry storage records, so they are lossy like event logs: dx / dy, samples, received_ns, source_ns and
+    display do not make it to subscribers.
+    """
+
+    def __init__(self, address, max_batch=512, max_delay_ms=2.0, max_buffered=65536, send_timeout=1.0):
+        if max_batch < 1 or max_buffered < max_batch:
+            raise ValueError("max_batch must be at least 1 and at most max_buffered")
+
+        self.max_batch = max_batch
+        self.max_delay_ns = int(max_delay_ms * 1000000)
+        self.max_buffered = max_buffered
+        self.send_timeout = send_timeout
+
+        self.count = 0
+        self.frames = 0
+        self.dropped = 0
+        self.disconnects = 0
+
+        self._buffer = bytearray()
+        self._buffered = 0
+        self._first_ns = 0
+
+        self._condition = threading.Condition()
+        self._closed = False
+
+        self._subscribers = list()
+        self._subscribers_lock = threading.Lock()
+        self._subscribers_changed = threading.Condition(self._subscribers_lock)
+
+        self._socket = _listen(address)
+        self.address = self._socket.getsockname()
+
+        self._accept_thread = threading.Thread(target=self._accept, daemon=True)
+        self._accept_thread.start()
+
+        self._send_thread = threading.Thread(target=self._send, daemon=True)
+        self._send_thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __call__(self, event):
+        self.write(event)
+
+    @property
+    def subscribers(self):
+        with self._subscribers_lock:
+            return len(self._subscribers)
+
+    def wait_for_subscribers(self, count=1, timeout=None):
+        """Blocks until at least count subscribers are connected; returns whether they are"""
+        with self._subscribers_changed:
+            return self._subscribers_changed.wait_for(lambda: len(self._subscribers) >= count, timeout)
+
+    def write(self, event):
+        record = RECORD.pack(*storage.encode(event))
+
+        with self._condition:
+            if self._buffered >= self.max_buffered:
+                self.dropped += 1
+                return
+
+            self._buffer += record
+            self._buffered += 1
+            self.count += 1
+
+            # The sender only needs waking to start the deadline, or when the batch is full
+            if self._buffered == 1:
+                self._first_ns = time.monotonic_ns()
+                self._condition.notify()
+            elif self._buffered == self.max_batch:
+                self._condition.notify()
+
+    def write_many(self, events):
+        encode = storage.encode
+        pack = RECORD.pack
+
+        records = [pack(*encode(event)) for event in events]
+
+        with self._condition:
+            room = self.max_buffered - self._buffered
+
+            if len(records) > room:
+                self.dropped += len(records) - room
+                records = records[:room]
+
+            if not records:
+                return
+
+            if not self._buffered:
+                self._first_ns = time.monotonic_ns()
+
+            self._buffer += b"".join(records)
+            self._buffered += len(records)
+            self.count += len(records)
+
+            self._condition.notify()
+
+    def flush(self):
+        """Sends whatever is buffered right away, without waiting for the deadline"""
+        with self._condition:
+            self._first_ns -= self.max_delay_ns
+            self._condition.notify()
+
+    def stats(self):
+        return {
+            "events": self.count,
+            "frames": self.frames,
+            "dropped": self.dropped,
+            "subscribers": self.subscribers,
+            "disconnects": self.disconnects
+        }
+
+    def close(self):
+        """Sends what is still buffered, then disconnects every subscriber"""
+        with self._condition:
+            if self._closed:
+                return
+
+            self._closed = True
+            self._condition.notify()
+
+        self._send_thread.join()
+
+        try:
+            self._socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+        self._socket.close()
+        self._accept_thread.join()
+
+        with self._subscribers_lock:
+            for subscriber in self._subscribers:
+                subscriber.close()
+
+            self._subscribers = list()
+
+        if self._socket.family == socket.AF_UNIX:
+            try:
+                _unlink(self.address)
+            except NetError:
+                # Replaced by something else since
+                pass
+
+    def _accept(self):
+        while True:
+            try:
+                subscriber, _ = self._socket.accept()
+            except OSError:
+                return
+
+            if subscriber.family != socket.AF_UNIX:
+                subscriber.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            subscriber.settimeout(self.send_timeout)
+
+            try:
+                subscriber.sendall(HEADER.pack(MAGIC, VERSION, RECORD.size))
+            except OSError:
+                subscriber.close()
+                continue
+
+            with self._subscribers_changed:
+                self._subscribers.append(subscriber)
+                self._subscribers_changed.notify_all()
+
+    def _send(self):
+        while True:
+            with self._condition:
+                while not self._buffered and not self._closed:
+                    self._condition.wait()
+
+                while self._buffered < self.max_batch and not self._closed:
+                    remaining_ns = self._first_ns + self.max_delay_ns - time.monotonic_ns()
+
+                    if remaining_ns <= 0:
+                        break
+
+                    self._condition.wait(remaining_ns / 1000000000)
+
+                if not self._buffered:
+                    return
+
+                # Whatever is left over is past its deadline already, and goes out on the next round
+                size = min(self._buffered, self.max_batch) * RECORD.size
+                frame = FRAME.pack(size) + self._buffer[:size]
+
+                del self._buffer[:size]
+                self._buffered -= size // RECORD.size
+
+            with self._subscribers_lock:
+                subscribers = list(self._subscribers)
+
+            for subscriber in subscribers:
+                try:
+                    subscriber.sendall(frame)
+                except OSError:
+                    # Gone, or too slow to keep up: a partial frame leaves nothing to resume from
+                    subscriber.close()
+
+                    with self._subscribers_lock:
+                        self._subscribers.remove(subscriber)
+
+                    self.disconnects += 1
+
+            self.frames += 1
+
+
+class Subscriber:
+    """Receives a Publisher's frames, as events, batches of events, storage records or structured arrays"""
+
+    def __init__(self, address, timeout=None):
+        self._socket = _connect(address)
+        self._socket.settimeout(timeout)
+
+        self._file = self._socket.makefile("rb")
+
+        header = self._file.read(HEADER.size)
+
+        if len(header) < HEADER.size:
+            raise NetError(f"No publisher handshake from {address}")
+
+        magic, version, record_size = HEADER.unpack(header)
+
+        if magic != MAGIC:
+            raise NetError(f"{address} is not a sneakysnek publisher")
+
+        if version != VERSION or record_size != RECORD.size:
+            raise NetError(f"Unsupported stream version {version} with {record_size}-byte records")
+
+        self.count = 0
+        self.frames = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __iter__(self):
+        return self.events()
+
+    def read_bytes(self):
+        """The next frame's RECORD bytes, or b"" once the publisher has closed the stream"""
+        prefix = self._file.read(FRAME.size)
+
+        if not prefix:
+            return b""
+
+        if len(prefix) < FRAME.size:
+            raise NetError("Stream ended in the middle of a frame")
+
+        size, = FRAME.unpack(prefix)
+        payload = self._file.read(size)
+
+        if len(payload) < size or size % RECORD.size:
+            raise NetError("Stream ended in the middle of a frame")
+
+        self.count += size // RECORD.size
+        self.frames += 1
+
+        return payload
+
+    def records(self):
+        """RECORD tuples of each frame until the stream ends, one list per frame"""
+        while True:
+            payload = self.read_bytes()
+
+            if not payload:
+                return
+
+            yield list(RECORD.iter_unpack(payload))
+
+    def batches(self):
+        """KeyboardEvent / MouseEvent lists, one per frame, until the stream ends"""
+        decode = storage.decode
+
+        for records in self.records():
+            yield [decode(record) for record in records]
+
+    def events(self):
+        for batch in self.batches():
+            yield from batch
+
+    def arrays(self):
+        """Structured arrays (storage.numpy_dtype()) over each frame's bytes, without decoding"""
+        import numpy as np
+
+        dtype = storage.numpy_dtype()
+
+        while True:
+            payload = self.read_bytes()
+
+            if not payload:
+                return
+
+            yield np.frombuffer(payload, dtype=dtype)
+
+    def close(self):
+        self._file.close()
+        self._socket.close()
+
+
+def _listen(address):
+    if isinstance(address, str):
+        # A socket left behind by a publisher that did not close; anything else at that path is not ours to remove
+        _unlink(address)
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    else:
+        server = socket.socket(socket.AF_INET6 if ":" in address[0] else socket.AF_INET, socket.SOCK_STREAM)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+
+    server.bind(address)
+    server.listen()
+
+    return server
+
+
+def _connect(address):
+    if isinstance(address, str):
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    else:
+        client = socket.socket(socket.AF_INET6 if ":" in address[0] else socket.AF_INET, socket.SOCK_STREAM)
+        client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    client.connect(tuple(address[:2]) if not isinstance(address, str) else address)
+
+    return client
+
+
+def _unlink(path):
+    """Removes the Unix socket at path, if there is one; raises NetError if something else is there"""
+    try:
+        mode = os.lstat(path).st_mode
+    except FileNotFoundError:
+        return
+
+    if not stat.S_ISSOCK(mode):
+        raise NetError(f"'{path}' exists and is not a socket")
+
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,220 @@
+from sneakysnek.keyboard_event import KeyboardEvent, KeyboardEvents
+from sneakysnek.mouse_event import MouseEvents
+
+import sys
+import threading
+import time
+
+
+class PlayerError(BaseException):
+    pass
+
+
+class PlaybackReport:
+    """Achieved vs intended timing of a replay, errors in nanoseconds (positive is late)"""
+
+    def __init__(self, errors, interval_errors, batches, speed):
+        self.errors = errors
+        self.interval_errors = interval_errors
+
+        self.batches = batches
+        self.speed = speed
+
+    @property
+    def count(self):
+        return len(self.errors)
+
+    def percentile(self, q, interval=False):
+        values = sorted(abs(error) for error in (self.interval_errors if interval else self.errors))
+
+        if not values:
+            return 0
+
+        return values[min(len(values) - 1, int(len(values) * q / 100))]
+
+    def __str__(self):
+        if not self.errors:
+            return "PlaybackReport - 0 events"
+
+        mean_ns = sum(self.errors) / len(self.errors)
+
+        return (
+            f"PlaybackReport - {self.count} events in {self.batches} flushes at {self.speed}x - "
+            f"offset mean {mean_ns / 1000:.1f} us, p50 {self.percentile(50) / 1000:.1f} us, p99 {self.percentile(99) / 1000:.1f} us, max {self.percentile(100) / 1000:.1f} us - "
+            f"interval jitter p50 {self.percentile(50, interval=True) / 1000:.1f} us, p99 {self.percentile(99, interval=True) / 1000:.1f} us, max {self.percentile(100, interval=True) / 1000:.1f} us"
+        )
+
+
+class Player:
+    """Replays recorded events on their original timeline, scaled by speed"""
+
+    def __init__(self, speed=1.0, spin_ms=1.5, tick_ms=0.25, injector=None):
+        if speed <= 0:
+            raise ValueError("speed must be positive")
+
+        self.speed = speed
+
+        # Sleeping hands the remaining wait to the OS scheduler, which can overshoot by up to spin_ms; the rest is spun
+        self.spin_ns = int(spin_ms * 1000000)
+
+        # Events due within one tick of each other are injected together and flushed once
+        self.tick_ns = int(tick_ms * 1000000)
+
+        self.injector = injector
+
+        self.stopped = threading.Event()
+
+    def play(self, events):
+        if isinstance(events, str):
+            import sneakysnek.storage
+
+            with sneakysnek.storage.EventReader(events) as reader:
+                return self.play(reader)
+
+        if self.injector is None:
+            self.injector = self._injector_class()()
+
+        self.stopped.clear()
+
+        events = iter(events)
+        event = next(events, None)
+
+        errors = list()
+        interval_errors = list()
+        batches = 0
+
+        if event is None:
+            return PlaybackReport(errors, interval_errors, batches, self.speed)
+
+        first_ns = event.monotonic_ns
+        started_ns = time.monotonic_ns()
+
+        previous_due_ns = None
+        previous_ns = None
+
+        while event is not None and not self.stopped.is_set():
+            due_ns = started_ns + int((event.monotonic_ns - first_ns) / self.speed)
+
+            self._wait_until(due_ns)
+
+            # Everything due by the end of this tick goes out in the same flush
+            batch_due_ns = [due_ns]
+            self.injector.inject(event)
+
+            tick_end_ns = due_ns + self.tick_ns
+            event = next(events, None)
+
+            while event is not None:
+                event_due_ns = started_ns + int((event.monotonic_ns - first_ns) / self.speed)
+
+                if event_due_ns > tick_end_ns:
+                    break
+
+                batch_due_ns.append(event_due_ns)
+                self.injector.inject(event)
+
+                event = next(events, None)
+
+            self.injector.flush()
+            flushed_ns = time.monotonic_ns()
+
+            batches += 1
+
+            for intended_ns in batch_due_ns:
+                errors.append(flushed_ns - intended_ns)
+
+                if previous_due_ns is not None:
+                    interval_errors.append((flushed_ns - previous_ns) - (intended_ns - previous_due_ns))
+
+                previous_due_ns = intended_ns
+                previous_ns = flushed_ns
+
+        return PlaybackReport(errors, interval_errors, batches, self.speed)
+
+    def stop(self):
+        self.stopped.set()
+
+    def close(self):
+        if self.injector is not None:
+            self.injector.close()
+
+    def _wait_until(self, due_ns):
+        remaining_ns = due_ns - time.monotonic_ns()
+
+        if remaining_ns > self.spin_ns:
+            if self.stopped.wait((remaining_ns - self.spin_ns) / 1000000000):
+                return
+
+        while time.monotonic_ns() < due_ns:
+            pass
+
+    @classmethod
+    def _injector_class(cls):
+        if sys.platform in ["linux", "linux2"]:
+            return XTestInjector
+        else:
+            raise PlayerError(f"Unsupported platform '{sys.platform}'")
+
+
+class XTestInjector:
+    """Injects events into an X server through the XTEST extension; nothing is sent until flush()"""
+
+    def __init__(self, display=None):
+        import Xlib.X
+        import Xlib.display
+        import Xlib.ext.xtest
+
+        from sneakysnek.recorders.linux_recorder import keyboard_scan_code_mapping, mouse_button_mapping
+
+        self.display = display or Xlib.display.Display()
+
+        if not self.display.has_extension("XTEST"):
+            raise PlayerError("The X server does not support the XTEST extension")
+
+        self.fake_input = Xlib.ext.xtest.fake_input
+
+        self.keycodes = dict()
+
+        for keysym, keyboard_key in keyboard_scan_code_mapping.items():
+            if keyboard_key._value_ not in self.keycodes:
+                keycode = self.display.keysym_to_keycode(keysym)
+
+                if keycode:
+                    self.keycodes[keyboard_key._value_] = keycode
+
+        self.buttons = {mouse_button._value_: button for button, mouse_button in mouse_button_mapping.items()}
+
+        self.X = Xlib.X
+
+    def inject(self, event):
+        X = self.X
+
+        if isinstance(event, KeyboardEvent):
+            keycode = self.keycodes.get(event.keyboard_key._value_)
+
+            if keycode is not None:
+                self.fake_input(self.display, X.KeyPress if event.event is KeyboardEvents.DOWN else X.KeyRelease, keycode)
+
+            return
+
+        kind = event.event
+
+        if kind is MouseEvents.MOVE:
+            self.fake_input(self.display, X.MotionNotify, x=event.x, y=event.y)
+        elif kind is MouseEvents.CLICK:
+            if event.x is not None:
+                self.fake_input(self.display, X.MotionNotify, x=event.x, y=event.y)
+
+            self.fake_input(self.display, X.ButtonPress if event.direction == "DOWN" else X.ButtonRelease, self.buttons[event.button._value_])
+        elif kind is MouseEvents.SCROLL:
+            button = 4 if event.direction == "UP" else 5
+
+            for _ in range(event.velocity or 1):
+                self.fake_input(self.display, X.ButtonPress, button)
+                self.fake_input(self.display, X.ButtonRelease, button)
+
+    def flush(self):
+        self.display.flush()
+
+    def close(self):
+        self.display.close()
@@ -1,4 +1,5 @@
 import sys
+import threading
 
 
 class RecorderError(BaseException):
@@ -7,31 +8,135 @@ class RecorderError(BaseException):
 
 class Recorder:
 
-    def __init__(self, callback):
+    # Whether the backend takes an event_filter and applies it before building events
+    filters_events = False
+
+    def __init__(self, callback, batch_callback=None, backend=None):
         self.backend = None
 
-        self._initialize_backend(callback)
+        self._initialize_backend(callback, batch_callback, backend)
+
+    def _initialize_backend(self, callback, batch_callback, backend):
+        self.backend = self._backend_class(backend)(callback, batch_callback=batch_callback)
+
+    @property
+    def is_recording(self):
+        return self.thread is not None and not self.stopped.is_set()
+
+    @property
+    def is_paused(self):
+        return False
+
+    def pause(self, timeout=None):
+        raise RecorderError(f"{self.__class__.__name__} cannot pause, stop it instead")
+
+    def resume(self, timeout=None):
+        raise RecorderError(f"{self.__class__.__name__} cannot pause, stop it instead")
+
+    def wait(self, timeout=None):
+        return self.stopped.wait(timeout)
+
+    def join(self, timeout=None):
+        if not self.wait(timeout):
+            return False
+
+        if self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+
+        return not self.thread.is_alive()
+
+    def _stop_pipeline(self):
+        if self.coalescer is not None:
+            self.coalescer.stop()
+
+        if self.dispatcher is not None:
+            self.dispatcher.stop()
+
+    @classmethod
+    def _backend_class(cls, backend=None):
+        if backend == "synthetic":
+            import sneakysnek.recorders.synthetic_recorder
+            return sneakysnek.recorders.synthetic_recorder.SyntheticRecorder
+
+        if backend is not None and backend not in backends.get(sys.platform, ()):
+            raise RecorderError(f"Unsupported backend '{backend}' on platform '{sys.platform}'")
 
-    def _initialize_backend(self, callback):
         if sys.platform in ["linux", "linux2"]:
+            if backend == "xi2":
+                import sneakysnek.recorders.xi2_recorder
+                return sneakysnek.recorders.xi2_recorder.XI2Recorder
+            elif backend == "evdev":
+                import sneakysnek.recorders.evdev_recorder
+                return sneakysnek.recorders.evdev_recorder.EvdevRecorder
+            elif backend == "multi_display":
+                import sneakysnek.recorders.multi_display_recorder
+                return sneakysnek.recorders.multi_display_recorder.MultiDisplayRecorder
+
             import sneakysnek.recorders.linux_recorder
-            self.backend = sneakysnek.recorders.linux_recorder.LinuxRecorder(callback)
+            return sneakysnek.recorders.linux_recorder.LinuxRecorder
         elif sys.platform == "darwin":
             import sneakysnek.recorders.mac_os_recorder
-            self.backend = sneakysnek.recorders.mac_os_recorder.MacOSRecorder(callback)
+            return sneakysnek.recorders.mac_os_recorder.MacOSRecorder
         elif sys.platform == "win32":
             import sneakysnek.recorders.windows_recorder
-            self.backend = sneakysnek.recorders.windows_recorder.WindowsRecorder(callback)
+            return sneakysnek.recorders.windows_recorder.WindowsRecorder
         else:
             raise RecorderError(f"Unsupported platform '{sys.platform}'")
 
+    def _emit(self, event):
+        if self.batch_callback is None:
+            self.callback(event)
+        else:
+            self.batch_callback([event])
+
+    def _emit_batch(self, events):
+        if self.batch_callback is None:
+            for event in events:
+                self.callback(event)
+        elif events:
+            self.batch_callback(events)
+
     @classmethod
-    def record(cls, callback):
-        recorder = cls(callback)
-        recorder_os =recorder.backend.__class__.record(callback)
+    def record(cls, callback=None, dispatcher=None, coalescer=None, batch_callback=None, backend=None, event_filter=None, **options):
+        if (callback is None) == (batch_callback is None):
+            raise RecorderError("Exactly one of 'callback' or 'batch_callback' is required")
+
+        if dispatcher is not None:
+            dispatcher.start(callback, batch_callback=batch_callback)
+            callback, batch_callback = dispatcher.put, dispatcher.put_batch
+
+        if coalescer is not None:
+            coalescer.start(callback, batch_callback=batch_callback)
+            callback, batch_callback = coalescer.put, coalescer.put_batch
+
+        backend_class = cls._backend_class(backend)
+
+        if event_filter is not None:
+            if backend_class.filters_events:
+                options["event_filter"] = event_filter
+            else:
+                callback, batch_callback = event_filter.wrap(callback, batch_callback=batch_callback)
+
+        # Anything else is specific to the backend, e.g. devices for evdev or profile for synthetic
+        recorder_os = backend_class.record(callback, batch_callback=batch_callback, **options)
+
+        recorder_os.dispatcher = dispatcher
+        recorder_os.coalescer = coalescer
+        recorder_os.event_filter = event_filter
 
         return recorder_os
 
+    @classmethod
+    def open(cls, max_events=65536, **kwargs):
+        import sneakysnek.async_recorder
+        return sneakysnek.async_recorder.AsyncRecorder(max_events=max_events, **kwargs)
+
+
+# Backends other than the platform default, by name. "synthetic" is available everywhere.
+backends = {
+    "linux": ("record", "xi2", "evdev", "multi_display"),
+    "linux2": ("record", "xi2", "evdev", "multi_display")
+}
 
 recorder = None
 
@@ -53,9 +158,7 @@ def demo():
 
     global recorder
     recorder = Recorder.record(handler)
-
-    while recorder.is_recording:
-        pass
+    recorder.wait()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,398 @@
+from sneakysnek.recorder import Recorder, RecorderError
+
+from sneakysnek.keyboard_keys import KeyboardKey
+from sneakysnek.mouse_buttons import MouseButton
+
+from sneakysnek.keyboard_event import KeyboardEvent, KeyboardEvents
+from sneakysnek.mouse_event import MouseEvent, DetailedMouseEvent, MouseEvents
+
+import fcntl
+import glob
+import os
+import selectors
+import struct
+import threading
+import time
+
+
+# struct input_event: struct timeval (native longs), type, code, value
+INPUT_EVENT = struct.Struct("@llHHi")
+INPUT_EVENT_SIZE = INPUT_EVENT.size
+
+READ_EVENTS = 256
+
+EV_SYN = 0x00
+EV_KEY = 0x01
+EV_REL = 0x02
+EV_ABS = 0x03
+
+SYN_REPORT = 0
+SYN_DROPPED = 3
+
+REL_X = 0x00
+REL_Y = 0x01
+REL_WHEEL = 0x08
+
+ABS_X = 0x00
+ABS_Y = 0x01
+
+# _IOW('E', 0xa0, int)
+EVIOCSCLOCKID = 0x400445a0
+CLOCK_MONOTONIC = 1
+
+
+class EvdevDevice:
+    """One /dev/input/event* node (or any descriptor replaying input_event bytes) and its partial SYN frame"""
+
+    def __init__(self, path, fd, is_owned, is_monotonic):
+        self.path = path
+        self.fd = fd
+        self.is_owned = is_owned
+        self.is_monotonic = is_monotonic
+
+        self.is_file = False
+
+        self.remainder = b""
+        self.is_dropping = False
+
+        self.dx = 0
+        self.dy = 0
+        self.has_position = False
+
+
+class EvdevRecorder(Recorder):
+    """Linux backend reading input_event structs straight from evdev nodes, without an X server"""
+
+    def __init__(self, callback, batch_callback=None, devices=None):
+        self.callback = callback
+        self.batch_callback = batch_callback
+        self.dispatcher = None
+        self.coalescer = None
+
+        self.stopped = threading.Event()
+        self.thread = None
+
+        # Positions are integrated from relative motion, starting where recording started
+        self.x = 0
+        self.y = 0
+
+        self.devices = [self._open_device(device) for device in (devices or self._discover_devices())]
+        self.devices = [device for device in self.devices if device is not None]
+
+        if not self.devices:
+            raise RecorderError("No readable input devices, check the permissions on /dev/input/event*")
+
+        self.selector = selectors.DefaultSelector()
+
+        self._wake_read, self._wake_write = os.pipe()
+        self._stopping = False
+
+        # Kernel timestamps are CLOCK_MONOTONIC where the clock could be switched, CLOCK_REALTIME otherwise
+        self._realtime_offset_ns = time.time_ns() - time.monotonic_ns()
+
+    def start(self):
+        try:
+            for device in self.devices:
+                try:
+                    self.selector.register(device.fd, selectors.EVENT_READ, device)
+                except PermissionError:
+                    # epoll refuses regular files (fixtures), which are always readable anyway
+                    device.is_file = True
+
+            self.selector.register(self._wake_read, selectors.EVENT_READ, None)
+
+            self._listen()
+        finally:
+            # stop() only signals: a callback calling it still runs on this thread, inside _listen
+            for device in self.devices:
+                self._close_device(device)
+
+            self.selector.close()
+
+            os.close(self._wake_read)
+
+            self.stopped.set()
+
+    def stop(self, timeout=None):
+        """Wakes the reading thread, which closes the devices on its way out, and waits for it"""
+        if self._stopping:
+            return
+
+        self._stopping = True
+
+        try:
+            os.write(self._wake_write, b"\x00")
+        except OSError:
+            pass
+
+        # Before joining: the thread can be blocked handing events to the pipeline, e.g. on a full BLOCK dispatcher
+        # whose worker is the thread calling stop()
+        self._stop_pipeline()
+
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+
+        os.close(self._wake_write)
+
+    def _listen(self):
+        while self.devices and not self._stopping:
+            files = [device for device in self.devices if device.is_file]
+
+            for key, _ in self.selector.select(0 if files else None):
+                if key.data is None or self._stopping:
+                    return
+
+                self._read(key.data)
+
+            for device in files:
+                if self._stopping:
+                    return
+
+                self._read(device)
+
+    def _read(self, device):
+        try:
+            data = os.read(device.fd, READ_EVENTS * INPUT_EVENT_SIZE)
+        except BlockingIOError:
+            return
+        except OSError:
+            # ENODEV: the device was unplugged
+            data = b""
+
+        if not data:
+            if not device.is_file:
+                self.selector.unregister(device.fd)
+
+            self.devices.remove(device)
+            self._close_device(device)
+            return
+
+        self._emit_batch(self.decode(device, data))
+
+    def decode(self, device, data):
+        if device.remainder:
+            data = device.remainder + data
+
+        usable = len(data) - (len(data) % INPUT_EVENT_SIZE)
+        device.remainder = data[usable:]
+
+        events = list()
+
+        for seconds, microseconds, event_type, code, value in INPUT_EVENT.iter_unpack(data[:usable]):
+            if event_type == EV_SYN:
+                if code == SYN_REPORT:
+                    if device.is_dropping:
+                        # The kernel buffer overflowed: this frame is incomplete, deltas included
+                        device.is_dropping = False
+                    elif device.dx or device.dy or device.has_position:
+                        self.x += device.dx
+                        self.y += device.dy
+
+                        timestamp, monotonic_ns = self._timestamps(device, seconds, microseconds)
+                        events.append(DetailedMouseEvent(MouseEvents.MOVE, x=self.x, y=self.y, dx=device.dx, dy=device.dy, timestamp=timestamp, monotonic_ns=monotonic_ns))
+
+                    device.dx = 0
+                    device.dy = 0
+                    device.has_position = False
+                elif code == SYN_DROPPED:
+                    device.is_dropping = True
+
+                continue
+
+            if device.is_dropping:
+                continue
+
+            if event_type == EV_REL:
+                if code == REL_X:
+                    device.dx += value
+                elif code == REL_Y:
+                    device.dy += value
+                elif code == REL_WHEEL and value:
+                    timestamp, monotonic_ns = self._timestamps(device, seconds, microseconds)
+                    events.append(MouseEvent(MouseEvents.SCROLL, direction="UP" if value > 0 else "DOWN", velocity=abs(value), x=self.x, y=self.y, timestamp=timestamp, monotonic_ns=monotonic_ns))
+            elif event_type == EV_KEY:
+                keyboard_key = keyboard_key_mapping.get(code)
+
+                if keyboard_key is not None:
+                    # Autorepeat (2) is reported as another DOWN, like the other backends do
+                    timestamp, monotonic_ns = self._timestamps(device, seconds, microseconds)
+                    events.append(KeyboardEvent(KeyboardEvents.DOWN if value else KeyboardEvents.UP, keyboard_key, timestamp=timestamp, monotonic_ns=monotonic_ns))
+                elif code in mouse_button_mapping and value != 2:
+                    timestamp, monotonic_ns = self._timestamps(device, seconds, microseconds)
+                    events.append(MouseEvent(MouseEvents.CLICK, button=mouse_button_mapping[code], direction="DOWN" if value else "UP", x=self.x, y=self.y, timestamp=timestamp, monotonic_ns=monotonic_ns))
+            elif event_type == EV_ABS:
+                # Touchpads in absolute mode and tablets, in device units
+                if code == ABS_X:
+                    self.x = value
+                    device.has_position = True
+                elif code == ABS_Y:
+                    self.y = value
+                    device.has_position = True
+
+        return events
+
+    def _timestamps(self, device, seconds, microseconds):
+        event_ns = (seconds * 1000000000) + (microseconds * 1000)
+
+        if device.is_monotonic:
+            return (event_ns + self._realtime_offset_ns) / 1000000000, event_ns
+
+        return event_ns / 1000000000, event_ns - self._realtime_offset_ns
+
+    def _discover_devices(self):
+        return sorted(glob.glob("/dev/input/event*"), key=lambda path: int(path[len("/dev/input/event"):]))
+
+    def _open_device(self, device):
+        if isinstance(device, int):
+            os.set_blocking(device, False)
+            return EvdevDevice(f"fd:{device}", device, False, False)
+
+        try:
+            fd = os.open(device, os.O_RDONLY | os.O_NONBLOCK)
+        except PermissionError:
+            return None
+
+        try:
+            fcntl.ioctl(fd, EVIOCSCLOCKID, struct.pack("i", CLOCK_MONOTONIC))
+            is_monotonic = True
+        except OSError:
+            # Not an evdev node (a fixture file or a FIFO): its timestamps are taken as CLOCK_REALTIME
+            is_monotonic = False
+
+        return EvdevDevice(device, fd, True, is_monotonic)
+
+    def _close_device(self, device):
+        if device.is_owned and device.fd is not None:
+            os.close(device.fd)
+
+        device.fd = None
+
+    @classmethod
+    def record(cls, callback, batch_callback=None, devices=None):
+        recorder = cls(callback, batch_callback=batch_callback, devices=devices)
+
+        recorder.thread = threading.Thread(target=recorder.start, args=())
+        recorder.thread.daemon = True
+        recorder.thread.start()
+
+        return recorder
+
+
+# Linux input-event-codes.h KEY_* -> KeyboardKey
+keyboard_key_mapping = {
+    1: KeyboardKey.KEY_ESCAPE,
+    2: KeyboardKey.KEY_1,
+    3: KeyboardKey.KEY_2,
+    4: KeyboardKey.KEY_3,
+    5: KeyboardKey.KEY_4,
+    6: KeyboardKey.KEY_5,
+    7: KeyboardKey.KEY_6,
+    8: KeyboardKey.KEY_7,
+    9: KeyboardKey.KEY_8,
+    10: KeyboardKey.KEY_9,
+    11: KeyboardKey.KEY_0,
+    12: KeyboardKey.KEY_MINUS,
+    13: KeyboardKey.KEY_EQUALS,
+    14: KeyboardKey.KEY_BACKSPACE,
+    15: KeyboardKey.KEY_TAB,
+    16: KeyboardKey.KEY_Q,
+    17: KeyboardKey.KEY_W,
+    18: KeyboardKey.KEY_E,
+    19: KeyboardKey.KEY_R,
+    20: KeyboardKey.KEY_T,
+    21: KeyboardKey.KEY_Y,
+    22: KeyboardKey.KEY_U,
+    23: KeyboardKey.KEY_I,
+    24: KeyboardKey.KEY_O,
+    25: KeyboardKey.KEY_P,
+    26: KeyboardKey.KEY_LEFT_BRACKET,
+    27: KeyboardKey.KEY_RIGHT_BRACKET,
+    28: KeyboardKey.KEY_RETURN,
+    29: KeyboardKey.KEY_LEFT_CTRL,
+    30: KeyboardKey.KEY_A,
+    31: KeyboardKey.KEY_S,
+    32: KeyboardKey.KEY_D,
+    33: KeyboardKey.KEY_F,
+    34: KeyboardKey.KEY_G,
+    35: KeyboardKey.KEY_H,
+    36: KeyboardKey.KEY_J,
+    37: KeyboardKey.KEY_K,
+    38: KeyboardKey.KEY_L,
+    39: KeyboardKey.KEY_SEMICOLON,
+    40: KeyboardKey.KEY_APOSTROPHE,
+    41: KeyboardKey.KEY_GRAVE,
+    42: KeyboardKey.KEY_LEFT_SHIFT,
+    43: KeyboardKey.KEY_BACKSLASH,
+    44: KeyboardKey.KEY_Z,
+    45: KeyboardKey.KEY_X,
+    46: KeyboardKey.KEY_C,
+    47: KeyboardKey.KEY_V,
+    48: KeyboardKey.KEY_B,
+    49: KeyboardKey.KEY_N,
+    50: KeyboardKey.KEY_M,
+    51: KeyboardKey.KEY_COMMA,
+    52: KeyboardKey.KEY_PERIOD,
+    53: KeyboardKey.KEY_SLASH,
+    54: KeyboardKey.KEY_RIGHT_SHIFT,
+    55: KeyboardKey.KEY_NUMPAD_MULTIPLY,
+    56: KeyboardKey.KEY_LEFT_ALT,
+    57: KeyboardKey.KEY_SPACE,
+    58: KeyboardKey.KEY_CAPSLOCK,
+    59: KeyboardKey.KEY_F1,
+    60: KeyboardKey.KEY_F2,
+    61: KeyboardKey.KEY_F3,
+    62: KeyboardKey.KEY_F4,
+    63: KeyboardKey.KEY_F5,
+    64: KeyboardKey.KEY_F6,
+    65: KeyboardKey.KEY_F7,
+    66: KeyboardKey.KEY_F8,
+    67: KeyboardKey.KEY_F9,
+    68: KeyboardKey.KEY_F10,
+    69: KeyboardKey.KEY_NUMLOCK,
+    70: KeyboardKey.KEY_SCROLL_LOCK,
+    71: KeyboardKey.KEY_NUMPAD_7,
+    72: KeyboardKey.KEY_NUMPAD_8,
+    73: KeyboardKey.KEY_NUMPAD_9,
+    74: KeyboardKey.KEY_NUMPAD_SUBTRACT,
+    75: KeyboardKey.KEY_NUMPAD_4,
+    76: KeyboardKey.KEY_NUMPAD_5,
+    77: KeyboardKey.KEY_NUMPAD_6,
+    78: KeyboardKey.KEY_NUMPAD_ADD,
+    79: KeyboardKey.KEY_NUMPAD_1,
+    80: KeyboardKey.KEY_NUMPAD_2,
+    81: KeyboardKey.KEY_NUMPAD_3,
+    82: KeyboardKey.KEY_NUMPAD_0,
+    83: KeyboardKey.KEY_NUMPAD_DECIMAL,
+    87: KeyboardKey.KEY_F11,
+    88: KeyboardKey.KEY_F12,
+    96: KeyboardKey.KEY_NUMPAD_RETURN,
+    97: KeyboardKey.KEY_RIGHT_CTRL,
+    98: KeyboardKey.KEY_NUMPAD_DIVIDE,
+    99: KeyboardKey.KEY_PRINT_SCREEN,
+    100: KeyboardKey.KEY_RIGHT_ALT,
+    102: KeyboardKey.KEY_HOME,
+    103: KeyboardKey.KEY_UP,
+    104: KeyboardKey.KEY_PAGE_UP,
+    105: KeyboardKey.KEY_LEFT,
+    106: KeyboardKey.KEY_RIGHT,
+    107: KeyboardKey.KEY_END,
+    108: KeyboardKey.KEY_DOWN,
+    109: KeyboardKey.KEY_PAGE_DOWN,
+    110: KeyboardKey.KEY_INSERT,
+    111: KeyboardKey.KEY_DELETE,
+    119: KeyboardKey.KEY_PAUSE,
+    125: KeyboardKey.KEY_LEFT_SUPER,
+    126: KeyboardKey.KEY_RIGHT_SUPER,
+    127: KeyboardKey.KEY_APP_MENU,
+    183: KeyboardKey.KEY_F13,
+    184: KeyboardKey.KEY_F14,
+    185: KeyboardKey.KEY_F15,
+    464: KeyboardKey.KEY_FN
+}
+
+# BTN_LEFT, BTN_RIGHT, BTN_MIDDLE
+mouse_button_mapping = {
+    0x110: MouseButton.LEFT,
+    0x111: MouseButton.RIGHT,
+    0x112: MouseButton.MIDDLE
+}
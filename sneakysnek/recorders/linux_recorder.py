@@ -1,12 +1,15 @@
 from sneakysnek.recorder import Recorder
+from sneakysnek.clock import ServerClock, LatencyHistogram
 
 from sneakysnek.keyboard_keys import KeyboardKey
 from sneakysnek.mouse_buttons import MouseButton
 
-from sneakysnek.keyboard_event import KeyboardEvent, KeyboardEvents
-from sneakysnek.mouse_event import MouseEvent, MouseEvents
+from sneakysnek.keyboard_event import DetailedKeyboardEvent, KeyboardEvents
+from sneakysnek.mouse_event import DetailedMouseEvent, MouseEvents
 
+import struct
 import threading
+import time
 
 import Xlib.display
 import Xlib.ext
@@ -15,12 +18,22 @@ import Xlib.XK
 import Xlib.protocol.rq
 
 
+# type, detail, time, root_x, root_y and state out of a 32-byte core input event, in the connection's (native) byte order
+CORE_EVENT = struct.Struct("=BB2xI12xhh4xH2x")
+CORE_EVENT_SIZE = CORE_EVENT.size
+
+
 class LinuxRecorder(Recorder):
 
-    def __init__(self, callback):
+    filters_events = True
+
+    def __init__(self, callback, batch_callback=None, event_filter=None):
         self.callback = callback
+        self.batch_callback = batch_callback
+        self.dispatcher = None
+        self.coalescer = None
 
-        self.is_recording = False
+        self.stopped = threading.Event()
         self.thread = None
     
         self.display_local = Xlib.display.Display()
@@ -34,143 +47,469 @@ class LinuxRecorder(Recorder):
         self.keyboard_event_thread = None
         self.mouse_event_thread = None 
 
+        self.keyboard_table = None
+        self.alt_gr_mask = 0
+
+        self._mapping_changes = dict()
+
+        self.event_filter = event_filter
+
+        # RECORD data connections whose context is enabled, i.e. that got their StartOfData reply
+        self._enabled = set()
+
+        self._paused = False
+        self._stopping = False
+
+        self._record_state = threading.Condition()
+        self._contexts_ready = threading.Event()
+
+        self._initialize_clock()
+
     def start(self):
-        self.is_recording = True
+        try:
+            self._build_keyboard_table()
 
-        self.keyboard_context = self._initialize_keyboard_context()
-        self.mouse_context = self._initialize_mouse_context()
+            self.keyboard_context = self._initialize_keyboard_context()
+            self.mouse_context = self._initialize_mouse_context()
 
-        self.keyboard_event_thread = threading.Thread(target=self.start_keyboard_recording, args=())
-        self.keyboard_event_thread.daemon = True
-        self.keyboard_event_thread.start()
+            # A filter can leave one of the contexts with nothing to record
+            if self.keyboard_context is not None:
+                self.keyboard_event_thread = threading.Thread(target=self.start_keyboard_recording, args=())
+                self.keyboard_event_thread.daemon = True
+                self.keyboard_event_thread.start()
 
-        self.mouse_event_thread = threading.Thread(target=self.start_mouse_recording, args=())
-        self.mouse_event_thread.daemon = True
-        self.mouse_event_thread.start()
+            if self.mouse_context is not None:
+                self.mouse_event_thread = threading.Thread(target=self.start_mouse_recording, args=())
+                self.mouse_event_thread.daemon = True
+                self.mouse_event_thread.start()
+        finally:
+            # Failing to start, or with nothing left to record, no recording thread is there to set it
+            if self.keyboard_event_thread is None and self.mouse_event_thread is None:
+                self.stopped.set()
 
-    def start_keyboard_recording(self):
-        self.display_record_keyboard.record_enable_context(
-            self.keyboard_context, 
-            lambda r: self.event_handler(self.display_record_keyboard, r)
-        )
+            self._contexts_ready.set()
 
-        self.display_record_keyboard.record_free_context(self.keyboard_context)
+    def start_keyboard_recording(self):
+        self._record(self.display_record_keyboard, self.keyboard_context)
 
     def start_mouse_recording(self):
-        self.display_record_mouse.record_enable_context(
-            self.mouse_context, 
-            lambda r: self.event_handler(self.display_record_mouse, r)
-        )
+        self._record(self.display_record_mouse, self.mouse_context)
 
-        self.display_record_mouse.record_free_context(self.mouse_context)
-        
-    def stop(self):
-        self.display_local.record_disable_context(self.keyboard_context)
-        self.display_local.record_disable_context(self.mouse_context)
+    def _record(self, display, context):
+        try:
+            while True:
+                with self._record_state:
+                    while self._paused and not self._stopping:
+                        self._record_state.wait()
 
-        self.display_local.flush()
+                    if self._stopping:
+                        break
+
+                # Returns once the context is disabled, by pause() or stop(), and its last replies are handled
+                display.record_enable_context(context, lambda reply: self._handle_reply(display, context, reply))
+
+                with self._record_state:
+                    self._enabled.discard(display)
+                    self._record_state.notify_all()
+
+            display.record_free_context(context)
+            display.close()
+        finally:
+            self.stopped.set()
+
+    def _handle_reply(self, display, context, reply):
+        if reply.category == Xlib.ext.record.StartOfData:
+            with self._record_state:
+                self._enabled.add(display)
+                self._record_state.notify_all()
+
+                # pause() or stop() got in between deciding to enable and the server enabling
+                if self._paused or self._stopping:
+                    self.display_local.record_disable_context(context)
+                    self.display_local.flush()
+        elif not self._stopping:
+            self.event_handler(display, reply)
+
+    @property
+    def is_paused(self):
+        return self._paused
+
+    def pause(self, timeout=None):
+        """Stops delivery, keeping the X connections and RECORD contexts for resume()
+
+        Returns once events already on their way are delivered: no callback starts after it, other than on the thread
+        calling it if that is a recording thread. Returns False on timeout.
+        """
+        with self._record_state:
+            if self._paused or self._stopping:
+                return True
+
+            self._paused = True
+
+            self._disable_contexts()
+
+            return self._record_state.wait_for(lambda: self._settled(False), timeout)
+
+    def resume(self, timeout=None):
+        """Re-enables the RECORD contexts; returns once the X server records again, or False on timeout"""
+        with self._record_state:
+            if self._stopping:
+                return False
+
+            self._paused = False
+            self._record_state.notify_all()
+
+        return self.wait_recording(timeout)
+
+    def wait_recording(self, timeout=None):
+        """Blocks until the X server records on every context; False on timeout, or when paused or stopped meanwhile"""
+        if not self._contexts_ready.wait(timeout):
+            return False
+
+        with self._record_state:
+            self._record_state.wait_for(lambda: self._paused or self._stopping or self._settled(True), timeout)
+
+            return not (self._paused or self._stopping) and self._settled(True)
+
+    def stop(self, timeout=None):
+        """Disables the RECORD contexts, stops the pipeline, joins the recording threads, then closes the X connections"""
+        with self._record_state:
+            if self._stopping:
+                return
+
+            self._stopping = True
+            self._record_state.notify_all()
+
+        current_thread = threading.current_thread()
+
+        if self.thread is not None and self.thread is not current_thread:
+            self.thread.join(timeout)
+
+        with self._record_state:
+            self._disable_contexts()
+
+        # Before joining: a recording thread can be blocked handing events to the pipeline, e.g. on a full BLOCK
+        # dispatcher whose worker is the thread calling stop()
+        self._stop_pipeline()
+
+        for context, display, thread in self._record_threads():
+            if thread is None:
+                display.close()
+            elif thread is not current_thread:
+                # The thread frees its context and closes its connection on its way out
+                thread.join(timeout)
 
-        self.display_record_keyboard.close()
-        self.display_record_mouse.close()
         self.display_local.close()
 
-        self.is_recording = False
+        self.stopped.set()
+
+    def join(self, timeout=None):
+        """Waits for the recorder to stop and for its recording threads to exit; False on timeout"""
+        if not super().join(timeout):
+            return False
+
+        current_thread = threading.current_thread()
+
+        for context, display, thread in self._record_threads():
+            if thread is not None and thread is not current_thread:
+                thread.join(timeout)
+
+                if thread.is_alive():
+                    return False
+
+        return True
+
+    def _record_threads(self):
+        return [
+            (self.keyboard_context, self.display_record_keyboard, self.keyboard_event_thread),
+            (self.mouse_context, self.display_record_mouse, self.mouse_event_thread)
+        ]
+
+    def _disable_contexts(self):
+        for context, display, thread in self._record_threads():
+            if display in self._enabled:
+                self.display_local.record_disable_context(context)
+
+        self.display_local.flush()
+
+    def _settled(self, enabled):
+        """Whether every recording thread, other than the current one, has its context in the given state"""
+        current_thread = threading.current_thread()
+
+        for context, display, thread in self._record_threads():
+            if thread is None or thread is current_thread or not thread.is_alive():
+                continue
+
+            if (display in self._enabled) != enabled:
+                return False
+
+        return True
 
     def event_handler(self, display, reply):
-        data = reply.data
-        
-        while len(data):
-            event, data = Xlib.protocol.rq.EventField(None).parse_binary_value(
-                data, 
-                display.display, 
-                None, 
-                None
-            )
-
-            if event.type in [Xlib.X.KeyPress, Xlib.X.KeyRelease]:
-                index = self._shift_to_index(self.display_local, event.state)
-                scan_code = self._keycode_to_scan_code(self.display_local, event.detail, index)
-
-                if scan_code in keyboard_scan_code_mapping:
-                    keyboard_key = keyboard_scan_code_mapping[scan_code]
+        received_ns = time.monotonic_ns()
+
+        # The keyboard and mouse threads share the clock: observe() and correct() of one reply must not interleave
+        with self._clock_lock:
+            events, filtered = self._decode(display, reply.data, received_ns)
+
+            if events:
+                self._observe_latencies(events, received_ns)
+
+        if filtered:
+            self.event_filter.count("decode", filtered)
+
+        self._emit_batch(events)
+
+    def _decode(self, display, data, received_ns):
+        """(events, count dropped by the filter) out of the data of a RECORD reply"""
+        events = list()
+
+        filtered = 0
+
+        if len(data) % CORE_EVENT_SIZE:
+            # Not a run of 32-byte core events, let python-xlib work out the record boundaries
+            while len(data):
+                event, data = Xlib.protocol.rq.EventField(None).parse_binary_value(data, display.display, None, None)
+
+                if self._handle_xlib_event(event, events, received_ns):
+                    filtered += 1
+        else:
+            # Events in a reply are in server order, so the last one has the smallest receive delay
+            offset = len(data) - CORE_EVENT_SIZE
+
+            while offset >= 0:
+                event_type, _, server_time, _, _, _ = CORE_EVENT.unpack_from(data, offset)
+
+                if event_type & 0x7f in core_event_types:
+                    self.clock.observe(server_time, received_ns)
+                    break
+
+                offset -= CORE_EVENT_SIZE
+
+            for index, (event_type, detail, server_time, root_x, root_y, state) in enumerate(CORE_EVENT.iter_unpack(data)):
+                event_type &= 0x7f
+
+                if event_type in core_event_types:
+                    if self._handle_event(event_type, detail, state, root_x, root_y, None, events, server_time, received_ns):
+                        filtered += 1
                 else:
-                    return None
+                    offset = index * CORE_EVENT_SIZE
+                    event, _ = Xlib.protocol.rq.EventField(None).parse_binary_value(data[offset:offset + CORE_EVENT_SIZE], display.display, None, None)
 
-                self.callback(KeyboardEvent(KeyboardEvents.DOWN if event.type == Xlib.X.KeyPress else KeyboardEvents.UP, keyboard_key))
-            elif event.type == Xlib.X.ButtonPress:
-                if event.detail in mouse_button_mapping:
-                    button = mouse_button_mapping[event.detail]
+                    self._handle_xlib_event(event, events, received_ns)
 
-                    x = event.root_x
-                    y = event.root_y
+        return events, filtered
 
-                    self.callback(MouseEvent(MouseEvents.CLICK, button=button, direction="DOWN", x=x, y=y))
-            elif event.type == Xlib.X.ButtonRelease:
-                if event.detail in mouse_button_mapping:
-                    button = mouse_button_mapping[event.detail]
+    def _observe_latencies(self, events, received_ns):
+        self.server_to_receive.observe_many([received_ns - event.monotonic_ns for event in events if event.source_ns is not None])
+        self.receive_to_callback.observe(time.monotonic_ns() - received_ns, len(events))
 
-                    x = event.root_x
-                    y = event.root_y
+    def _handle_xlib_event(self, event, events, received_ns):
+        if event.type in core_event_types:
+            self.clock.observe(event.time, received_ns)
+            return self._handle_event(event.type, event.detail, event.state, event.root_x, event.root_y, None, events, event.time, received_ns)
+        else:
+            return self._handle_event(event.type, 0, 0, None, None, event, events)
 
-                    self.callback(MouseEvent(MouseEvents.CLICK, button=button, direction="UP", x=x, y=y))
-                elif event.detail in [4, 5]:
-                    direction = "UP" if event.detail == 4 else "DOWN"
+    def _handle_event(self, event_type, detail, state, x, y, event, events, server_time=None, received_ns=None):
+        """Appends the event to events, or returns True when the filter drops it"""
+        if self.event_filter is not None and self._is_filtered(event_type, detail, state, x, y):
+            return True
 
-                    x = event.root_x
-                    y = event.root_y
-                    
-                    self.callback(MouseEvent(MouseEvents.SCROLL, direction=direction, velocity=1, x=x, y=y))
-            elif event.type == Xlib.X.MotionNotify:
-                self.callback(MouseEvent(MouseEvents.MOVE, x=event.root_x, y=event.root_y))
+        if server_time is None:
+            received_ns = source_ns = None
+            monotonic_ns = time.monotonic_ns()
+        else:
+            # Stamped when the server saw the event, mapped onto this host's clock
+            source_ns, monotonic_ns = self.clock.correct(server_time, received_ns)
+
+        timestamp = (monotonic_ns + self._realtime_offset_ns) / 1000000000
+
+        if event_type == Xlib.X.MotionNotify:
+            events.append(DetailedMouseEvent(MouseEvents.MOVE, x=x, y=y, timestamp=timestamp, monotonic_ns=monotonic_ns, received_ns=received_ns, source_ns=source_ns))
+        elif event_type == Xlib.X.KeyPress or event_type == Xlib.X.KeyRelease:
+            if self._mapping_changes:
+                self._build_keyboard_table()
+
+            keyboard_key = self.keyboard_table[(detail << 2) | (state & 1) | (2 if state & self.alt_gr_mask else 0)]
+
+            if keyboard_key is not None:
+                events.append(DetailedKeyboardEvent(KeyboardEvents.DOWN if event_type == Xlib.X.KeyPress else KeyboardEvents.UP, keyboard_key, timestamp=timestamp, monotonic_ns=monotonic_ns, received_ns=received_ns, source_ns=source_ns))
+        elif event_type == Xlib.X.ButtonPress:
+            if detail in mouse_button_mapping:
+                events.append(DetailedMouseEvent(MouseEvents.CLICK, button=mouse_button_mapping[detail], direction="DOWN", x=x, y=y, timestamp=timestamp, monotonic_ns=monotonic_ns, received_ns=received_ns, source_ns=source_ns))
+        elif event_type == Xlib.X.ButtonRelease:
+            if detail in mouse_button_mapping:
+                events.append(DetailedMouseEvent(MouseEvents.CLICK, button=mouse_button_mapping[detail], direction="UP", x=x, y=y, timestamp=timestamp, monotonic_ns=monotonic_ns, received_ns=received_ns, source_ns=source_ns))
+            elif detail in [4, 5]:
+                events.append(DetailedMouseEvent(MouseEvents.SCROLL, direction="UP" if detail == 4 else "DOWN", velocity=1, x=x, y=y, timestamp=timestamp, monotonic_ns=monotonic_ns, received_ns=received_ns, source_ns=source_ns))
+        elif event_type == Xlib.X.MappingNotify:
+            # Every client receives its own copy, so only distinct changes are kept for the next rebuild
+            self._mapping_changes[(event.request, event.first_keycode, event.count)] = event
+
+    def _is_filtered(self, event_type, detail, state, x, y):
+        """Whether the filter drops a core input event, decided before anything is built for it"""
+        event_filter = self.event_filter
+
+        # Motion first, it makes up nearly all of the traffic
+        if event_type == Xlib.X.MotionNotify:
+            if event_filter.kind_values is not None and "MOVE" not in event_filter.kind_values:
+                return True
+
+            return event_filter.bounds is not None and not event_filter.contains(x, y)
+
+        if event_type == Xlib.X.KeyPress or event_type == Xlib.X.KeyRelease:
+            if not event_filter.wants(KeyboardEvents.DOWN if event_type == Xlib.X.KeyPress else KeyboardEvents.UP):
+                return True
+
+            if event_filter.key_values is None:
+                return False
+
+            if self._mapping_changes:
+                self._build_keyboard_table()
+
+            keyboard_key = self.keyboard_table[(detail << 2) | (state & 1) | (2 if state & self.alt_gr_mask else 0)]
+
+            # Unmapped keys are dropped anyway, they are not the filter's doing
+            return keyboard_key is not None and keyboard_key._value_ not in event_filter.key_values
+
+        if (event_type == Xlib.X.ButtonPress or event_type == Xlib.X.ButtonRelease) and detail in mouse_button_mapping:
+            kind = MouseEvents.CLICK
+
+            if event_filter.button_values is not None and mouse_button_mapping[detail]._value_ not in event_filter.button_values:
+                return True
+        elif event_type == Xlib.X.ButtonRelease and detail in [4, 5]:
+            kind = MouseEvents.SCROLL
+        else:
+            return False
+
+        if not event_filter.wants(kind):
+            return True
+
+        return event_filter.bounds is not None and not event_filter.contains(x, y)
 
     def _initialize_keyboard_context(self):
-        return self.display_record_keyboard.record_create_context(
-            0,
-            [Xlib.ext.record.AllClients],
-            [{
-                    'core_requests': (0, 0),
-                    'core_replies': (0, 0),
-                    'ext_requests': (0, 0, 0, 0),
-                    'ext_replies': (0, 0, 0, 0),
-                    'delivered_events': (0, 0),
-                    'device_events': (
-                        Xlib.X.KeyPress,
-                        Xlib.X.KeyRelease
-                    ),
-                    'errors': (0, 0),
-                    'client_started': False,
-                    'client_died': False,
-            }]
-        )
-    
+        return self._create_context(self.display_record_keyboard, [self._keyboard_range()])
+
     def _initialize_mouse_context(self):
-        return self.display_record_mouse.record_create_context(
-            0,
-            [Xlib.ext.record.AllClients],
-            [{
-                    'core_requests': (0, 0),
-                    'core_replies': (0, 0),
-                    'ext_requests': (0, 0, 0, 0),
-                    'ext_replies': (0, 0, 0, 0),
-                    'delivered_events': (0, 0),
-                    'device_events': (
-                        Xlib.X.ButtonPressMask,
-                        Xlib.X.ButtonReleaseMask
-                    ),
-                    'errors': (0, 0),
-                    'client_started': False,
-                    'client_died': False,
-            }]
-        )
-
-    def _shift_to_index(self, display, shift):
-        return ((1 if shift & 1 else 0) + (2 if shift & self._alt_gr_mask(display) else 0))
-
-    def _alt_gr_mask(self, display):
-        if not hasattr(display, "__altgr_mask"):
-            display.__altgr_mask = self._find_mask(display, "Mode_switch")
-        
-        return display.__altgr_mask
+        return self._create_context(self.display_record_mouse, [self._mouse_range()])
+
+    def _create_context(self, display, ranges):
+        """A RECORD context for all clients over the ranges that are not None, if any"""
+        ranges = [record_range for record_range in ranges if record_range is not None]
+
+        if not ranges:
+            return None
+
+        return display.record_create_context(0, [Xlib.ext.record.AllClients], ranges)
+
+    def _keyboard_range(self):
+        device_events = self._device_events([
+            (KeyboardEvents.DOWN, Xlib.X.KeyPress),
+            (KeyboardEvents.UP, Xlib.X.KeyRelease)
+        ], "keyboard")
+
+        if device_events is None:
+            return None
+
+        return {
+            'core_requests': (0, 0),
+            'core_replies': (0, 0),
+            'ext_requests': (0, 0, 0, 0),
+            'ext_replies': (0, 0, 0, 0),
+            'delivered_events': (Xlib.X.MappingNotify, Xlib.X.MappingNotify),
+            'device_events': device_events,
+            'errors': (0, 0),
+            'client_started': False,
+            'client_died': False,
+        }
+
+    def _mouse_range(self):
+        # Scrolling arrives as releases of buttons 4 and 5
+        device_events = self._device_events([
+            (MouseEvents.CLICK, Xlib.X.ButtonPress),
+            (MouseEvents.CLICK, Xlib.X.ButtonRelease),
+            (MouseEvents.SCROLL, Xlib.X.ButtonRelease),
+            (MouseEvents.MOVE, Xlib.X.MotionNotify)
+        ], "mouse")
+
+        if device_events is None:
+            return None
+
+        return {
+            'core_requests': (0, 0),
+            'core_replies': (0, 0),
+            'ext_requests': (0, 0, 0, 0),
+            'ext_replies': (0, 0, 0, 0),
+            'delivered_events': (0, 0),
+            'device_events': device_events,
+            'errors': (0, 0),
+            'client_started': False,
+            'client_died': False,
+        }
+
+    def _device_events(self, kind_event_types, name):
+        """The (first, last) range of event types a RECORD context needs for the kinds the filter wants, if any"""
+        event_types = [event_type for kind, event_type in kind_event_types if self.event_filter is None or self.event_filter.wants(kind)]
+
+        if not event_types:
+            device_events = None
+        else:
+            device_events = (min(event_types), max(event_types))
+
+        if self.event_filter is not None:
+            self.event_filter.pushed_down[f"{name}_device_events"] = device_events
+
+        return device_events
+
+    def _initialize_clock(self):
+        self.clock = ServerClock()
+
+        self.server_to_receive = LatencyHistogram()
+        self.receive_to_callback = LatencyHistogram()
+
+        self._clock_lock = threading.Lock()
+
+        self._realtime_offset_ns = time.time_ns() - time.monotonic_ns()
+
+    def latency_stats(self):
+        return {
+            "server_to_receive": self.server_to_receive.stats(),
+            "receive_to_callback": self.receive_to_callback.stats(),
+            "clock_offset_ns": self.clock.offset_ns,
+            "clock_drift_ppm": self.clock.drift_ppm
+        }
+
+    def held_input(self):
+        """KeyboardKeys and MouseButtons held right now, plus the cursor position, as the X server sees them"""
+        if self._mapping_changes or self.keyboard_table is None:
+            self._build_keyboard_table()
+
+        keyboard_keys = list()
+
+        for index, byte in enumerate(self.display_local.query_keymap()):
+            for bit in range(8):
+                if byte & (1 << bit):
+                    keyboard_key = self.keyboard_table[((index * 8) + bit) << 2]
+
+                    if keyboard_key is not None:
+                        keyboard_keys.append(keyboard_key)
+
+        pointer = self.display_local.screen().root.query_pointer()
+
+        # Button1Mask is bit 8 of the pointer state, and so on
+        mouse_buttons = [mouse_button for detail, mouse_button in mouse_button_mapping.items() if pointer.mask & (1 << (detail + 7))]
+
+        return keyboard_keys, mouse_buttons, pointer.root_x, pointer.root_y
+
+    def _build_keyboard_table(self):
+        for event in self._mapping_changes.values():
+            self.display_local.refresh_keyboard_mapping(event)
+
+        self._mapping_changes = dict()
+
+        self.alt_gr_mask = self._find_mask(self.display_local, "Mode_switch")
+        self.keyboard_table = build_keyboard_table(self.display_local)
 
     def _find_mask(self, display, symbol):
         modifier_keycode = display.keysym_to_keycode(Xlib.XK.string_to_keysym(symbol))
@@ -182,21 +521,9 @@ class LinuxRecorder(Recorder):
 
         return 0
 
-    def _keycode_to_scan_code(self, display, keycode, index):
-        scan_code = display.keycode_to_keysym(keycode, index)
-
-        if scan_code:
-            return scan_code
-        elif index & 0x2:
-            return self._keycode_to_scan_code(display, keycode, index & ~0x2)
-        elif index & 0x1:
-            return self._keycode_to_scan_code(display, keycode, index & ~0x1)
-        else:
-            return 0
-
     @classmethod
-    def record(cls, callback):
-        recorder = cls(callback)
+    def record(cls, callback, batch_callback=None, event_filter=None):
+        recorder = cls(callback, batch_callback=batch_callback, event_filter=event_filter)
 
         recorder.thread = threading.Thread(target=recorder.start, args=())
         recorder.thread.daemon = True
@@ -204,6 +531,36 @@ class LinuxRecorder(Recorder):
 
         return recorder
 
+
+def keycode_to_scan_code(display, keycode, index):
+    scan_code = display.keycode_to_keysym(keycode, index)
+
+    if scan_code:
+        return scan_code
+    elif index & 0x2:
+        return keycode_to_scan_code(display, keycode, index & ~0x2)
+    elif index & 0x1:
+        return keycode_to_scan_code(display, keycode, index & ~0x1)
+    else:
+        return 0
+
+
+def build_keyboard_table(display):
+    """Flat keycode x modifier index (shift, AltGr) -> KeyboardKey table, indexed by (keycode << 2) | index"""
+    table = [None] * (256 * 4)
+
+    for keycode in range(8, 256):
+        unmodified_key = keyboard_scan_code_mapping.get(keycode_to_scan_code(display, keycode, 0))
+
+        for index in range(4):
+            keyboard_key = keyboard_scan_code_mapping.get(keycode_to_scan_code(display, keycode, index))
+
+            # Shifted symbols ('A', '!') have no entry of their own: they are still the same physical key
+            table[(keycode << 2) | index] = unmodified_key if keyboard_key is None else keyboard_key
+
+    return table
+
+
 keyboard_scan_code_mapping = {
     65307: KeyboardKey.KEY_ESCAPE,
     65470: KeyboardKey.KEY_F1,
@@ -310,6 +667,15 @@ keyboard_scan_code_mapping = {
     65516: KeyboardKey.KEY_RIGHT_WINDOWS
 }
 
+# Event types whose fields all come straight out of CORE_EVENT, anything else is parsed by python-xlib
+core_event_types = {
+    Xlib.X.KeyPress,
+    Xlib.X.KeyRelease,
+    Xlib.X.ButtonPress,
+    Xlib.X.ButtonRelease,
+    Xlib.X.MotionNotify
+}
+
 mouse_button_mapping = {
     1 : MouseButton.LEFT,
     2 : MouseButton.MIDDLE,
@@ -16,10 +16,13 @@ mouse_click_up_events = [Quartz.kCGEventLeftMouseUp, Quartz.kCGEventRightMouseUp
 
 class MacOSRecorder(Recorder):
 
-    def __init__(self, callback):
+    def __init__(self, callback, batch_callback=None):
         self.callback = callback
+        self.batch_callback = batch_callback
+        self.dispatcher = None
+        self.coalescer = None
 
-        self.is_recording = False
+        self.stopped = threading.Event()
         self.thread = None
 
         self.event_tap = Quartz.CGEventTapCreate(
@@ -42,19 +45,22 @@ class MacOSRecorder(Recorder):
         )
 
     def start(self):
-        self.is_recording = True
+        try:
+            loop_source = Quartz.CFMachPortCreateRunLoopSource(None, self.event_tap, 0)
+            loop = Quartz.CFRunLoopGetCurrent()
 
-        loop_source = Quartz.CFMachPortCreateRunLoopSource(None, self.event_tap, 0)
-        loop = Quartz.CFRunLoopGetCurrent()
+            Quartz.CFRunLoopAddSource(loop, loop_source, Quartz.kCFRunLoopDefaultMode)
+            Quartz.CGEventTapEnable(self.event_tap, True)
 
-        Quartz.CFRunLoopAddSource(loop, loop_source, Quartz.kCFRunLoopDefaultMode)
-        Quartz.CGEventTapEnable(self.event_tap, True)
-
-        while self.is_recording:
-            Quartz.CFRunLoopRunInMode(Quartz.kCFRunLoopDefaultMode, 5, False)
+            while not self.stopped.is_set():
+                Quartz.CFRunLoopRunInMode(Quartz.kCFRunLoopDefaultMode, 5, False)
+        finally:
+            self.stopped.set()
 
     def stop(self):
-        self.is_recording = False
+        self.stopped.set()
+
+        self._stop_pipeline()
 
     def event_handler(self, proxy, event_type, event, *args):
         if event_type in [Quartz.kCGEventKeyDown, Quartz.kCGEventKeyUp]:
@@ -66,7 +72,7 @@ class MacOSRecorder(Recorder):
 
             keyboard_event = KeyboardEvents.UP if event_type == Quartz.kCGEventKeyUp else KeyboardEvents.DOWN
 
-            self.callback(KeyboardEvent(keyboard_event, keyboard_key))
+            self._emit(KeyboardEvent(keyboard_event, keyboard_key))
         elif event_type == Quartz.kCGEventFlagsChanged:
             scan_code = Quartz.CGEventGetIntegerValueField(event, Quartz.kCGKeyboardEventKeycode)
             keyboard_key = keyboard_scan_code_mapping.get(scan_code)
@@ -89,7 +95,7 @@ class MacOSRecorder(Recorder):
             else:
                 keyboard_event = KeyboardEvents.UP
 
-            self.callback(KeyboardEvent(keyboard_event, keyboard_key))
+            self._emit(KeyboardEvent(keyboard_event, keyboard_key))
         elif event_type in (mouse_click_down_events + mouse_click_up_events):
             direction = "DOWN" if event_type in mouse_click_down_events else "UP"
 
@@ -105,26 +111,26 @@ class MacOSRecorder(Recorder):
                 else:
                     return event
 
-            self.callback(MouseEvent(MouseEvents.CLICK, button=button, direction=direction, x=x, y=y))
+            self._emit(MouseEvent(MouseEvents.CLICK, button=button, direction=direction, x=x, y=y))
         elif event_type == Quartz.kCGEventScrollWheel:
             x, y = [int(i) for i in Quartz.CGEventGetLocation(event)]
 
             velocity = Quartz.CGEventGetIntegerValueField(event, Quartz.kCGScrollWheelEventDeltaAxis1)
             direction = "UP" if velocity > 0 else "DOWN"
 
-            self.callback(MouseEvent(MouseEvents.SCROLL, direction=direction, velocity=abs(velocity), x=x, y=y))
+            self._emit(MouseEvent(MouseEvents.SCROLL, direction=direction, velocity=abs(velocity), x=x, y=y))
         elif event_type == Quartz.kCGEventMouseMoved:
             x, y = [int(i) for i in Quartz.CGEventGetLocation(event)]
 
-            self.callback(MouseEvent(MouseEvents.MOVE, x=x, y=y))
+            self._emit(MouseEvent(MouseEvents.MOVE, x=x, y=y))
         else:
             return event
 
         return event
 
     @classmethod
-    def record(cls, callback):
-        recorder = cls(callback)
+    def record(cls, callback, batch_callback=None):
+        recorder = cls(callback, batch_callback=batch_callback)
 
         recorder.thread = threading.Thread(target=recorder.start, args=())
         recorder.thread.daemon = True
@@ -0,0 +1,241 @@
+from sneakysnek.recorder import Recorder, RecorderError
+
+from sneakysnek.recorders.linux_recorder import LinuxRecorder
+
+import os
+import selectors
+import threading
+
+import Xlib.display
+import Xlib.error
+import Xlib.ext
+
+
+class DisplayRecording(LinuxRecorder):
+    """One display of a MultiDisplayRecorder: its control and data connections, RECORD context and decoding state
+
+    Decoding is LinuxRecorder's, with this display's keyboard table and server clock. Nothing here blocks: the
+    recorder's loop reads the data connection when it is readable and the replies come back through _handle_record.
+    """
+
+    def __init__(self, name, recorder, event_filter=None):
+        self.name = name
+        self.recorder = recorder
+
+        self.callback = None
+        self.batch_callback = None
+
+        self.display_local = Xlib.display.Display(name)
+
+        try:
+            self.display_record = Xlib.display.Display(name)
+        except BaseException:
+            self.display_local.close()
+            raise
+
+        self.context = None
+        self.is_enabled = False
+
+        self.keyboard_table = None
+        self.alt_gr_mask = 0
+
+        self._mapping_changes = dict()
+
+        self.event_filter = event_filter
+
+        self._initialize_clock()
+
+    def enable(self):
+        """Creates one context for keyboard and mouse and enables it without waiting for its first reply"""
+        self._build_keyboard_table()
+
+        self.context = self._create_context(self.display_record, [self._keyboard_range(), self._mouse_range()])
+
+        if self.context is None:
+            return False
+
+        display = self.display_record.display
+
+        Xlib.ext.record.EnableContext(
+            callback=self._handle_record,
+            display=display,
+            opcode=display.get_extension_major(Xlib.ext.record.extname),
+            context=self.context,
+            defer=True
+        )
+
+        self.display_record.flush()
+
+        return True
+
+    def read(self):
+        """Reads whatever the data connection holds, handing every complete RECORD reply to _handle_record"""
+        self.display_record.pending_events()
+
+    def _handle_record(self, reply):
+        if reply.category == Xlib.ext.record.StartOfData:
+            self.is_enabled = True
+            self.recorder._display_enabled()
+        elif reply.category == Xlib.ext.record.EndOfData:
+            self.is_enabled = False
+        else:
+            self.event_handler(self.display_record, reply)
+
+    def _emit_batch(self, events):
+        name = self.name
+
+        for event in events:
+            event.display = name
+
+        self.recorder._emit_batch(events)
+
+    def close(self):
+        """Disables the context, then closes both connections; the server frees the context with its client"""
+        try:
+            if self.is_enabled:
+                self.display_local.record_disable_context(self.context)
+                self.display_local.flush()
+        except (OSError, Xlib.error.ConnectionClosedError):
+            pass
+
+        for display in (self.display_record, self.display_local):
+            try:
+                display.close()
+            except (OSError, Xlib.error.ConnectionClosedError):
+                pass
+
+
+class MultiDisplayRecorder(Recorder):
+    """Records any number of X displays from a single thread
+
+    Each display takes two connections and one RECORD context, enabled without blocking. One selectors loop reads
+    every data connection as it becomes readable, so callbacks all run on that thread. Events carry the name of the
+    display they came from in event.display. A display whose server goes away is dropped (see lost) while the others
+    keep recording.
+    """
+
+    filters_events = True
+
+    def __init__(self, callback, batch_callback=None, event_filter=None, displays=None):
+        if not displays:
+            raise RecorderError("At least one display name is required, e.g. displays=[':1', ':2']")
+
+        self.callback = callback
+        self.batch_callback = batch_callback
+        self.dispatcher = None
+        self.coalescer = None
+
+        self.stopped = threading.Event()
+        self.thread = None
+
+        self.event_filter = event_filter
+
+        self.recordings = list()
+
+        try:
+            for name in displays:
+                self.recordings.append(DisplayRecording(name, self, event_filter=event_filter))
+        except BaseException:
+            for recording in self.recordings:
+                recording.close()
+
+            raise
+
+        # Display name -> the error its connection failed with
+        self.lost = dict()
+
+        self._stopping = False
+        self._all_enabled = threading.Event()
+
+        self._wake_read, self._wake_write = os.pipe()
+
+    def start(self):
+        selector = selectors.DefaultSelector()
+
+        try:
+            selector.register(self._wake_read, selectors.EVENT_READ, None)
+
+            for recording in self.recordings:
+                try:
+                    if not recording.enable():
+                        continue
+                except (OSError, Xlib.error.ConnectionClosedError) as e:
+                    self.lost[recording.name] = e
+                    continue
+
+                # By file descriptor: a closed Display raises from fileno()
+                selector.register(recording.display_record.fileno(), selectors.EVENT_READ, recording)
+
+            self._display_enabled()
+            self._listen(selector)
+        finally:
+            selector.close()
+
+            for recording in self.recordings:
+                recording.close()
+
+            os.close(self._wake_read)
+
+            self.stopped.set()
+
+    def _listen(self, selector):
+        while len(selector.get_map()) > 1:
+            for key, _ in selector.select():
+                recording = key.data
+
+                if recording is None or self._stopping:
+                    return
+
+                try:
+                    recording.read()
+                except (OSError, Xlib.error.ConnectionClosedError) as e:
+                    selector.unregister(key.fd)
+                    self.lost[recording.name] = e
+
+                    self._display_enabled()
+
+    def _display_enabled(self):
+        for recording in self.recordings:
+            if recording.context is not None and not recording.is_enabled and recording.name not in self.lost:
+                return
+
+        self._all_enabled.set()
+
+    def wait_recording(self, timeout=None):
+        """Blocks until the X server records on every display; False on timeout"""
+        return self._all_enabled.wait(timeout)
+
+    def stop(self, timeout=None):
+        """Stops the loop, which disables every context and closes the connections on its way out"""
+        if self._stopping:
+            return
+
+        self._stopping = True
+
+        try:
+            os.write(self._wake_write, b"\x00")
+        except OSError:
+            # The loop already ended, every display being lost
+            pass
+
+        # Before joining: the loop can be blocked handing events to the pipeline, e.g. on a full BLOCK dispatcher whose
+        # worker is the thread calling stop()
+        self._stop_pipeline()
+
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+
+        os.close(self._wake_write)
+
+    def latency_stats(self):
+        return {recording.name: recording.latency_stats() for recording in self.recordings}
+
+    @classmethod
+    def record(cls, callback, batch_callback=None, event_filter=None, displays=None):
+        recorder = cls(callback, batch_callback=batch_callback, event_filter=event_filter, displays=displays)
+
+        recorder.thread = threading.Thread(target=recorder.start, args=(), name="sneakysnek-displays")
+        recorder.thread.daemon = True
+        recorder.thread.start()
+
+        return recorder
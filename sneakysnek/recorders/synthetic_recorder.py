@@ -0,0 +1,166 @@
+from sneakysnek.recorder import Recorder, RecorderError
+
+from sneakysnek.keyboard_keys import KeyboardKey
+from sneakysnek.mouse_buttons import MouseButton
+
+from sneakysnek.keyboard_event import KeyboardEvent, KeyboardEvents
+from sneakysnek.mouse_event import MouseEvent, MouseEvents
+
+import math
+import threading
+import time
+
+
+class SyntheticStream:
+    """Events at a fixed rate: make_event(i, monotonic_ns) builds the i-th one"""
+
+    def __init__(self, name, rate_hz, make_event):
+        if rate_hz <= 0:
+            raise ValueError("rate_hz must be positive")
+
+        self.name = name
+        self.rate_hz = rate_hz
+        self.make_event = make_event
+
+        self.interval_ns = 1000000000 / rate_hz
+
+
+def mouse_moves(rate_hz=8000, radius=400):
+    """A cursor circling the middle of a 1080p screen once per second"""
+    def make_event(i, monotonic_ns):
+        angle = (i / rate_hz) * 2 * math.pi
+        return MouseEvent(MouseEvents.MOVE, x=int(960 + radius * math.cos(angle)), y=int(540 + radius * math.sin(angle)), monotonic_ns=monotonic_ns)
+
+    return SyntheticStream("mouse_moves", rate_hz, make_event)
+
+
+def key_mash(rate_hz=100, keys=(KeyboardKey.KEY_W, KeyboardKey.KEY_A, KeyboardKey.KEY_S, KeyboardKey.KEY_D, KeyboardKey.KEY_SPACE)):
+    """Alternating DOWN / UP across keys, rate_hz events (half as many key taps) per second"""
+    def make_event(i, monotonic_ns):
+        return KeyboardEvent(KeyboardEvents.DOWN if i % 2 == 0 else KeyboardEvents.UP, keys[(i // 2) % len(keys)], monotonic_ns=monotonic_ns)
+
+    return SyntheticStream("key_mash", rate_hz, make_event)
+
+
+def scroll_storm(rate_hz=1000):
+    """Free-spinning wheel, flipping direction every second"""
+    def make_event(i, monotonic_ns):
+        return MouseEvent(MouseEvents.SCROLL, direction="UP" if (i // rate_hz) % 2 == 0 else "DOWN", velocity=1, x=960, y=540, monotonic_ns=monotonic_ns)
+
+    return SyntheticStream("scroll_storm", rate_hz, make_event)
+
+
+def clicks(rate_hz=20, button=MouseButton.LEFT):
+    def make_event(i, monotonic_ns):
+        return MouseEvent(MouseEvents.CLICK, button=button, direction="DOWN" if i % 2 == 0 else "UP", x=960, y=540, monotonic_ns=monotonic_ns)
+
+    return SyntheticStream("clicks", rate_hz, make_event)
+
+
+class SyntheticRecorder(Recorder):
+    """Generates event streams at controlled rates instead of capturing input, for load testing consumers"""
+
+    def __init__(self, callback, batch_callback=None, profile="mixed", seconds=None, tick_ms=1):
+        self.callback = callback
+        self.batch_callback = batch_callback
+        self.dispatcher = None
+        self.coalescer = None
+
+        self.stopped = threading.Event()
+        self.thread = None
+
+        if isinstance(profile, str):
+            if profile not in profiles:
+                raise RecorderError(f"Unknown synthetic profile '{profile}', expected one of {sorted(profiles)}")
+
+            profile = profiles[profile]()
+
+        self.streams = list(profile)
+
+        self.seconds = seconds
+        self.tick_ns = int(tick_ms * 1000000)
+
+        self.generated = 0
+
+    def start(self):
+        try:
+            self._generate()
+        finally:
+            self.stopped.set()
+
+    def stop(self, timeout=None):
+        self.stopped.set()
+
+        # Before joining: the generator can be blocked handing events to the pipeline, e.g. on a full BLOCK dispatcher
+        # whose worker is the thread calling stop()
+        self._stop_pipeline()
+
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+
+    def _generate(self):
+        started_ns = time.monotonic_ns()
+        end_ns = None if self.seconds is None else started_ns + int(self.seconds * 1000000000)
+
+        counts = [0] * len(self.streams)
+        tick_ns = started_ns
+
+        while not self.stopped.is_set():
+            tick_ns += self.tick_ns
+
+            if end_ns is not None and tick_ns > end_ns:
+                tick_ns = end_ns
+
+            remaining_ns = tick_ns - time.monotonic_ns()
+
+            if remaining_ns > 0 and self.stopped.wait(remaining_ns / 1000000000):
+                return
+
+            # Every event that fell due during the tick goes out in one batch, stamped with its due time
+            events = list()
+
+            for index, stream in enumerate(self.streams):
+                i = counts[index]
+
+                while True:
+                    due_ns = started_ns + int(i * stream.interval_ns)
+
+                    if due_ns > tick_ns:
+                        break
+
+                    events.append(stream.make_event(i, due_ns))
+                    i += 1
+
+                counts[index] = i
+
+            if len(self.streams) > 1:
+                events.sort(key=_monotonic_ns)
+
+            self.generated += len(events)
+            self._emit_batch(events)
+
+            if tick_ns == end_ns:
+                return
+
+    @classmethod
+    def record(cls, callback, batch_callback=None, profile="mixed", seconds=None, tick_ms=1):
+        recorder = cls(callback, batch_callback=batch_callback, profile=profile, seconds=seconds, tick_ms=tick_ms)
+
+        recorder.thread = threading.Thread(target=recorder.start, args=())
+        recorder.thread.daemon = True
+        recorder.thread.start()
+
+        return recorder
+
+
+def _monotonic_ns(event):
+    return event.monotonic_ns
+
+
+profiles = {
+    "mouse_8khz": lambda: [mouse_moves(8000)],
+    "mouse_1khz": lambda: [mouse_moves(1000)],
+    "key_mash": lambda: [key_mash(200)],
+    "scroll_storm": lambda: [scroll_storm(1000)],
+    "mixed": lambda: [mouse_moves(1000), key_mash(20), scroll_storm(50), clicks(10)]
+}
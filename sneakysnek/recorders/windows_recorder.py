@@ -15,10 +15,13 @@ import atexit
 
 class WindowsRecorder(Recorder):
 
-    def __init__(self, callback):
+    def __init__(self, callback, batch_callback=None):
         self.callback = callback
+        self.batch_callback = batch_callback
+        self.dispatcher = None
+        self.coalescer = None
 
-        self.is_recording = False
+        self.stopped = threading.Event()
         self.thread = None
 
         self.thread_id = None
@@ -27,11 +30,13 @@ class WindowsRecorder(Recorder):
         self.mouse_hook = None
 
     def start(self):
-        self.is_recording = True
         self.thread_id = windll.kernel32.GetCurrentThreadId()
 
-        self.register_hooks()
-        self.listen()
+        try:
+            self.register_hooks()
+            self.listen()
+        finally:
+            self.stopped.set()
 
     def stop(self):
         PostThreadMessage(self.thread_id, 0x0401, 0, 0)
@@ -42,10 +47,12 @@ class WindowsRecorder(Recorder):
         if self.mouse_hook is not None:
             UnhookWindowsHookEx(self.mouse_hook)
 
-        self.is_recording = False
+        self.stopped.set()
+
+        self._stop_pipeline()
 
     def event_handler(self, event):
-        self.callback(event)
+        self._emit(event)
 
     def register_hooks(self):
         self._register_keyboard_hook()
@@ -109,8 +116,8 @@ class WindowsRecorder(Recorder):
         atexit.register(UnhookWindowsHookEx, callback)
 
     @classmethod
-    def record(cls, callback):
-        recorder = cls(callback)
+    def record(cls, callback, batch_callback=None):
+        recorder = cls(callback, batch_callback=batch_callback)
 
         recorder.thread = threading.Thread(target=recorder.start, args=())
         recorder.thread.daemon = True
@@ -0,0 +1,420 @@
+from sneakysnek.recorder import RecorderError
+from sneakysnek.recorders.linux_recorder import LinuxRecorder
+
+from sneakysnek.keyboard_event import KeyboardEvents
+from sneakysnek.mouse_event import DetailedMouseEvent, MouseEvents
+
+import os
+import select
+import struct
+import threading
+import time
+
+import Xlib.display
+import Xlib.error
+import Xlib.X
+import Xlib.ext.ge
+import Xlib.ext.xinput
+
+
+# deviceid, time, detail, sourceid, valuators_len, flags of an XIRawEvent, after the 10 bytes python-xlib keeps as the GenericEvent header
+RAW_EVENT = struct.Struct("=HIIHHI4x")
+RAW_EVENT_SIZE = RAW_EVENT.size
+
+VALUATOR_MASK = struct.Struct("=I")
+
+# integral, fraction
+FP3232 = struct.Struct("=iI")
+
+RAW_EVENT_MASK = (
+    Xlib.ext.xinput.RawKeyPressMask |
+    Xlib.ext.xinput.RawKeyReleaseMask |
+    Xlib.ext.xinput.RawButtonPressMask |
+    Xlib.ext.xinput.RawButtonReleaseMask |
+    Xlib.ext.xinput.RawMotionMask
+)
+
+
+class XI2Recorder(LinuxRecorder):
+    """Linux backend on XInput2 raw events: relative motion at device rate, delivered even while the pointer is grabbed"""
+
+    def __init__(self, callback, batch_callback=None, event_filter=None):
+        self.callback = callback
+        self.batch_callback = batch_callback
+        self.dispatcher = None
+        self.coalescer = None
+
+        self.stopped = threading.Event()
+        self.thread = None
+
+        self.display_local = Xlib.display.Display()
+        self.display_record = Xlib.display.Display()
+
+        self.opcode = self._query_extension(self.display_record)
+
+        self.keyboard_table = None
+        self.alt_gr_mask = 0
+
+        self.x = None
+        self.y = None
+
+        self._mapping_changes = dict()
+
+        self._modifier_keycodes = dict()
+        self._held_modifiers = dict()
+
+        # Source device id -> its x / y axes, see _source_axes()
+        self._axes = dict()
+
+        self._wake_read, self._wake_write = os.pipe()
+
+        self.event_filter = event_filter
+
+        # Held while a wakeup is decoded and delivered, so pause() returns between two callbacks
+        self._paused = False
+        self._stopping = False
+        self._delivery_lock = threading.RLock()
+
+        self._selected = threading.Event()
+
+        self._initialize_clock()
+
+    def start(self):
+        try:
+            self._build_keyboard_table()
+            self._sync_pointer()
+
+            with self._delivery_lock:
+                self._select_events(0 if self._paused else self._raw_event_mask())
+
+            self._selected.set()
+
+            self._listen()
+        finally:
+            # stop() only signals: a callback calling it still runs on this thread, inside _listen
+            for display in (self.display_record, self.display_local):
+                try:
+                    display.close()
+                except (OSError, Xlib.error.ConnectionClosedError):
+                    pass
+
+            os.close(self._wake_read)
+
+            self.stopped.set()
+
+    @property
+    def is_paused(self):
+        return self._paused
+
+    def pause(self, timeout=None):
+        """Deselects the raw events, keeping the X connections for resume(); no callback starts once it returns"""
+        if not self._delivery_lock.acquire(timeout=-1 if timeout is None else timeout):
+            return False
+
+        try:
+            if self._stopping:
+                return False
+
+            if not self._paused:
+                self._paused = True
+                self._select_events(0)
+        finally:
+            self._delivery_lock.release()
+
+        return True
+
+    def resume(self, timeout=None):
+        """Selects the raw events again"""
+        if not self._delivery_lock.acquire(timeout=-1 if timeout is None else timeout):
+            return False
+
+        try:
+            if self._stopping:
+                return False
+
+            if self._paused:
+                # Positions are integrated from motion, which went unseen while paused, and devices may have changed
+                self._sync_pointer()
+                self._axes = dict()
+                self._select_events(self._raw_event_mask())
+
+                self._paused = False
+        finally:
+            self._delivery_lock.release()
+
+        return True
+
+    def wait_recording(self, timeout=None):
+        """Blocks until the raw events are selected; False on timeout or when paused"""
+        return self._selected.wait(timeout) and not self._paused
+
+    def stop(self, timeout=None):
+        """Wakes the listening thread, which closes the X connections on its way out, and waits for it"""
+        if self._stopping:
+            return
+
+        self._stopping = True
+
+        try:
+            os.write(self._wake_write, b"\x00")
+        except OSError:
+            pass
+
+        # Before joining: the thread can be blocked handing events to the pipeline, e.g. on a full BLOCK dispatcher
+        # whose worker is the thread calling stop()
+        self._stop_pipeline()
+
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+
+        os.close(self._wake_write)
+
+    def _listen(self):
+        display = self.display_record
+
+        while not self._stopping:
+            # Replies read on behalf of another request can leave events queued without the socket becoming readable
+            if not display.pending_events():
+                readable, _, _ = select.select([display, self._wake_read], [], [])
+
+                if self._wake_read in readable:
+                    return
+
+            with self._delivery_lock:
+                if self._paused:
+                    # Sent before pause() deselected them
+                    for _ in range(display.pending_events()):
+                        display.next_event()
+
+                    continue
+
+                self._deliver(display)
+
+    def _deliver(self, display):
+        received_ns = time.monotonic_ns()
+
+        events = list()
+        filtered = 0
+
+        for _ in range(display.pending_events()):
+            if self._handle_xi2_event(display.next_event(), events, received_ns):
+                filtered += 1
+
+        if filtered:
+            self.event_filter.count("decode", filtered)
+
+        # Integrated positions only drift within one wakeup: the server's cursor is the reference again for the next one
+        self._sync_pointer()
+
+        if events:
+            self._observe_latencies(events, received_ns)
+
+        self._emit_batch(events)
+
+    def _record_threads(self):
+        # No RECORD contexts: the raw events are read on self.thread alone, which Recorder.join() waits for
+        return list()
+
+    def _select_events(self, mask):
+        self.display_record.screen().root.xinput_select_events([(Xlib.ext.xinput.AllMasterDevices, mask)])
+        self.display_record.flush()
+
+    def _handle_xi2_event(self, event, events, received_ns):
+        """Appends the event to events, or returns True when the filter drops it"""
+        if event.type != Xlib.ext.ge.GenericEventCode:
+            if event.type == Xlib.X.MappingNotify:
+                self._handle_event(event.type, 0, 0, None, None, event, events)
+
+            return
+
+        if event.extension != self.opcode:
+            return
+
+        data = event.data
+        evtype = event.evtype
+
+        _, server_time, detail, sourceid, _, _ = RAW_EVENT.unpack_from(data)
+
+        self.clock.observe(server_time, received_ns)
+
+        if evtype == Xlib.ext.xinput.RawMotion:
+            dx, dy, raw_dx, raw_dy = decode_raw_motion(data)
+            x_axis, y_axis = self._source_axes(sourceid)
+
+            if x_axis is None:
+                self.x = min(max(self.x + (dx or 0), 0), self.width)
+                raw_dx = raw_dx or 0
+            else:
+                # Absolute valuators (tablets, VM pointers, XTest) report where the pointer is, not how far it moved
+                x = self.x if raw_dx is None else _scale(raw_dx, x_axis, self.width)
+                raw_dx = x - self.x
+                self.x = x
+
+            if y_axis is None:
+                self.y = min(max(self.y + (dy or 0), 0), self.height)
+                raw_dy = raw_dy or 0
+            else:
+                y = self.y if raw_dy is None else _scale(raw_dy, y_axis, self.height)
+                raw_dy = y - self.y
+                self.y = y
+
+            if self.event_filter is not None and self._is_filtered(Xlib.X.MotionNotify, 0, 0, int(self.x), int(self.y)):
+                return True
+
+            source_ns, monotonic_ns = self.clock.correct(server_time, received_ns)
+
+            events.append(DetailedMouseEvent(
+                MouseEvents.MOVE,
+                x=int(self.x),
+                y=int(self.y),
+                dx=raw_dx,
+                dy=raw_dy,
+                timestamp=(monotonic_ns + self._realtime_offset_ns) / 1000000000,
+                monotonic_ns=monotonic_ns,
+                received_ns=received_ns,
+                source_ns=source_ns
+            ))
+
+            return
+
+        if evtype == Xlib.ext.xinput.RawKeyPress or evtype == Xlib.ext.xinput.RawKeyRelease:
+            # Raw events carry no modifier state, so it is kept from the modifier keys seen so far
+            state = 0
+
+            for mask in self._held_modifiers.values():
+                state |= mask
+
+            if evtype == Xlib.ext.xinput.RawKeyPress:
+                if detail in self._modifier_keycodes:
+                    self._held_modifiers[detail] = self._modifier_keycodes[detail]
+
+                return self._handle_event(Xlib.X.KeyPress, detail, state, None, None, None, events, server_time, received_ns)
+            else:
+                self._held_modifiers.pop(detail, None)
+
+                return self._handle_event(Xlib.X.KeyRelease, detail, state, None, None, None, events, server_time, received_ns)
+        elif evtype == Xlib.ext.xinput.RawButtonPress:
+            return self._handle_event(Xlib.X.ButtonPress, detail, 0, int(self.x), int(self.y), None, events, server_time, received_ns)
+        elif evtype == Xlib.ext.xinput.RawButtonRelease:
+            return self._handle_event(Xlib.X.ButtonRelease, detail, 0, int(self.x), int(self.y), None, events, server_time, received_ns)
+
+    def _raw_event_mask(self):
+        if self.event_filter is None:
+            return RAW_EVENT_MASK
+
+        event_filter = self.event_filter
+        mask = 0
+
+        if event_filter.wants(KeyboardEvents.DOWN):
+            mask |= Xlib.ext.xinput.RawKeyPressMask
+
+        if event_filter.wants(KeyboardEvents.UP):
+            mask |= Xlib.ext.xinput.RawKeyReleaseMask
+
+        if event_filter.wants(MouseEvents.CLICK):
+            mask |= Xlib.ext.xinput.RawButtonPressMask | Xlib.ext.xinput.RawButtonReleaseMask
+        elif event_filter.wants(MouseEvents.SCROLL):
+            mask |= Xlib.ext.xinput.RawButtonReleaseMask
+
+        # Positions are integrated from raw motion, which clicks and scrolls need too
+        if mask & Xlib.ext.xinput.RawButtonReleaseMask or event_filter.wants(MouseEvents.MOVE):
+            mask |= Xlib.ext.xinput.RawMotionMask
+
+        event_filter.pushed_down["xi2_raw_event_mask"] = mask
+
+        return mask
+
+    def _build_keyboard_table(self):
+        super()._build_keyboard_table()
+
+        modifier_mapping = self.display_local.get_modifier_mapping()
+
+        self._modifier_keycodes = dict()
+
+        for keycode in modifier_mapping[Xlib.X.ShiftMapIndex]:
+            if keycode:
+                self._modifier_keycodes[keycode] = Xlib.X.ShiftMask
+
+        for index, keycodes in enumerate(modifier_mapping):
+            if self.alt_gr_mask == 1 << index:
+                for keycode in keycodes:
+                    if keycode:
+                        self._modifier_keycodes[keycode] = self.alt_gr_mask
+
+    def _source_axes(self, sourceid):
+        """Per axis (x, y) of a source device: None for a relative valuator, (min, max) for an absolute one"""
+        axes = self._axes.get(sourceid)
+
+        if axes is None:
+            axes = [None, None]
+
+            for device in self.display_local.xinput_query_device(sourceid).devices:
+                for info in device.classes:
+                    if info.type == Xlib.ext.xinput.ValuatorClass and info.number < 2 and info.mode == Xlib.ext.xinput.ModeAbsolute:
+                        axes[info.number] = (info.min, info.max)
+
+            axes = self._axes[sourceid] = tuple(axes)
+
+        return axes
+
+    def _sync_pointer(self):
+        screen = self.display_local.screen()
+        pointer = screen.root.query_pointer()
+
+        self.width = screen.width_in_pixels - 1
+        self.height = screen.height_in_pixels - 1
+
+        self.x = pointer.root_x
+        self.y = pointer.root_y
+
+    def _query_extension(self, display):
+        if not display.has_extension("XInputExtension"):
+            raise RecorderError("The X server does not support the XInput extension")
+
+        version = display.xinput_query_version()
+
+        if version.major_version < 2:
+            raise RecorderError(f"XInput 2.0 is required, the X server supports {version.major_version}.{version.minor_version}")
+
+        return display.get_extension_major("XInputExtension")
+
+
+def _scale(value, axis, size):
+    """Screen coordinate of an absolute valuator value; without a range (XTest), values already are screen coordinates"""
+    minimum, maximum = axis
+
+    if maximum <= minimum:
+        return min(max(value, 0), size)
+
+    return min(max((value - minimum) * size / (maximum - minimum), 0), size)
+
+
+def decode_raw_motion(data):
+    """(dx, dy, raw dx, raw dy) out of an XI_RawMotion payload: accelerated then unaccelerated values of valuators 0 and 1
+
+    An axis missing from the event (it did not change) is None.
+    """
+    valuators_len = RAW_EVENT.unpack_from(data)[4]
+
+    offset = RAW_EVENT_SIZE
+    mask = 0
+
+    for index, (word,) in enumerate(VALUATOR_MASK.iter_unpack(data[offset:offset + (valuators_len * 4)])):
+        mask |= word << (index * 32)
+
+    offset += valuators_len * 4
+    count = bin(mask).count("1")
+
+    values = [integral + (fraction / 4294967296) for integral, fraction in FP3232.iter_unpack(data[offset:offset + (count * 2 * FP3232.size)])]
+
+    # Values are packed for the set bits only, in valuator order: accelerated ones first, then the raw ones
+    x_index = 0 if mask & 1 else None
+    y_index = (mask & 1) if mask & 2 else None
+
+    dx = values[x_index] if x_index is not None else None
+    dy = values[y_index] if y_index is not None else None
+
+    raw_dx = values[count + x_index] if x_index is not None else None
+    raw_dy = values[count + y_index] if y_index is not None else None
+
+    return dx, dy, raw_dx, raw_dy
@@ -0,0 +1,191 @@
+from sneakysnek.state import InputSnapshot, InputState, KEY_BYTES
+
+from sneakysnek import storage
+
+import bisect
+import struct
+import threading
+
+
+INDEX_MAGIC = b"SNKI"
+INDEX_VERSION = 1
+
+# magic, version, record size, reserved
+INDEX_HEADER = struct.Struct("<4sHH8x")
+
+# monotonic_ns, event index, held keys bitset, held buttons bitset, has cursor, x, y
+CHECKPOINT = struct.Struct("<qq16sBB2xii4x")
+
+
+# Checkpoints and state_at() return InputSnapshots
+SessionState = InputSnapshot
+
+
+class SessionWriter:
+    """Writes an event log plus a sparse checkpoint index of timestamps and held input state"""
+
+    def __init__(self, path, checkpoint_events=1024, checkpoint_ms=1000):
+        self.path = path
+        self.index_path = f"{path}.index"
+
+        self.checkpoint_events = checkpoint_events
+        self.checkpoint_ns = checkpoint_ms * 1000000
+
+        self.events = storage.EventWriter(path)
+
+        if self.events.count:
+            self.events.close()
+            raise storage.StorageError(f"Session '{path}' already exists")
+
+        self.index = open(self.index_path, "wb")
+        self.index.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, CHECKPOINT.size))
+
+        self.state = InputState()
+
+        self._count = 0
+        self._last_checkpoint_count = None
+        self._last_checkpoint_ns = None
+
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __call__(self, event):
+        self.write(event)
+
+    def write(self, event):
+        with self._lock:
+            self._checkpoint_if_due(event.monotonic_ns)
+            self.state.update(event)
+
+            self.events.write(event)
+            self._count += 1
+
+    def write_many(self, events):
+        events = list(events)
+
+        with self._lock:
+            for event in events:
+                self._checkpoint_if_due(event.monotonic_ns)
+                self.state.update(event)
+
+                self._count += 1
+
+            self.events.write_many(events)
+
+    def flush(self):
+        with self._lock:
+            self.events.flush()
+            self.index.flush()
+
+    def close(self):
+        if self.index.closed:
+            return
+
+        self.events.close()
+        self.index.close()
+
+    def _checkpoint_if_due(self, monotonic_ns):
+        if self._last_checkpoint_count is not None:
+            if self._count - self._last_checkpoint_count < self.checkpoint_events and monotonic_ns - self._last_checkpoint_ns < self.checkpoint_ns:
+                return
+
+        state = self.state
+
+        self.index.write(CHECKPOINT.pack(
+            monotonic_ns,
+            self._count,
+            state.keys.to_bytes(KEY_BYTES, "little"),
+            state.buttons,
+            state.x is not None,
+            state.x or 0,
+            state.y or 0
+        ))
+
+        self._last_checkpoint_count = self._count
+        self._last_checkpoint_ns = monotonic_ns
+
+
+class Session:
+    """Reads a session written by SessionWriter, seeking by monotonic_ns through its checkpoint index"""
+
+    def __init__(self, path):
+        self.path = path
+        self.index_path = f"{path}.index"
+
+        self.events = storage.EventReader(path)
+
+        self.checkpoints = list()
+
+        with open(self.index_path, "rb") as f:
+            header = f.read(INDEX_HEADER.size)
+
+            if len(header) < INDEX_HEADER.size:
+                raise storage.StorageError("Truncated session index header")
+
+            magic, version, record_size = INDEX_HEADER.unpack(header)
+
+            if magic != INDEX_MAGIC or version != INDEX_VERSION or record_size != CHECKPOINT.size:
+                raise storage.StorageError(f"Unsupported session index '{self.index_path}'")
+
+            data = f.read()
+
+        for monotonic_ns, index, keys, buttons, has_cursor, x, y in CHECKPOINT.iter_unpack(data[:len(data) - (len(data) % CHECKPOINT.size)]):
+            # The index can run ahead of the event log when a session was not closed cleanly
+            if index > len(self.events):
+                break
+
+            self.checkpoints.append((
+                index,
+                InputSnapshot(
+                    monotonic_ns,
+                    int.from_bytes(keys, "little"),
+                    buttons,
+                    x if has_cursor else None,
+                    y if has_cursor else None
+                )
+            ))
+
+        self.checkpoint_timestamps = [state.monotonic_ns for index, state in self.checkpoints]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return len(self.events)
+
+    def search(self, monotonic_ns):
+        # Last checkpoint strictly before monotonic_ns, so ties spanning a checkpoint are not skipped
+        checkpoint = bisect.bisect_left(self.checkpoint_timestamps, monotonic_ns) - 1
+
+        low = self.checkpoints[checkpoint][0] if checkpoint >= 0 else 0
+        high = self.checkpoints[checkpoint + 1][0] if checkpoint + 1 < len(self.checkpoints) else len(self.events)
+
+        return bisect.bisect_left(self.events.column("monotonic_ns"), monotonic_ns, low, high)
+
+    def events_between(self, start_ns, end_ns):
+        return self.events.events(self.search(start_ns), self.search(end_ns))
+
+    def state_at(self, monotonic_ns):
+        checkpoint = bisect.bisect_right(self.checkpoint_timestamps, monotonic_ns) - 1
+
+        if checkpoint < 0:
+            return InputSnapshot(monotonic_ns, 0, 0, None, None)
+
+        index, checkpoint_state = self.checkpoints[checkpoint]
+
+        state = InputState(checkpoint_state)
+        state.update_records(self.events.records(index, self.search(monotonic_ns + 1)))
+
+        return state.snapshot(monotonic_ns)
+
+    def close(self):
+        self.events.close()
+
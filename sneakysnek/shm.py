@@ -0,0 +1,273 @@
+from sneakysnek import storage
+
+from multiprocessing import shared_memory
+
+import struct
+import threading
+
+
+class ShmError(BaseException):
+    pass
+
+
+MAGIC = b"SNKR"
+VERSION = 1
+
+# magic, version, record size, capacity; the sequence counters follow at BEGIN_OFFSET and END_OFFSET
+HEADER = struct.Struct("<4sHHI")
+HEADER_SIZE = 64
+
+# Records ever claimed by the writer (some may still be being written) and records ever published
+BEGIN_OFFSET = 16
+END_OFFSET = 24
+
+SEQUENCE = struct.Struct("<Q")
+
+RECORD = storage.RECORD
+
+
+class RingWriter:
+    """Publishes events as fixed-width storage records into a shared memory ring buffer that readers in other processes map"""
+
+    def __init__(self, name=None, capacity=65536):
+        if capacity < 1 or capacity & (capacity - 1):
+            raise ValueError("capacity must be a power of two")
+
+        self.capacity = capacity
+
+        self.shared_memory = shared_memory.SharedMemory(name=name, create=True, size=HEADER_SIZE + (capacity * RECORD.size))
+        self.name = self.shared_memory.name
+
+        self.buffer = self.shared_memory.buf
+
+        HEADER.pack_into(self.buffer, 0, MAGIC, VERSION, RECORD.size, capacity)
+        SEQUENCE.pack_into(self.buffer, BEGIN_OFFSET, 0)
+        SEQUENCE.pack_into(self.buffer, END_OFFSET, 0)
+
+        self.count = 0
+
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __call__(self, event):
+        self.write(event)
+
+    def write(self, event):
+        with self._lock:
+            sequence = self.count
+
+            SEQUENCE.pack_into(self.buffer, BEGIN_OFFSET, sequence + 1)
+            RECORD.pack_into(self.buffer, HEADER_SIZE + ((sequence & (self.capacity - 1)) * RECORD.size), *storage.encode(event))
+            SEQUENCE.pack_into(self.buffer, END_OFFSET, sequence + 1)
+
+            self.count = sequence + 1
+
+    def write_many(self, events):
+        events = events if isinstance(events, list) else list(events)
+
+        pack_into = RECORD.pack_into
+        encode = storage.encode
+        buffer = self.buffer
+        mask = self.capacity - 1
+
+        with self._lock:
+            sequence = self.count
+
+            # Readers treat everything below begin - capacity as possibly overwritten from here on
+            SEQUENCE.pack_into(buffer, BEGIN_OFFSET, sequence + len(events))
+
+            for event in events:
+                pack_into(buffer, HEADER_SIZE + ((sequence & mask) * RECORD.size), *encode(event))
+                sequence += 1
+
+            SEQUENCE.pack_into(buffer, END_OFFSET, sequence)
+
+            self.count = sequence
+
+    def close(self):
+        if self.buffer is None:
+            return
+
+        self.buffer.release()
+        self.buffer = None
+
+        self.shared_memory.close()
+        self.shared_memory.unlink()
+
+
+class RingReader:
+    """Follows a RingWriter from any process with its own cursor, counting records lost to overruns"""
+
+    def __init__(self, name, start="latest"):
+        self.name = name
+
+        self.shared_memory = _attach(name)
+        self.buffer = self.shared_memory.buf
+
+        magic, version, record_size, capacity = HEADER.unpack_from(self.buffer, 0)
+
+        if magic != MAGIC:
+            raise ShmError(f"'{name}' is not a sneakysnek ring buffer")
+
+        if version != VERSION or record_size != RECORD.size:
+            raise ShmError(f"Unsupported ring buffer version {version} with {record_size}-byte records")
+
+        self.capacity = capacity
+        self.records_view = self.buffer[HEADER_SIZE:HEADER_SIZE + (capacity * RECORD.size)]
+
+        if start == "latest":
+            self.cursor = self._end()
+        elif start == "oldest":
+            self.cursor = max(0, self._end() - capacity)
+        else:
+            raise ValueError("start must be 'latest' or 'oldest'")
+
+        self.lost = 0
+        self.overruns = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def available(self):
+        return self._end() - self.cursor
+
+    def read_bytes(self, max_count=None):
+        """Copies up to max_count published records out of the ring, as contiguous RECORD bytes"""
+        start, end = self._claim(max_count)
+
+        if start == end:
+            return b""
+
+        first = start & (self.capacity - 1)
+        last = first + (end - start)
+
+        if last <= self.capacity:
+            data = bytes(self.records_view[first * RECORD.size:last * RECORD.size])
+        else:
+            data = bytes(self.records_view[first * RECORD.size:]) + bytes(self.records_view[:(last - self.capacity) * RECORD.size])
+
+        valid = self._verify(start, end)
+
+        return data[(valid - start) * RECORD.size:]
+
+    def records(self, max_count=None):
+        return list(RECORD.iter_unpack(self.read_bytes(max_count)))
+
+    def events(self, max_count=None):
+        return [storage.decode(record) for record in RECORD.iter_unpack(self.read_bytes(max_count))]
+
+    def to_numpy(self, max_count=None):
+        import numpy as np
+
+        return np.frombuffer(self.read_bytes(max_count), dtype=storage.numpy_dtype())
+
+    def views(self, max_count=None):
+        """Zero-copy memoryviews over up to max_count records (two when they wrap), plus the sequence of the first one
+
+        The writer keeps going meanwhile: call release(start) once done with the views to learn how many of their
+        records were overwritten while they were in use.
+        """
+        start, end = self._claim(max_count)
+
+        first = start & (self.capacity - 1)
+        last = first + (end - start)
+
+        if last <= self.capacity:
+            views = [self.records_view[first * RECORD.size:last * RECORD.size]]
+        else:
+            views = [self.records_view[first * RECORD.size:], self.records_view[:(last - self.capacity) * RECORD.size]]
+
+        return start, views
+
+    def release(self, start):
+        """Records at the start of the last views() that may have been overwritten before release"""
+        return self._verify(start, self.cursor) - start
+
+    def close(self):
+        if self.buffer is None:
+            return
+
+        self.buffer = None
+
+        try:
+            self.records_view.release()
+            self.shared_memory.close()
+        except BufferError:
+            # Views handed out to the caller are still alive; the mapping goes away with them
+            pass
+
+    def _end(self):
+        return SEQUENCE.unpack_from(self.buffer, END_OFFSET)[0]
+
+    def _claim(self, max_count):
+        end = self._end()
+        start = self.cursor
+
+        if end - start > self.capacity:
+            # Lapped by the writer: skip to the oldest record still in the ring
+            self._lose(end - self.capacity - start)
+            start = end - self.capacity
+
+        if max_count is not None and end - start > max_count:
+            end = start + max_count
+
+        self.cursor = end
+
+        return start, end
+
+    def _verify(self, start, end):
+        # Anything the writer claimed since may have landed on the records that were just read
+        begin = SEQUENCE.unpack_from(self.buffer, BEGIN_OFFSET)[0]
+        valid = begin - self.capacity
+
+        if valid <= start:
+            return start
+
+        valid = min(valid, end)
+        self._lose(valid - start)
+
+        return valid
+
+    def _lose(self, count):
+        self.lost += count
+        self.overruns += 1
+
+
+# Attaches restore resource_tracker.register in the order they patched it
+_attach_lock = threading.Lock()
+
+
+def _attach(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        pass
+
+    # Before Python 3.13 every attached process registers the segment with its resource tracker, which unlinks it on
+    # exit from under the writer. Unregistering afterwards would also drop the writer's own registration when both
+    # share a tracker (same process, or forked), so registration is skipped instead, for this segment only: other
+    # threads may register their own segments meanwhile.
+    from multiprocessing import resource_tracker
+
+    with _attach_lock:
+        register = resource_tracker.register
+
+        def register_others(tracked_name, rtype):
+            if rtype != "shared_memory" or tracked_name.lstrip("/") != name.lstrip("/"):
+                register(tracked_name, rtype)
+
+        resource_tracker.register = register_others
+
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
@@ -0,0 +1,272 @@
+from sneakysnek.keyboard_keys import keyboard_key_ordinals
+from sneakysnek.mouse_buttons import mouse_button_ordinals
+
+from sneakysnek.keyboard_event import KeyboardEvent, KeyboardEvents
+from sneakysnek.mouse_event import MouseEvent, MouseEvents
+
+from sneakysnek import storage
+
+import threading
+import time
+
+
+# Held keys as a little-endian bitset indexed by keyboard_key_ordinals, room for 128 keys
+KEY_BYTES = 16
+
+
+class InputSnapshot:
+    """Immutable held keys / buttons and cursor position at monotonic_ns
+
+    keys and buttons are integer bitsets indexed by keyboard_key_ordinals and mouse_button_ordinals.
+    """
+
+    __slots__ = ("monotonic_ns", "keys", "buttons", "x", "y")
+
+    def __init__(self, monotonic_ns, keys, buttons, x, y):
+        object.__setattr__(self, "monotonic_ns", monotonic_ns)
+        object.__setattr__(self, "keys", keys)
+        object.__setattr__(self, "buttons", buttons)
+        object.__setattr__(self, "x", x)
+        object.__setattr__(self, "y", y)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("InputSnapshot is immutable")
+
+    @property
+    def keyboard_keys(self):
+        return frozenset(storage.keyboard_keys[ordinal] for ordinal in _bits(self.keys))
+
+    @property
+    def mouse_buttons(self):
+        return frozenset(storage.mouse_buttons[ordinal] for ordinal in _bits(self.buttons))
+
+    def is_pressed(self, keyboard_key):
+        return bool(self.keys >> keyboard_key_ordinals[keyboard_key._value_] & 1)
+
+    def is_button_pressed(self, mouse_button):
+        return bool(self.buttons >> mouse_button_ordinals[mouse_button._value_] & 1)
+
+    def to_numpy(self):
+        return to_numpy([self])
+
+    def __eq__(self, other):
+        if other.__class__ is not InputSnapshot:
+            return NotImplemented
+
+        return (
+            self.monotonic_ns == other.monotonic_ns and
+            self.keys == other.keys and
+            self.buttons == other.buttons and
+            self.x == other.x and
+            self.y == other.y
+        )
+
+    def __hash__(self):
+        return hash((self.monotonic_ns, self.keys, self.buttons, self.x, self.y))
+
+    def __repr__(self):
+        return f"InputSnapshot(monotonic_ns={self.monotonic_ns}, keys={self.keys:#x}, buttons={self.buttons:#x}, x={self.x}, y={self.y})"
+
+    def __str__(self):
+        return f"InputSnapshot - {sorted(key.name for key in self.keyboard_keys)} - {sorted(button.name for button in self.mouse_buttons)} - {self.x} - {self.y} - {self.monotonic_ns}"
+
+
+class InputState:
+    """Held keys / buttons and cursor position, updated incrementally from events or storage records
+
+    Usable as a callback or batch_callback. snapshot() is O(1): the bitsets are plain ints, so nothing is copied.
+    """
+
+    def __init__(self, snapshot=None):
+        if snapshot is None:
+            self.monotonic_ns = None
+
+            self.keys = 0
+            self.buttons = 0
+
+            self.x = None
+            self.y = None
+        else:
+            self.monotonic_ns = snapshot.monotonic_ns
+
+            self.keys = snapshot.keys
+            self.buttons = snapshot.buttons
+
+            self.x = snapshot.x
+            self.y = snapshot.y
+
+        self.healed = 0
+
+        # Linux delivers keyboard and mouse events from separate threads
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        self.update(event)
+
+    def update(self, event):
+        with self._lock:
+            self._update(event)
+
+    def update_many(self, events):
+        with self._lock:
+            for event in events:
+                self._update(event)
+
+    def update_records(self, records):
+        """Applies storage records (RECORD tuples) without building events, e.g. from EventReader.records()"""
+        with self._lock:
+            keys = self.keys
+            buttons = self.buttons
+
+            x = self.x
+            y = self.y
+
+            monotonic_ns = self.monotonic_ns
+
+            for kind, direction, code, event_x, event_y, velocity, monotonic_ns, timestamp in records:
+                if kind == storage.KIND_KEY_DOWN:
+                    keys |= 1 << code
+                elif kind == storage.KIND_KEY_UP:
+                    keys &= ~(1 << code)
+                else:
+                    if code != storage.NO_CODE:
+                        if direction == storage.DIRECTION_DOWN:
+                            buttons |= 1 << code
+                        else:
+                            buttons &= ~(1 << code)
+
+                    # As in _update(), a mouse event without a position keeps the previous one
+                    if event_x != storage.NO_POSITION:
+                        x = event_x
+                        y = event_y
+
+            self.keys = keys
+            self.buttons = buttons
+
+            self.x = x
+            self.y = y
+
+            self.monotonic_ns = monotonic_ns
+
+    def snapshot(self, monotonic_ns=None):
+        """The current state, stamped with monotonic_ns (default: the last event's)"""
+        with self._lock:
+            return InputSnapshot(self.monotonic_ns if monotonic_ns is None else monotonic_ns, self.keys, self.buttons, self.x, self.y)
+
+    def is_pressed(self, keyboard_key):
+        return bool(self.keys >> keyboard_key_ordinals[keyboard_key._value_] & 1)
+
+    def is_button_pressed(self, mouse_button):
+        return bool(self.buttons >> mouse_button_ordinals[mouse_button._value_] & 1)
+
+    def heal(self, held_keys=(), held_buttons=(), monotonic_ns=None):
+        """Releases whatever is held here but not in held_keys / held_buttons; returns the release events synthesized
+
+        Releases missed while not recording, e.g. between stop() and the next record(), leave keys stuck down.
+        Call this after restarting, with what is actually held if the backend can tell (see held_input()).
+        """
+        if monotonic_ns is None:
+            monotonic_ns = time.monotonic_ns()
+
+        keys = 0
+
+        for keyboard_key in held_keys:
+            keys |= 1 << keyboard_key_ordinals[keyboard_key._value_]
+
+        buttons = 0
+
+        for mouse_button in held_buttons:
+            buttons |= 1 << mouse_button_ordinals[mouse_button._value_]
+
+        events = list()
+
+        with self._lock:
+            for ordinal in _bits(self.keys & ~keys):
+                events.append(KeyboardEvent(KeyboardEvents.UP, storage.keyboard_keys[ordinal], monotonic_ns=monotonic_ns))
+
+            for ordinal in _bits(self.buttons & ~buttons):
+                events.append(MouseEvent(MouseEvents.CLICK, button=storage.mouse_buttons[ordinal], direction="UP", x=self.x, y=self.y, monotonic_ns=monotonic_ns))
+
+            self.keys &= keys
+            self.buttons &= buttons
+
+            self.healed += len(events)
+
+        return events
+
+    def sync(self, recorder, monotonic_ns=None):
+        """heal() against what the recorder's backend reports as held, or releasing everything if it cannot tell"""
+        if hasattr(recorder, "held_input"):
+            held_keys, held_buttons, x, y = recorder.held_input()
+        else:
+            held_keys, held_buttons, x, y = (), (), None, None
+
+        events = self.heal(held_keys, held_buttons, monotonic_ns=monotonic_ns)
+
+        if x is not None:
+            with self._lock:
+                self.x = x
+                self.y = y
+
+        return events
+
+    def _update(self, event):
+        if isinstance(event, KeyboardEvent):
+            bit = 1 << keyboard_key_ordinals[event.keyboard_key._value_]
+
+            if event.event is KeyboardEvents.DOWN:
+                self.keys |= bit
+            else:
+                self.keys &= ~bit
+        else:
+            if event.button is not None:
+                bit = 1 << mouse_button_ordinals[event.button._value_]
+
+                if event.direction == "DOWN":
+                    self.buttons |= bit
+                else:
+                    self.buttons &= ~bit
+
+            if event.x is not None:
+                self.x = event.x
+                self.y = event.y
+
+        self.monotonic_ns = event.monotonic_ns
+
+    def __str__(self):
+        return str(self.snapshot())
+
+
+def to_numpy(snapshots):
+    """Columns for a list of snapshots: monotonic_ns, keys (n x keys bool, by ordinal), buttons (n x buttons bool), x, y, has_cursor"""
+    import numpy as np
+
+    count = len(snapshots)
+
+    keys = np.frombuffer(b"".join([snapshot.keys.to_bytes(KEY_BYTES, "little") for snapshot in snapshots]), dtype=np.uint8).reshape(count, KEY_BYTES)
+    keys = np.unpackbits(keys, axis=1, bitorder="little")[:, :len(storage.keyboard_keys)].astype(bool)
+
+    buttons = np.fromiter((snapshot.buttons for snapshot in snapshots), dtype=np.uint8, count=count)
+    buttons = ((buttons[:, None] >> np.arange(len(storage.mouse_buttons), dtype=np.uint8)) & 1).astype(bool)
+
+    has_cursor = np.fromiter((snapshot.x is not None for snapshot in snapshots), dtype=bool, count=count)
+
+    return {
+        "monotonic_ns": np.fromiter((snapshot.monotonic_ns or 0 for snapshot in snapshots), dtype=np.int64, count=count),
+        "keys": keys,
+        "buttons": buttons,
+        "x": np.fromiter((snapshot.x or 0 for snapshot in snapshots), dtype=np.int32, count=count),
+        "y": np.fromiter((snapshot.y or 0 for snapshot in snapshots), dtype=np.int32, count=count),
+        "has_cursor": has_cursor
+    }
+
+
+def _bits(value):
+    ordinal = 0
+
+    while value:
+        if value & 1:
+            yield ordinal
+
+        value >>= 1
+        ordinal += 1
@@ -0,0 +1,368 @@
+from sneakysnek.keyboard_keys import KeyboardKey, keyboard_key_ordinals
+from sneakysnek.mouse_buttons import MouseButton, mouse_button_ordinals
+
+from sneakysnek.keyboard_event import KeyboardEvent, KeyboardEvents
+from sneakysnek.mouse_event import MouseEvent, MouseEvents
+
+import bisect
+import mmap
+import os
+import struct
+import sys
+import threading
+
+
+class StorageError(BaseException):
+    pass
+
+
+MAGIC = b"SNEK"
+VERSION = 1
+
+# magic, version, record size, reserved
+HEADER = struct.Struct("<4sHH8x")
+
+# kind, direction, code, x, y, velocity, monotonic_ns, timestamp
+RECORD = struct.Struct("<BBHiiiqd")
+
+_pack_into = RECORD.pack_into
+
+KIND_KEY_DOWN = 0
+KIND_KEY_UP = 1
+KIND_MOUSE_CLICK = 2
+KIND_MOUSE_MOVE = 3
+KIND_MOUSE_SCROLL = 4
+
+NO_CODE = 0xFFFF
+
+# x / y of a mouse event whose position is unknown (None on the event)
+NO_POSITION = -0x80000000
+
+DIRECTION_NONE = 0
+DIRECTION_DOWN = 1
+DIRECTION_UP = 2
+
+# Column name -> (memoryview format, item size, offset in the record)
+COLUMNS = {
+    "kind": ("B", 1, 0),
+    "direction": ("B", 1, 1),
+    "code": ("H", 2, 2),
+    "x": ("i", 4, 4),
+    "y": ("i", 4, 8),
+    "velocity": ("i", 4, 12),
+    "monotonic_ns": ("q", 8, 16),
+    "timestamp": ("d", 8, 24)
+}
+
+
+def numpy_dtype():
+    import numpy as np
+
+    return np.dtype([
+        ("kind", "u1"),
+        ("direction", "u1"),
+        ("code", "<u2"),
+        ("x", "<i4"),
+        ("y", "<i4"),
+        ("velocity", "<i4"),
+        ("monotonic_ns", "<i8"),
+        ("timestamp", "<f8")
+    ])
+
+
+def encode(event):
+    # Identity checks and lookups by _value_ keep Enum.__hash__ off this path
+    if isinstance(event, KeyboardEvent):
+        return (
+            KIND_KEY_DOWN if event.event is KeyboardEvents.DOWN else KIND_KEY_UP,
+            DIRECTION_NONE,
+            keyboard_key_ordinals[event.keyboard_key._value_],
+            0,
+            0,
+            0,
+            event.monotonic_ns,
+            event.timestamp
+        )
+
+    kind = event.event
+
+    if kind is MouseEvents.MOVE:
+        if event.x is None:
+            return (KIND_MOUSE_MOVE, DIRECTION_NONE, NO_CODE, NO_POSITION, NO_POSITION, 0, event.monotonic_ns, event.timestamp)
+
+        return (KIND_MOUSE_MOVE, DIRECTION_NONE, NO_CODE, event.x, event.y, 0, event.monotonic_ns, event.timestamp)
+
+    button = event.button
+    x = event.x
+
+    return (
+        KIND_MOUSE_CLICK if kind is MouseEvents.CLICK else KIND_MOUSE_SCROLL,
+        direction_codes[event.direction],
+        NO_CODE if button is None else mouse_button_ordinals[button._value_],
+        NO_POSITION if x is None else x,
+        NO_POSITION if x is None else event.y,
+        event.velocity or 0,
+        event.monotonic_ns,
+        event.timestamp
+    )
+
+
+def _pack_record(buffer, offset, event):
+    """RECORD.pack_into(buffer, offset, *encode(event)), without the tuple for moves with a position and key events"""
+    kind = event.event
+
+    if kind is MouseEvents.MOVE:
+        x = event.x
+
+        if x is not None:
+            _pack_into(buffer, offset, KIND_MOUSE_MOVE, DIRECTION_NONE, NO_CODE, x, event.y, 0, event.monotonic_ns, event.timestamp)
+            return
+    elif kind is KeyboardEvents.DOWN:
+        _pack_into(buffer, offset, KIND_KEY_DOWN, DIRECTION_NONE, keyboard_key_ordinals[event.keyboard_key._value_], 0, 0, 0, event.monotonic_ns, event.timestamp)
+        return
+    elif kind is KeyboardEvents.UP:
+        _pack_into(buffer, offset, KIND_KEY_UP, DIRECTION_NONE, keyboard_key_ordinals[event.keyboard_key._value_], 0, 0, 0, event.monotonic_ns, event.timestamp)
+        return
+
+    _pack_into(buffer, offset, *encode(event))
+
+
+def decode(record):
+    kind, direction, code, x, y, velocity, monotonic_ns, timestamp = record
+
+    if kind == KIND_KEY_DOWN or kind == KIND_KEY_UP:
+        return KeyboardEvent(
+            KeyboardEvents.DOWN if kind == KIND_KEY_DOWN else KeyboardEvents.UP,
+            keyboard_keys[code],
+            timestamp=timestamp,
+            monotonic_ns=monotonic_ns
+        )
+
+    return MouseEvent(
+        mouse_events[kind],
+        button=None if code == NO_CODE else mouse_buttons[code],
+        direction=directions[direction],
+        velocity=velocity if kind == KIND_MOUSE_SCROLL else None,
+        x=None if x == NO_POSITION else x,
+        y=None if x == NO_POSITION else y,
+        timestamp=timestamp,
+        monotonic_ns=monotonic_ns
+    )
+
+
+class EventWriter:
+    """Appends events to a fixed-width binary log"""
+
+    def __init__(self, path, buffer_size=4096):
+        self.path = path
+        self.buffer_size = buffer_size
+
+        self.count = 0
+
+        self._buffer = bytearray(buffer_size * RECORD.size)
+        self._buffered = 0
+        self._lock = threading.Lock()
+
+        self.file = open(path, "ab")
+
+        if self.file.tell() == 0:
+            self.file.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+        else:
+            with open(path, "rb") as f:
+                _read_header(f)
+
+            self.count = (self.file.tell() - HEADER.size) // RECORD.size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __call__(self, event):
+        self.write(event)
+
+    def write(self, event):
+        with self._lock:
+            _pack_record(self._buffer, self._buffered * RECORD.size, event)
+
+            self._buffered += 1
+            self.count += 1
+
+            if self._buffered == self.buffer_size:
+                self._flush()
+
+    def write_many(self, events):
+        pack_record = _pack_record
+        buffer = self._buffer
+        limit = len(buffer)
+
+        with self._lock:
+            offset = self._buffered * RECORD.size
+            written = -self._buffered
+
+            for event in events:
+                pack_record(buffer, offset, event)
+                offset += RECORD.size
+
+                if offset == limit:
+                    self._buffered = self.buffer_size
+                    self._flush()
+
+                    offset = 0
+                    written += self.buffer_size
+
+            self._buffered = offset // RECORD.size
+            self.count += written + self._buffered
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+            self.file.flush()
+
+    def close(self):
+        if self.file.closed:
+            return
+
+        self.flush()
+        self.file.close()
+
+    def _flush(self):
+        if self._buffered:
+            self.file.write(memoryview(self._buffer)[:self._buffered * RECORD.size])
+            self._buffered = 0
+
+
+class EventReader:
+    """Memory-maps a binary event log and exposes its columns without building per-event objects"""
+
+    def __init__(self, path):
+        self.path = path
+
+        self.file = open(path, "rb")
+        _read_header(self.file)
+
+        size = os.fstat(self.file.fileno()).st_size
+
+        self.count = (size - HEADER.size) // RECORD.size
+
+        self._mmap = None
+        self._records = memoryview(b"")
+        self._columns = dict()
+
+        if self.count:
+            self._mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._records = memoryview(self._mmap)[HEADER.size:HEADER.size + (self.count * RECORD.size)]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+
+        if not 0 <= index < self.count:
+            raise IndexError("event index out of range")
+
+        return decode(RECORD.unpack_from(self._records, index * RECORD.size))
+
+    def __iter__(self):
+        return self.events()
+
+    def column(self, name):
+        if name not in self._columns:
+            if name not in COLUMNS:
+                raise StorageError(f"Unknown column '{name}'")
+
+            if sys.byteorder != "little":
+                raise StorageError("Column views require a little-endian host, use to_numpy() instead")
+
+            format, item_size, offset = COLUMNS[name]
+            stride = RECORD.size // item_size
+
+            self._columns[name] = self._records.cast(format)[(offset // item_size)::stride]
+
+        return self._columns[name]
+
+    def to_numpy(self):
+        import numpy as np
+
+        if self._mmap is None:
+            return np.empty(0, dtype=numpy_dtype())
+
+        return np.frombuffer(self._mmap, dtype=numpy_dtype(), count=self.count, offset=HEADER.size)
+
+    def events(self, start=0, stop=None):
+        for record in self.records(start, stop):
+            yield decode(record)
+
+    def records(self, start=0, stop=None):
+        stop = self.count if stop is None else min(stop, self.count)
+
+        return RECORD.iter_unpack(self._records[start * RECORD.size:stop * RECORD.size])
+
+    def search(self, monotonic_ns):
+        return bisect.bisect_left(self.column("monotonic_ns"), monotonic_ns)
+
+    def between(self, start_ns, end_ns):
+        monotonic_ns = self.column("monotonic_ns")
+
+        return bisect.bisect_left(monotonic_ns, start_ns), bisect.bisect_left(monotonic_ns, end_ns)
+
+    def events_between(self, start_ns, end_ns):
+        return self.events(*self.between(start_ns, end_ns))
+
+    def close(self):
+        for column in self._columns.values():
+            column.release()
+
+        self._columns = dict()
+        self._records.release()
+
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # Views handed out to the caller are still alive; the mapping goes away with them
+                pass
+
+        self.file.close()
+
+
+def _read_header(f):
+    header = f.read(HEADER.size)
+
+    if len(header) < HEADER.size:
+        raise StorageError("Truncated event log header")
+
+    magic, version, record_size = HEADER.unpack(header)
+
+    if magic != MAGIC:
+        raise StorageError("Not a sneakysnek event log")
+
+    if version != VERSION or record_size != RECORD.size:
+        raise StorageError(f"Unsupported event log version {version} with {record_size}-byte records")
+
+
+keyboard_keys = list(KeyboardKey)
+mouse_buttons = list(MouseButton)
+
+mouse_events = {
+    KIND_MOUSE_CLICK: MouseEvents.CLICK,
+    KIND_MOUSE_MOVE: MouseEvents.MOVE,
+    KIND_MOUSE_SCROLL: MouseEvents.SCROLL
+}
+
+direction_codes = {
+    None: DIRECTION_NONE,
+    "DOWN": DIRECTION_DOWN,
+    "UP": DIRECTION_UP
+}
+
+directions = {code: direction for direction, code in direction_codes.items()}